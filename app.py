@@ -1,15 +1,29 @@
 # Full app.py content for the worker to use:
 
+import csv
+import io
+import json
 import sqlite3
+import re
 import os # For os.path.exists and os.path.join
-from flask import Flask, render_template, g, current_app, request, jsonify, abort
-from pydantic import BaseModel, Field, ValidationError # Pydantic v2
-from typing import Optional, List
+import threading
+import time
+import zlib
+from functools import wraps
+from flask import Flask, render_template, g, current_app, request, jsonify, abort, Response, stream_with_context
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError # Pydantic v2
+from typing import Optional, List, Tuple
 from config import Config # Import the Config class
+from src.database.pool import get_pool, get_existing_pool, dispose_pool
+from src.database.writer import get_writer, get_existing_writer, dispose_writer
+from src.database import migrate
+from src.json_provider import make_json_provider
+from src import events, instrumentation
 
 # DATABASE = 'kitbox.db' # Replaced by config
 app = Flask(__name__, template_folder='.') # Serve templates from project root.
 app.config.from_object(Config) # Load configuration from config.py
+app.json = make_json_provider(app, app.config['JSON_PROVIDER']) # orjson when installed, else the stdlib json module
 
 # --- Pydantic Models ---
 class LocationBase(BaseModel):
@@ -27,9 +41,26 @@ class LocationUpdate(BaseModel):
 
 class LocationInDB(LocationBase):
     id: int
+    version: int = Field(1, description="Row version, bumped by every write; send it back in If-Match to update safely")
     class Config:
         from_attributes = True
 
+class LocationTotals(BaseModel):
+    item_count: int = 0
+    total_weight: float = 0.0
+    total_cost: float = 0.0
+    total_value: float = 0.0
+
+class LocationSubtotal(LocationTotals):
+    location_id: int
+    name: str
+
+class LocationSummary(LocationTotals):
+    """Totals for a location and all of its descendants, plus a breakdown per immediate child."""
+    location_id: int
+    direct: LocationTotals = Field(default_factory=LocationTotals, description="Items stored directly in the location")
+    children: List[LocationSubtotal] = Field(default_factory=list, description="Recursive subtotal for each child location")
+
 # --- User Pydantic Models ---
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -70,6 +101,7 @@ class GearUpdate(BaseModel):
 
 class GearInDB(GearBase): 
     id: int
+    version: int = Field(1, description="Row version, bumped by every write; send it back in If-Match to update safely")
     location: Optional[LocationInDB] = None 
 
     class Config:
@@ -82,65 +114,136 @@ def get_db_path():
 
 def get_db():
     if 'db' not in g:
-        db_path = get_db_path()
-        g.db = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-        g.db.row_factory = sqlite3.Row
+        # Connections come from this worker's pool and are already configured (row factory, PRAGMAs).
+        pool = get_pool(get_db_path(), current_app.config)
+        g.db = pool.acquire()
+        g.db_pool = pool
     return g.db
 
+def run_write(write_func, *args):
+    """
+    Calls a data-access write function, e.g. run_write(gear_queries.create_gear, gear_data).
+    With KITBOX_WRITE_QUEUE enabled it runs on this worker's single writer thread and is committed together with
+    the other writes queued at the same time (see src/database/writer.py); otherwise on the request's connection.
+    Either way it returns the function's result or raises its exception.
+    """
+    if current_app.config['WRITE_QUEUE_ENABLED']:
+        writer = get_writer(get_db_path(), current_app.config, on_failed_commit=read_cache.clear)
+        return writer.submit(write_func, *args)
+    return write_func(get_db(), *args)
+
 def close_db(e=None):
     db = g.pop('db', None)
+    pool = g.pop('db_pool', None)
     if db is not None:
-        db.close()
+        pool.release(db)
 
-def init_db(reinit=False):
+def init_db():
+    """Deletes the database, if there is one, and creates a fresh one with migrate_db()."""
     db_path = get_db_path()
-    db_exists = os.path.exists(db_path)
-
-    if reinit and db_exists:
-        try:
-            os.remove(db_path)
-            current_app.logger.info(f"Removed existing database {db_path} for reinitialization.")
-            db_exists = False
-        except OSError as e:
-            current_app.logger.error(f"Error removing database {db_path}: {e}")
-            return 
-
-    if not db_exists or reinit:
-        conn = None
-        try:
-            conn = sqlite3.connect(db_path)
-            schema_path = os.path.join(app.root_path, 'src', 'database', 'schema.sql')
-            with open(schema_path, mode='r') as f:
-                conn.executescript(f.read())
+    dispose_writer(db_path) # As would the writer's connection and pooled connections
+    dispose_pool(db_path)
+    user_queries.user_cache.clear() # User ids are reused by the new database
+    if os.path.exists(db_path):
+        for suffix in ('', '-wal', '-shm'): # WAL mode side files belong to the old database
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        current_app.logger.info(f"Removed existing database {db_path} for reinitialization.")
+    migrate_db()
+
+def apply_sql_script(conn, script_name):
+    """Runs one of the SQL scripts in src/database/ against conn. Returns the script path."""
+    script_path = os.path.join(app.root_path, 'src', 'database', script_name)
+    with open(script_path, mode='r') as f:
+        conn.executescript(f.read())
+    return script_path
+
+def migrate_db():
+    """
+    Creates the database or brings it up to date without touching its data, by applying the schema migrations
+    it hasn't had yet (see src/database/migrate.py). A database that was empty also gets seed.sql.
+    After any migration the derived data (the location closure table and the gear full-text index) is rebuilt
+    and, for a database that already held data, the query planner statistics are refreshed so new indexes
+    are picked up.
+    Run once per deploy with `flask migrate`, before the workers start; requests never migrate.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    try:
+        was_empty = conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0
+        before, after = migrate.migrate(conn)
+        if was_empty:
+            apply_sql_script(conn, 'seed.sql')
+        if after != before:
+            location_queries.rebuild_location_closure(conn)
+            gear_queries.rebuild_search_index(conn)
             conn.commit()
-            current_app.logger.info(f"Initialized the database {db_path} from schema: {schema_path}")
-        except sqlite3.Error as e:
-            current_app.logger.error(f"SQLite error during DB initialization: {e}")
-        except FileNotFoundError:
-            current_app.logger.error(f"Failed to find schema.sql at {schema_path}.")
-        except Exception as e:
-            current_app.logger.error(f"An unexpected error occurred during DB init: {e}")
-        finally:
-            if conn:
-                conn.close()
-    else:
-        current_app.logger.info(f"Database {db_path} already exists. Skipping initialization.")
-    
+            if not was_empty: # Statistics of the seed data alone would mislead the planner once the catalog grows
+                conn.execute("PRAGMA optimize")
+            current_app.logger.info(f"Migrated the database {db_path} from schema version {before} to {after}.")
+        else:
+            current_app.logger.info(f"The database {db_path} is up to date (schema version {after}).")
+        return before, after
+    finally:
+        conn.close()
+
 app.teardown_appcontext(close_db) 
 
 @app.cli.command('init-db') 
 def init_db_command():
     with app.app_context(): 
-        init_db(reinit=True) 
+        init_db() 
     # Use DATABASE_FILENAME from app.config, accessed via current_app
     print(f"Database '{current_app.config['DATABASE_FILENAME']}' initialized (or re-initialized).")
 
+@app.cli.command('migrate')
+def migrate_command():
+    with app.app_context():
+        before, after = migrate_db()
+    if after == before:
+        print(f"Database '{current_app.config['DATABASE_FILENAME']}' is already at schema version {after}.")
+    else:
+        print(f"Database '{current_app.config['DATABASE_FILENAME']}' migrated from schema version {before} to {after}.")
+
+# --- Request instrumentation ---
 @app.before_request
-def ensure_db_initialized():
-    if not hasattr(app, '_db_initialized_this_session'): 
-        with app.app_context():
-            init_db()
-        app._db_initialized_this_session = True
+def start_request_instrumentation():
+    if current_app.config['REQUEST_INSTRUMENTATION']:
+        g.request_stats = instrumentation.start_request()
+
+@app.after_request
+def add_server_timing(response):
+    # Covers the work done before the body is sent; streamed responses fetch most of their rows afterwards.
+    stats = g.get('request_stats')
+    if stats is not None:
+        response.headers['Server-Timing'] = stats.server_timing()
+        g.request_status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_instrumentation(e=None):
+    """
+    Logs the request's totals and records them in the per-route metrics. Runs when the request context ends,
+    which for streamed responses is after the whole body has been generated.
+    """
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return
+    instrumentation.finish_request(stats)
+    fields = {
+        'method': request.method,
+        'route': request.url_rule.rule if request.url_rule is not None else '<unmatched>',
+        'path': request.path,
+        'status': g.pop('request_status', 500),
+        **stats.log_fields(),
+    }
+    instrumentation.request_logger.info(
+        "%s %s %s in %.1f ms (%d SQL statements, %.1f ms in sqlite3, %d rows)",
+        fields['method'], fields['path'], fields['status'], fields['duration_ms'],
+        fields['sql_statements'], fields['sql_ms'], fields['rows'], extra=fields
+    )
+    if current_app.config['METRICS_ENABLED']:
+        instrumentation.route_metrics.observe(fields['method'], fields['route'], fields['status'], stats)
 
 # --- Routes to serve HTML files ---
 @app.route('/')
@@ -155,15 +258,24 @@ def paperdoll_page():
 def containers_page():
     return render_template('containers.html')
 
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash # Already in user_queries, but useful here too for clarity
+from flask_jwt_extended import JWTManager, create_access_token, decode_token, jwt_required, get_jwt, get_jwt_identity
+from src.security.passwords import PasswordHasher, HasherBusyError, HasherUnavailableError
 
 # Data Access Layer Imports
-from src.data_access import gear_queries, location_queries, user_queries
+from src.data_access import gear_queries, location_queries, user_queries, change_tracking, sync_queries
+from src.data_access.read_cache import read_cache
+from src.data_access.change_tracking import VersionConflict
 
 # --- App Configuration & JWT Setup ---
 # app.config["JWT_SECRET_KEY"] is now loaded from Config object via app.config.from_object(Config)
 jwt = JWTManager(app) # JWTManager will use app.config["JWT_SECRET_KEY"]
+read_cache.configure(app.config['READ_CACHE_MAX_ENTRIES'], app.config['READ_CACHE_TTL_SECONDS'])
+user_queries.user_cache.configure(app.config['USER_CACHE_MAX_ENTRIES'], app.config['USER_CACHE_TTL_SECONDS'])
+password_hasher = PasswordHasher(
+    method=app.config['PASSWORD_HASH_METHOD'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+)
 
 # --- Helper for Standardized JSON Error Responses ---
 def make_error_response(message: str, status_code: int, **kwargs):
@@ -172,14 +284,308 @@ def make_error_response(message: str, status_code: int, **kwargs):
         error_payload.update(kwargs)
     return jsonify({"error": error_payload}), status_code
 
+# --- Helpers for conditional writes ---
+_ROW_ETAG = re.compile(r'^(\d+)(?:\.\d+)?$') # A row version, optionally followed by an embedded location's version
+
+def get_if_match_version() -> Optional[int]:
+    """
+    The row version a PUT/PATCH/DELETE is conditional on, from an If-Match header holding the item's `version`
+    as an entity tag (e.g. If-Match: "3"), or the ETag its single-row GET returned (see make_row_response()).
+    None without the header or with If-Match: *.
+    Raises ValueError with a client-facing message for anything else (weak or several tags, non-numbers).
+    """
+    if 'If-Match' not in request.headers or request.if_match.star_tag:
+        return None
+    tags = request.if_match.as_set(include_weak=True)
+    strong_tags = request.if_match.as_set() # If-Match uses strong comparison, so weak tags never match
+    match = _ROW_ETAG.match(next(iter(tags))) if len(tags) == 1 and tags == strong_tags else None
+    if match is None:
+        raise ValueError('If-Match must be a single row version, e.g. If-Match: "3"')
+    return int(match.group(1))
+
+def make_version_conflict_response(conflict: VersionConflict):
+    """412 for a conditional write whose If-Match version is out of date, with the row's current version."""
+    return make_error_response(
+        f"The item has been modified (it is now at version {conflict.current_version}); reload it and retry",
+        412, current_version=conflict.current_version
+    )
+
+# --- Helpers for list endpoints ---
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_CHUNK_ITEMS = 100 # Items serialized per chunk written to the client when streaming
+
+def get_int_query_arg(name: str, minimum: int = 0) -> Optional[int]:
+    """
+    Reads an optional integer query parameter.
+    Raises ValueError with a client-facing message if it is present but not an integer >= minimum.
+    """
+    raw_value = request.args.get(name)
+    if raw_value is None or raw_value == '':
+        return None
+    try:
+        value = int(raw_value)
+    except ValueError:
+        raise ValueError(f"Query parameter '{name}' must be an integer")
+    if value < minimum:
+        raise ValueError(f"Query parameter '{name}' must be >= {minimum}")
+    return value
+
+def wants_ndjson() -> bool:
+    """True if the client opted into a streamed NDJSON response (?format=ndjson or Accept header)."""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+# Streaming helpers take a zero-argument callable returning the items rather than the items themselves:
+# Flask tears down the app context (closing g.db) when the view returns and re-pushes it while streaming,
+# so the query must be started from inside the generator with a fresh get_db().
+def stream_ndjson(make_items):
+    """Streams the JSON-ready dicts returned by make_items() as newline-delimited JSON, one object per line."""
+    def generate():
+        dumps = current_app.json.dumps_bytes
+        chunk = []
+        for item in make_items():
+            chunk.append(dumps(item) + b"\n")
+            if len(chunk) >= STREAM_CHUNK_ITEMS:
+                yield b"".join(chunk)
+                chunk = []
+        if chunk:
+            yield b"".join(chunk)
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def stream_json_array(make_items):
+    """
+    Streams the JSON-ready dicts returned by make_items() as a single JSON array without building the whole list in memory.
+    The body matches what jsonify() would produce for the same list in non-debug mode.
+    """
+    def generate():
+        dumps = current_app.json.dumps_bytes
+        chunk = [b"["]
+        first = True
+        for item in make_items():
+            if not first:
+                chunk.append(b",")
+            first = False
+            chunk.append(dumps(item))
+            if len(chunk) >= 2 * STREAM_CHUNK_ITEMS:
+                yield b"".join(chunk)
+                chunk = []
+        chunk.append(b"]\n")
+        yield b"".join(chunk)
+    return Response(stream_with_context(generate()), mimetype=current_app.json.mimetype)
+
+def wants_location_map() -> bool:
+    """
+    True if the client asked for ?locations=map: gear items without the nested 'location' object, plus one
+    'locations' map keyed by location id. Raises ValueError for values other than 'embed' (the default) and 'map'.
+    """
+    mode = request.args.get('locations', 'embed')
+    if mode not in ('embed', 'map'):
+        raise ValueError("Query parameter 'locations' must be 'embed' or 'map'")
+    return mode == 'map'
+
+def get_gear_fields_arg(location_map: bool = False) -> Optional[Tuple[str, ...]]:
+    """
+    Reads the optional ?fields= sparse fieldset: comma-separated names from gear_queries.GEAR_FIELDS, pushed down
+    into the SELECT list. With the location map, 'location' comes from the map, so location_id is selected instead.
+    Raises ValueError with a client-facing message for unknown field names.
+    """
+    raw_value = request.args.get('fields')
+    if raw_value is None or raw_value == '':
+        return None
+    fields = {name.strip() for name in raw_value.split(',') if name.strip()}
+    unknown = fields - set(gear_queries.GEAR_FIELDS)
+    if unknown:
+        raise ValueError(f"Query parameter 'fields' has unknown field(s): {', '.join(sorted(unknown))}. "
+                         f"Allowed: {', '.join(gear_queries.GEAR_FIELDS)}")
+    if location_map:
+        fields = (fields - {'location'}) | {'location_id'}
+    return tuple(sorted(fields)) # One canonical order per fieldset, for the read cache
+
+def build_location_map(db, items) -> dict:
+    """The 'locations' map for a list of flat gear dicts: {str(location id): location} for the distinct locations used."""
+    location_ids = {item['location_id'] for item in items if item['location_id'] is not None}
+    if not location_ids:
+        return {}
+    return {str(location_id): location
+            for location_id, location in location_queries.get_locations_by_ids(db, location_ids).items()}
+
+def stream_items_with_location_map(make_items):
+    """
+    Streams the flat gear dicts returned by make_items() as {"items": [...], "locations": {...}}.
+    Distinct location ids are collected while the items are written and the map is appended at the end,
+    so memory use grows with the number of locations rather than items.
+    """
+    def generate():
+        dumps = current_app.json.dumps_bytes
+        location_ids = set()
+        chunk = [b'{"items":[']
+        first = True
+        for item in make_items():
+            if not first:
+                chunk.append(b",")
+            first = False
+            chunk.append(dumps(item))
+            if item['location_id'] is not None:
+                location_ids.add(item['location_id'])
+            if len(chunk) >= 2 * STREAM_CHUNK_ITEMS:
+                yield b"".join(chunk)
+                chunk = []
+        locations = location_queries.get_locations_by_ids(get_db(), location_ids) if location_ids else {}
+        chunk.append(b'],"locations":')
+        chunk.append(dumps({str(location_id): location for location_id, location in locations.items()}))
+        chunk.append(b"}\n")
+        yield b"".join(chunk)
+    return Response(stream_with_context(generate()), mimetype=current_app.json.mimetype)
+
+# --- Conditional GET (ETag) support ---
+def make_data_etag(tables) -> str:
+    """
+    Builds a strong ETag for the current request from the change counters of the tables its response reads.
+    The request path, query string, Accept header and JSON provider are hashed in, so every representation
+    gets its own tag.
+    """
+    versions = change_tracking.get_table_versions(get_db(), tables)
+    representation = f"{request.full_path}|{request.headers.get('Accept', '')}|{type(current_app.json).__name__}"
+    counters = "-".join(str(versions.get(table, 0)) for table in tables)
+    return f"{versions.get(change_tracking.EPOCH_KEY, 0):x}-{counters}-{zlib.crc32(representation.encode('utf-8')):08x}"
+
+def etag_from_tables(*tables):
+    """
+    Decorator for GET views whose response depends only on the given tables (and the request).
+    Answers a matching If-None-Match with 304 before the view (and its query) runs; otherwise tags the view's
+    200 response. The tag is computed before the view reads any data, so a write that races with the
+    request can only make the tag older than the body, never newer.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = make_data_etag(tables)
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return _tag_response(response, etag)
+        return wrapper
+    return decorator
+
+def make_row_response(item: dict):
+    """
+    200 response for a single gear item or location (as a dict), tagged with the row's `version` (e.g. ETag: "3")
+    so the tag can be sent straight back in If-Match. A gear item's tag also carries its embedded location's
+    version ("3.7"), since renaming the location changes the response too. A matching If-None-Match gets 304.
+    Unlike etag_from_tables(), the row has to be read first; the read cache keeps that cheap.
+    """
+    location = item.get('location')
+    etag = f"{item['version']}.{location['version']}" if location else str(item['version'])
+    if request.if_none_match.contains(etag):
+        return _tag_response(current_app.response_class(status=304), etag)
+    return _tag_response(jsonify(item), etag)
+
+def _tag_response(response, etag: str):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache' # Browsers may keep it but must revalidate every time
+    response.vary.add('Accept')
+    return response
+
+# --- Helpers for bulk gear import/export ---
+CSV_MIMETYPE = 'text/csv'
+BULK_IMPORT_MAX_REPORTED_ERRORS = 1000 # Per-row errors beyond this are counted but not listed
+_gear_create_list_adapter = TypeAdapter(List[GearCreate])
+
+def iter_import_records():
+    """
+    Yields (index, record) pairs from the request body, where record is a dict of raw field values.
+    Accepts a JSON array (application/json), NDJSON (application/x-ndjson) or CSV with a header row (text/csv).
+    NDJSON and CSV bodies are read line by line from the request stream.
+    Raises ValueError if the body can't be parsed.
+    """
+    if request.mimetype == NDJSON_MIMETYPE:
+        text_stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8')
+        index = 0
+        for line_number, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {line_number} is not valid JSON: {e}")
+            yield index, record
+            index += 1
+    elif request.mimetype == CSV_MIMETYPE:
+        text_stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', newline='')
+        for index, record in enumerate(csv.DictReader(text_stream)):
+            # CSV has no null; treat empty cells as missing values.
+            yield index, {key: (value if value != '' else None) for key, value in record.items()}
+    else:
+        records = request.get_json(silent=True)
+        if not isinstance(records, list):
+            raise ValueError("expected a JSON array of gear objects, NDJSON or CSV")
+        yield from enumerate(records)
+
+def validate_import_batch(batch, upsert: bool, location_ids, errors) -> List[Tuple[Optional[int], GearCreate]]:
+    """
+    Validates a batch of (index, record) pairs with GearCreate.
+    Returns the valid rows as (gear_id, GearCreate) pairs; gear_id is only kept when upsert is True.
+    Appends {"index", "errors"} entries to `errors` for rows that fail validation or reference a missing location.
+    """
+    records = [record for _, record in batch]
+    row_errors = {}
+    try:
+        # Fast path: validate the whole batch in one call.
+        models = _gear_create_list_adapter.validate_python(records)
+    except ValidationError as e:
+        for err in e.errors(include_url=False):
+            position = err['loc'][0]
+            row_errors.setdefault(position, []).append({**err, 'loc': list(err['loc'][1:])})
+        # Only the rows without errors are re-validated individually.
+        models = [None if position in row_errors else GearCreate.model_validate(record) for position, record in enumerate(records)]
+
+    valid_rows = []
+    for position, (index, record) in enumerate(batch):
+        model = models[position]
+        raw_id = record.get('id') if upsert and isinstance(record, dict) else None
+        gear_id = None
+        if model is not None:
+            if raw_id is not None:
+                gear_id = int(raw_id) if isinstance(raw_id, (int, str)) and not isinstance(raw_id, bool) and str(raw_id).isdigit() else 0
+                if gear_id < 1:
+                    row_errors.setdefault(position, []).append({'type': 'int_parsing', 'loc': ['id'], 'msg': 'id must be a positive integer', 'input': raw_id})
+            if position not in row_errors and model.location_id is not None and model.location_id not in location_ids:
+                row_errors.setdefault(position, []).append({'type': 'foreign_key', 'loc': ['location_id'], 'msg': f"Location {model.location_id} does not exist", 'input': model.location_id})
+        if position in row_errors:
+            if len(errors) < BULK_IMPORT_MAX_REPORTED_ERRORS:
+                errors.append({'index': index, 'errors': row_errors[position]})
+            continue
+        valid_rows.append((gear_id, model))
+    return valid_rows
+
 # --- User Loader for JWT ---
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
-    identity = jwt_data["sub"] # "sub" is where the user_id is stored by create_access_token
-    db = get_db()
-    user = user_queries.get_user_by_id(db, identity)
+    identity = int(jwt_data["sub"]) # "sub" is where the user_id is stored (as a string) by create_access_token
+    user = user_queries.user_cache.get(identity)
+    if user is None:
+        # Only a cache miss needs the database; hits don't even check out a pooled connection.
+        user = user_queries.get_user_by_id(get_db(), identity)
+        if user is not None:
+            user_queries.user_cache.put(user)
     return user # Returns UserInDB instance or None
 
+def make_hasher_busy_response():
+    """503 for when the password hasher's queue is full (a burst of logins/registrations)."""
+    response, status_code = make_error_response("Too many login attempts in progress, please retry shortly", 503)
+    response.headers['Retry-After'] = '1'
+    return response, status_code
+
+def make_hasher_unavailable_response():
+    """503 for when the password hasher's process pool broke and a fresh one failed as well."""
+    response, status_code = make_error_response("Password checks are temporarily unavailable, please retry shortly", 503)
+    response.headers['Retry-After'] = '5'
+    return response, status_code
+
 # --- Auth API Endpoints ---
 @app.route('/api/auth/register', methods=['POST'])
 def register_user():
@@ -193,9 +599,15 @@ def register_user():
 
     db = get_db()
     try:
-        new_user = user_queries.create_user(db, user_create_data)
+        new_user = user_queries.create_user(db, user_create_data, hash_password=password_hasher.hash)
         current_app.logger.info(f"User '{new_user.username}' registered successfully from {request.remote_addr}.")
-        return jsonify(UserInDB.model_validate(new_user).model_dump()), 201
+        return jsonify(UserInDB.model_validate(new_user)), 201
+    except HasherBusyError:
+        current_app.logger.warning(f"Password hasher busy; rejected registration of '{user_create_data.username}' from {request.remote_addr}.")
+        return make_hasher_busy_response()
+    except HasherUnavailableError as e:
+        current_app.logger.error(f"Password hasher unavailable; rejected registration of '{user_create_data.username}': {e}", exc_info=True)
+        return make_hasher_unavailable_response()
     except sqlite3.IntegrityError: # Username already exists
         db.rollback()
         current_app.logger.warning(f"Attempt to register existing username '{user_create_data.username}' from {request.remote_addr}.")
@@ -217,9 +629,21 @@ def login_user():
     db = get_db()
     user_row = user_queries.get_user_row_by_username(db, username)
 
-    if user_row and check_password_hash(user_row['password_hash'], password):
-        user_for_token = UserInDB.model_validate(user_row)
-        access_token = create_access_token(identity=user_for_token.id)
+    try:
+        password_ok = user_row is not None and password_hasher.verify(user_row['password_hash'], password)
+        if password_ok and password_hasher.needs_rehash(user_row['password_hash']):
+            # The hash method or cost has changed since this password was stored; upgrade it now that we know it.
+            user_queries.update_password_hash(db, user_row['id'], password_hasher.hash(password))
+    except HasherBusyError:
+        current_app.logger.warning(f"Password hasher busy; rejected login for '{username}' from {request.remote_addr}.")
+        return make_hasher_busy_response()
+    except HasherUnavailableError as e:
+        current_app.logger.error(f"Password hasher unavailable; rejected login for '{username}': {e}", exc_info=True)
+        return make_hasher_unavailable_response()
+
+    if password_ok:
+        user_for_token = UserInDB.model_validate(dict(user_row))
+        access_token = create_access_token(identity=str(user_for_token.id)) # JWT "sub" must be a string
         current_app.logger.info(f"User '{username}' logged in successfully from {request.remote_addr}.")
         return jsonify(access_token=access_token), 200
     else:
@@ -238,9 +662,9 @@ def create_gear_item_api():
     
     db = get_db()
     try:
-        created_gear = gear_queries.create_gear(db, gear_data)
+        created_gear = run_write(gear_queries.create_gear, gear_data)
         current_app.logger.info(f"Gear item '{created_gear.name}' created by user {get_jwt_identity_if_available()}.")
-        return jsonify(created_gear.model_dump()), 201
+        return jsonify(created_gear), 201
     except sqlite3.IntegrityError as e:
         db.rollback()
         current_app.logger.error(f"Integrity error creating gear '{gear_data.name}': {e}", exc_info=True)
@@ -254,22 +678,213 @@ def create_gear_item_api():
 
 @app.route('/api/gear', methods=['GET'])
 @jwt_required()
+@etag_from_tables('gear', 'locations')
 def get_all_gear_api():
-    db = get_db()
     name_filter = request.args.get('name')
     category_filter = request.args.get('category')
+    try:
+        after_id = get_int_query_arg('after', minimum=0)
+        limit = get_int_query_arg('limit', minimum=1)
+        location_map = wants_location_map()
+        fields = get_gear_fields_arg(location_map)
+    except ValueError as e:
+        return make_error_response(str(e), 400)
+
+    if limit is not None:
+        limit = min(limit, current_app.config['GEAR_PAGE_MAX_LIMIT'])
+    # With ?locations=map, gear is read without joining locations and the distinct locations are sent once.
+    embed_location = not location_map
+
+    search_text = request.args.get('search')
+    if search_text is not None:
+        # Search mode: results are ranked by relevance, so keyset cursors don't apply.
+        if after_id is not None:
+            return make_error_response("Query parameter 'after' cannot be combined with 'search'", 400)
+        db = get_db()
+        results = gear_queries.search_gear(db, search_text, name_filter, category_filter,
+                                           limit=limit or current_app.config['GEAR_SEARCH_DEFAULT_LIMIT'],
+                                           as_dicts=True, embed_location=embed_location, fields=fields)
+        if location_map:
+            return jsonify({"items": results, "locations": build_location_map(db, results)})
+        return jsonify(results)
+
+    if wants_ndjson():
+        if location_map:
+            return make_error_response("Query parameter 'locations=map' cannot be combined with NDJSON output", 400)
+        # Rows are serialized as they are read from the cursor; nothing is buffered.
+        return stream_ndjson(lambda: gear_queries.iter_gear(get_db(), name_filter, category_filter, after_id=after_id,
+                                                            limit=limit, as_dicts=True, fields=fields))
+
+    if limit is None and after_id is None:
+        # Unpaginated request: keep the plain list response, but stream it instead of materializing it.
+        if location_map:
+            return stream_items_with_location_map(
+                lambda: gear_queries.iter_gear(get_db(), name_filter, category_filter, embed_location=False, fields=fields))
+        return stream_json_array(lambda: gear_queries.iter_gear(get_db(), name_filter, category_filter, as_dicts=True, fields=fields))
+
+    if limit is None:
+        limit = current_app.config['GEAR_PAGE_DEFAULT_LIMIT']
+    db = get_db()
+    gear_list, next_after = gear_queries.get_gear_page(db, name_filter, category_filter, after_id, limit,
+                                                       as_dicts=True, embed_location=embed_location, fields=fields)
+    if location_map:
+        return jsonify({"items": gear_list, "next_after": next_after, "locations": build_location_map(db, gear_list)})
+    return jsonify({"items": gear_list, "next_after": next_after})
 
-    gear_list = gear_queries.get_all_gear(db, name_filter, category_filter)
-    return jsonify([gear.model_dump() for gear in gear_list])
+@app.route('/api/gear/bulk', methods=['POST'])
+@jwt_required()
+def bulk_import_gear_api():
+    mode = request.args.get('mode', 'create')
+    if mode not in ('create', 'upsert'):
+        return make_error_response("Query parameter 'mode' must be 'create' or 'upsert'", 400)
+    upsert = mode == 'upsert'
+    batch_size = current_app.config['BULK_IMPORT_BATCH_SIZE']
+
+    db = get_db()
+    location_ids = location_queries.get_location_ids(db)
+    errors = []
+    batches = []
+    failed = 0
+    try:
+        batch = []
+        for index, record in iter_import_records():
+            batch.append((index, record))
+            if len(batch) >= batch_size:
+                valid_rows = validate_import_batch(batch, upsert, location_ids, errors)
+                failed += len(batch) - len(valid_rows)
+                batches.append(valid_rows)
+                batch = []
+        if batch:
+            valid_rows = validate_import_batch(batch, upsert, location_ids, errors)
+            failed += len(batch) - len(valid_rows)
+            batches.append(valid_rows)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        current_app.logger.warning(f"Unparseable bulk gear import from user {get_jwt_identity_if_available()}: {e}")
+        return make_error_response(f"Could not parse import body: {e}", 400)
+
+    # Everything is validated before the write starts, so the write lock is only held for the inserts.
+    try:
+        created, updated = run_write(gear_queries.bulk_write_gear, batches)
+    except sqlite3.IntegrityError as e:
+        db.rollback()
+        current_app.logger.error(f"Integrity error during bulk gear import: {e}", exc_info=True)
+        return make_error_response(f"Database integrity error: {str(e)}", 400)
+    except Exception as e:
+        db.rollback()
+        current_app.logger.error(f"Unexpected error during bulk gear import: {e}", exc_info=True)
+        return make_error_response("Failed to import gear items", 500)
+
+    current_app.logger.info(f"Bulk gear import by user {get_jwt_identity_if_available()}: {created} created, {updated} updated, {failed} failed.")
+    return jsonify({"created": created, "updated": updated, "failed": failed, "errors": errors}), 200
+
+@app.route('/api/gear/export', methods=['GET'])
+@jwt_required()
+@etag_from_tables('gear')
+def export_gear_api():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format == 'ndjson':
+        # The export never includes the nested location, so it is read without the locations JOIN.
+        response = stream_ndjson(lambda: gear_queries.iter_gear(get_db(), embed_location=False))
+    elif export_format == 'csv':
+        def generate():
+            header = ('id',) + gear_queries.GEAR_COLUMNS
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(header)
+            for count, item in enumerate(gear_queries.iter_gear(get_db(), embed_location=False), start=1):
+                writer.writerow([item[col] for col in header])
+                if count % STREAM_CHUNK_ITEMS == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        response = Response(stream_with_context(generate()), mimetype=CSV_MIMETYPE)
+    else:
+        return make_error_response("Query parameter 'format' must be 'ndjson' or 'csv'", 400)
+    response.headers['Content-Disposition'] = f'attachment; filename="gear.{export_format}"'
+    return response
+
+@app.route('/api/gear/batch', methods=['PATCH'])
+@jwt_required()
+def batch_update_gear_api():
+    """
+    Applies many gear changes in one transaction. The body is either
+    {"updates": [{"id": 1, <GearUpdate fields>}, ...]} or {"ids": [1, 2, ...], "location_id": <id or null>}.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or ('updates' in body) == ('ids' in body):
+        return make_error_response("Body must contain either 'updates' or 'ids' with 'location_id'", 400)
+    max_items = current_app.config['GEAR_BATCH_MAX_ITEMS']
+
+    if 'ids' in body:
+        gear_ids = body['ids']
+        if not isinstance(gear_ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in gear_ids):
+            return make_error_response("'ids' must be a list of integers", 400)
+        if 'location_id' not in body:
+            return make_error_response("'location_id' is required when moving items by 'ids'", 400)
+        try:
+            move_data = GearUpdate(location_id=body['location_id'])
+        except ValidationError as e:
+            return jsonify(e.errors(include_url=False)), 400
+        patches = None
+        item_count = len(gear_ids)
+    else:
+        raw_updates = body['updates']
+        if not isinstance(raw_updates, list):
+            return make_error_response("'updates' must be a list", 400)
+        patches = []
+        errors = []
+        for index, raw_update in enumerate(raw_updates):
+            gear_id = raw_update.get('id') if isinstance(raw_update, dict) else None
+            if not isinstance(gear_id, int) or isinstance(gear_id, bool):
+                errors.append({"index": index, "errors": [{"type": "missing", "loc": ["id"], "msg": "Each update needs an integer 'id'"}]})
+                continue
+            try:
+                patch = GearUpdate(**{k: v for k, v in raw_update.items() if k != 'id'})
+            except ValidationError as e:
+                errors.append({"index": index, "errors": e.errors(include_url=False)})
+                continue
+            if not patch.model_dump(exclude_unset=True):
+                errors.append({"index": index, "errors": [{"type": "missing", "loc": [], "msg": "No update fields provided"}]})
+                continue
+            patches.append((gear_id, patch))
+        if errors:
+            # All-or-nothing: nothing is written if any patch is invalid.
+            return make_error_response("Invalid batch update", 400, errors=errors)
+        item_count = len(patches)
+
+    if item_count == 0:
+        return make_error_response("No items to update", 400)
+    if item_count > max_items:
+        return make_error_response(f"A batch may contain at most {max_items} items", 400)
+
+    db = get_db()
+    try:
+        if patches is None:
+            items, not_found = run_write(gear_queries.move_gear, gear_ids, move_data.location_id)
+        else:
+            items, not_found = run_write(gear_queries.update_gear_batch, patches)
+        current_app.logger.info(f"Batch update of {len(items)} gear items by user {get_jwt_identity_if_available()}.")
+        return jsonify({"items": items, "not_found": not_found}), 200
+    except sqlite3.IntegrityError as e:
+        db.rollback()
+        current_app.logger.error(f"Integrity error in batch gear update: {e}", exc_info=True)
+        if "FOREIGN KEY constraint failed" in str(e):
+            return make_error_response("Invalid location_id or other foreign key constraint failed.", 400, details=str(e))
+        return make_error_response(f"Database integrity error: {str(e)}", 400)
+    except Exception as e:
+        db.rollback()
+        current_app.logger.error(f"Unexpected error in batch gear update: {e}", exc_info=True)
+        return make_error_response("Failed to update gear items", 500)
 
 @app.route('/api/gear/<int:gear_id>', methods=['GET'])
 @jwt_required()
 def get_gear_item_api(gear_id):
     db = get_db()
-    gear_item = gear_queries.get_gear_by_id(db, gear_id)
+    gear_item = gear_queries.get_gear_by_id(db, gear_id, as_dicts=True)
     if gear_item is None:
         abort(404, description=f"Gear item with id {gear_id} not found")
-    return jsonify(gear_item.model_dump()), 200
+    return make_row_response(gear_item)
 
 @app.route('/api/gear/<int:gear_id>', methods=['PUT'])
 @jwt_required()
@@ -282,12 +897,16 @@ def update_gear_item_api(gear_id):
     if not update_data.model_dump(exclude_unset=True):
         return make_error_response("No update fields provided", 400)
 
+    try:
+        expected_version = get_if_match_version()
+    except ValueError as e:
+        return make_error_response(str(e), 400)
+
     db = get_db()
     try:
-        updated_gear = gear_queries.update_gear(db, gear_id, update_data)
-        if updated_gear is None:
-            abort(404, description=f"Gear item with id {gear_id} not found for update") # Will be caught by 404 handler
-        return jsonify(updated_gear.model_dump()), 200
+        updated_gear = run_write(gear_queries.update_gear, gear_id, update_data, expected_version)
+    except VersionConflict as e:
+        return make_version_conflict_response(e)
     except sqlite3.IntegrityError as e:
         db.rollback()
         current_app.logger.error(f"Integrity error updating gear {gear_id}: {e}", exc_info=True)
@@ -298,6 +917,9 @@ def update_gear_item_api(gear_id):
         db.rollback()
         current_app.logger.error(f"Unexpected error updating gear {gear_id}: {e}", exc_info=True)
         return make_error_response("Failed to update gear item", 500)
+    if updated_gear is None:
+        abort(404, description=f"Gear item with id {gear_id} not found for update") # Will be caught by 404 handler
+    return jsonify(updated_gear), 200
 
 @app.route('/api/gear/<int:gear_id>', methods=['PATCH'])
 @jwt_required()
@@ -311,12 +933,16 @@ def patch_gear_item_api(gear_id):
     if not patch_data.model_dump(exclude_unset=True):
         return make_error_response("No update fields provided", 400)
     
+    try:
+        expected_version = get_if_match_version()
+    except ValueError as e:
+        return make_error_response(str(e), 400)
+
     db = get_db()
     try:
-        updated_gear = gear_queries.update_gear(db, gear_id, patch_data)
-        if updated_gear is None:
-             abort(404, description=f"Gear item with id {gear_id} not found for patch") # Will be caught by 404 handler
-        return jsonify(updated_gear.model_dump()), 200
+        updated_gear = run_write(gear_queries.update_gear, gear_id, patch_data, expected_version)
+    except VersionConflict as e:
+        return make_version_conflict_response(e)
     except sqlite3.IntegrityError as e:
         db.rollback()
         current_app.logger.error(f"Integrity error patching gear {gear_id}: {e}", exc_info=True)
@@ -327,17 +953,23 @@ def patch_gear_item_api(gear_id):
         db.rollback()
         current_app.logger.error(f"Unexpected error patching gear {gear_id}: {e}", exc_info=True)
         return make_error_response("Failed to patch gear item", 500)
+    if updated_gear is None:
+        abort(404, description=f"Gear item with id {gear_id} not found for patch") # Will be caught by 404 handler
+    return jsonify(updated_gear), 200
 
 @app.route('/api/gear/<int:gear_id>', methods=['DELETE'])
 @jwt_required()
 def delete_gear_item_api(gear_id):
+    try:
+        expected_version = get_if_match_version()
+    except ValueError as e:
+        return make_error_response(str(e), 400)
+
     db = get_db()
     try:
-        deleted = gear_queries.delete_gear(db, gear_id)
-        if not deleted:
-            abort(404, description=f"Gear item with id {gear_id} not found for deletion") # Will be caught by 404 handler
-        current_app.logger.info(f"Gear item with id {gear_id} deleted by user {get_jwt_identity_if_available()}.")
-        return jsonify({"message": f"Gear item with id {gear_id} deleted successfully"}), 200
+        deleted = run_write(gear_queries.delete_gear, gear_id, expected_version)
+    except VersionConflict as e:
+        return make_version_conflict_response(e)
     except sqlite3.IntegrityError as e:
         db.rollback()
         current_app.logger.error(f"Integrity error deleting gear {gear_id}: {e}", exc_info=True)
@@ -346,6 +978,10 @@ def delete_gear_item_api(gear_id):
         db.rollback()
         current_app.logger.error(f"Error deleting gear {gear_id}: {e}", exc_info=True)
         return make_error_response("Failed to delete gear item", 500)
+    if not deleted:
+        abort(404, description=f"Gear item with id {gear_id} not found for deletion") # Will be caught by 404 handler
+    current_app.logger.info(f"Gear item with id {gear_id} deleted by user {get_jwt_identity_if_available()}.")
+    return jsonify({"message": f"Gear item with id {gear_id} deleted successfully"}), 200
 
 # --- Location API Endpoints ---
 
@@ -360,9 +996,9 @@ def create_location_api():
 
     db = get_db()
     try:
-        created_location = location_queries.create_location(db, location_data)
+        created_location = run_write(location_queries.create_location, location_data)
         current_app.logger.info(f"Location '{created_location.name}' created by user {get_jwt_identity_if_available()}.")
-        return jsonify(created_location.model_dump()), 201
+        return jsonify(created_location), 201
     except sqlite3.IntegrityError as e:
         db.rollback()
         current_app.logger.error(f"Integrity error creating location '{location_data.name}': {e}", exc_info=True)
@@ -378,13 +1014,14 @@ def create_location_api():
 
 @app.route('/api/locations', methods=['GET'])
 @jwt_required()
+@etag_from_tables('locations')
 def get_all_locations_api():
     db = get_db()
     name_filter = request.args.get('name')
     type_filter = request.args.get('type')
 
     locations = location_queries.get_all_locations(db, name_filter, type_filter)
-    return jsonify([loc.model_dump() for loc in locations])
+    return jsonify(locations)
 
 @app.route('/api/locations/<int:location_id>', methods=['GET'])
 @jwt_required()
@@ -393,7 +1030,7 @@ def get_location_item_api(location_id):
     location_item = location_queries.get_location_by_id(db, location_id)
     if location_item is None:
         abort(404, description=f"Location with id {location_id} not found")
-    return jsonify(location_item.model_dump())
+    return make_row_response(location_item.model_dump())
 
 @app.route('/api/locations/<int:location_id>', methods=['PUT'])
 @jwt_required()
@@ -410,12 +1047,20 @@ def update_location_api(location_id):
     if update_data.parent_id is not None and update_data.parent_id == location_id:
         return make_error_response("Location cannot be its own parent", 400)
 
+    try:
+        expected_version = get_if_match_version()
+    except ValueError as e:
+        return make_error_response(str(e), 400)
+
     db = get_db()
     try:
-        updated_location = location_queries.update_location(db, location_id, update_data)
-        if updated_location is None:
-            abort(404, description=f"Location with id {location_id} not found for update") # Caught by 404 handler
-        return jsonify(updated_location.model_dump()), 200
+        updated_location = run_write(location_queries.update_location, location_id, update_data, expected_version)
+    except VersionConflict as e:
+        return make_version_conflict_response(e)
+    except ValueError as e: # Re-parenting would create a cycle
+        db.rollback()
+        current_app.logger.warning(f"Rejected updating location {location_id}: {e}")
+        return make_error_response(str(e), 400)
     except sqlite3.IntegrityError as e:
         db.rollback()
         current_app.logger.error(f"Integrity error updating location {location_id}: {e}", exc_info=True)
@@ -428,6 +1073,9 @@ def update_location_api(location_id):
         db.rollback()
         current_app.logger.error(f"Unexpected error updating location {location_id}: {e}", exc_info=True)
         return make_error_response("Failed to update location", 500)
+    if updated_location is None:
+        abort(404, description=f"Location with id {location_id} not found for update") # Caught by 404 handler
+    return jsonify(updated_location), 200
 
 @app.route('/api/locations/<int:location_id>', methods=['PATCH'])
 @jwt_required()
@@ -444,12 +1092,20 @@ def patch_location_api(location_id):
     if patch_data.parent_id is not None and patch_data.parent_id == location_id:
         return make_error_response("Location cannot be its own parent", 400)
 
+    try:
+        expected_version = get_if_match_version()
+    except ValueError as e:
+        return make_error_response(str(e), 400)
+
     db = get_db()
     try:
-        updated_location = location_queries.update_location(db, location_id, patch_data)
-        if updated_location is None:
-            abort(404, description=f"Location with id {location_id} not found for patch") # Caught by 404 handler
-        return jsonify(updated_location.model_dump()), 200
+        updated_location = run_write(location_queries.update_location, location_id, patch_data, expected_version)
+    except VersionConflict as e:
+        return make_version_conflict_response(e)
+    except ValueError as e: # Re-parenting would create a cycle
+        db.rollback()
+        current_app.logger.warning(f"Rejected patching location {location_id}: {e}")
+        return make_error_response(str(e), 400)
     except sqlite3.IntegrityError as e:
         db.rollback()
         current_app.logger.error(f"Integrity error patching location {location_id}: {e}", exc_info=True)
@@ -462,17 +1118,23 @@ def patch_location_api(location_id):
         db.rollback()
         current_app.logger.error(f"Unexpected error patching location {location_id}: {e}", exc_info=True)
         return make_error_response("Failed to patch location", 500)
+    if updated_location is None:
+        abort(404, description=f"Location with id {location_id} not found for patch") # Caught by 404 handler
+    return jsonify(updated_location), 200
 
 @app.route('/api/locations/<int:location_id>', methods=['DELETE'])
 @jwt_required()
 def delete_location_api(location_id):
+    try:
+        expected_version = get_if_match_version()
+    except ValueError as e:
+        return make_error_response(str(e), 400)
+
     db = get_db()
     try:
-        deleted = location_queries.delete_location(db, location_id)
-        if not deleted:
-            abort(404, description=f"Location with id {location_id} not found for deletion") # Caught by 404 handler
-        current_app.logger.info(f"Location with id {location_id} deleted by user {get_jwt_identity_if_available()}.")
-        return jsonify({"message": f"Location with id {location_id} deleted successfully"}), 200
+        deleted = run_write(location_queries.delete_location, location_id, expected_version)
+    except VersionConflict as e:
+        return make_version_conflict_response(e)
     except sqlite3.IntegrityError as e:
         db.rollback()
         current_app.logger.error(f"Integrity error deleting location {location_id}: {e}", exc_info=True)
@@ -481,18 +1143,153 @@ def delete_location_api(location_id):
         db.rollback()
         current_app.logger.error(f"Unexpected error deleting location {location_id}: {e}", exc_info=True)
         return make_error_response("Failed to delete location", 500)
+    if not deleted:
+        abort(404, description=f"Location with id {location_id} not found for deletion") # Caught by 404 handler
+    current_app.logger.info(f"Location with id {location_id} deleted by user {get_jwt_identity_if_available()}.")
+    return jsonify({"message": f"Location with id {location_id} deleted successfully"}), 200
 
 @app.route('/api/locations/<int:location_id>/items', methods=['GET'])
 @jwt_required()
+@etag_from_tables('gear', 'locations')
 def get_items_in_location_api(location_id):
+    try:
+        location_map = wants_location_map()
+        fields = get_gear_fields_arg(location_map)
+    except ValueError as e:
+        return make_error_response(str(e), 400)
     db = get_db()
     # location_queries.get_items_in_location will return None if the location itself doesn't exist.
-    items_in_location = location_queries.get_items_in_location(db, location_id)
+    items_in_location = location_queries.get_items_in_location(db, location_id, as_dicts=True,
+                                                               embed_location=not location_map, fields=fields)
     
     if items_in_location is None:
         abort(404, description=f"Location with id {location_id} not found when trying to list items.") # Caught by 404 handler
 
-    return jsonify([item.model_dump() for item in items_in_location])
+    if location_map:
+        return jsonify({"items": items_in_location, "locations": build_location_map(db, items_in_location)})
+    return jsonify(items_in_location)
+
+@app.route('/api/locations/<int:location_id>/totals', methods=['GET'])
+@jwt_required()
+@etag_from_tables('gear', 'locations')
+def get_location_totals_api(location_id):
+    db = get_db()
+    summary = location_queries.get_location_totals(db, location_id)
+    if summary is None:
+        abort(404, description=f"Location with id {location_id} not found when computing totals.") # Caught by 404 handler
+    return jsonify(summary)
+
+@app.route('/api/loadout', methods=['GET'])
+@jwt_required()
+@etag_from_tables('gear', 'locations')
+def get_loadout_api():
+    # Everything the paperdoll page shows, in one response instead of the full gear and location lists.
+    try:
+        root_id = get_int_query_arg('root', minimum=1)
+    except ValueError as e:
+        return make_error_response(str(e), 400)
+    db = get_db()
+    loadout = location_queries.get_loadout(db, root_id)
+    if loadout is None:
+        abort(404, description=f"Location with id {root_id} not found when building the loadout.") # Caught by 404 handler
+    return jsonify(loadout)
+
+@app.route('/api/sync', methods=['GET'])
+@jwt_required()
+@etag_from_tables('gear', 'locations')
+def get_sync_api():
+    # Delta sync: the gear and location rows changed (or deleted) since the client's last `seq` and `epoch`.
+    try:
+        since = get_int_query_arg('since', minimum=0)
+        limit = get_int_query_arg('limit', minimum=1)
+    except ValueError as e:
+        return make_error_response(str(e), 400)
+    max_changes = current_app.config['SYNC_MAX_CHANGES']
+    limit = min(limit, max_changes) if limit is not None else max_changes
+    db = get_db()
+    return jsonify(sync_queries.get_changes_since(db, since or 0, limit, request.args.get('epoch')))
+
+@app.route('/api/events/session', methods=['POST'])
+@jwt_required()
+def create_events_session_api():
+    # Hands the caller's access token to GET /api/events in an HttpOnly cookie scoped to that path, with the
+    # token's own lifetime. EventSource sends it on every (re)connect, which a header or a URL parameter can't do
+    # without the token ending up in access logs.
+    token = request.headers['Authorization'].split(None, 1)[1]
+    expires = get_jwt().get('exp')
+    response = current_app.response_class(status=204)
+    response.set_cookie(current_app.config['JWT_ACCESS_COOKIE_NAME'], token,
+                        max_age=max(int(expires - time.time()), 0) if expires else None,
+                        path=current_app.config['EVENTS_COOKIE_PATH'], httponly=True, samesite='Strict',
+                        secure=request.is_secure or request.headers.get('X-Forwarded-Proto') == 'https')
+    return response
+
+@app.route('/api/events', methods=['GET'])
+@jwt_required(locations=['headers', 'cookies']) # Browsers authenticate with the cookie from POST /api/events/session
+def get_events_api():
+    # Server-Sent Events: one `change` event per gear/location row written by any worker, with the row_changes
+    # seq as the event id. Browsers reconnect with Last-Event-ID after EVENTS_STREAM_MAX_SECONDS and get what they
+    # missed replayed; a `resync` event means too much was missed and the client should call GET /api/sync.
+    # This route holds a worker thread per open stream; asgi.py serves the same stream without one (see asgi.py).
+    # Unless EVENTS_WSGI_STREAMS is set it answers 204 No Content, on which EventSource stops reconnecting.
+    if not current_app.config['EVENTS_WSGI_STREAMS']:
+        return '', 204
+    after_seq = events.parse_last_event_id(request.headers.get('Last-Event-ID', request.args.get('last_event_id')))
+    feed = get_change_feed()
+    wakeup = threading.Event()
+    subscriber = events.Subscriber(wakeup.set)
+    token, first = events.open_stream(feed, get_db(), subscriber, after_seq, current_app.config)
+    close_db() # Return the pooled connection now rather than when the stream ends
+    response = Response(events.stream_events_sync(feed, token, subscriber, wakeup, first, current_app.config),
+                        mimetype=events.EVENT_STREAM_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Tell nginx not to buffer the stream
+    return response
+
+def get_change_feed():
+    return events.get_change_feed(get_db_path(), current_app.config['EVENTS_POLL_INTERVAL'])
+
+def authenticate_event_stream(token: str) -> bool:
+    """Whether token is a valid access token for an existing user; used by the ASGI event stream endpoint."""
+    with app.app_context():
+        try:
+            jwt_data = decode_token(token)
+        except Exception: # Expired, malformed or wrongly signed
+            return False
+        return jwt_data.get('type') == 'access' and user_lookup_callback(None, jwt_data) is not None
+
+@app.route('/api/db/pool', methods=['GET'])
+@jwt_required()
+def get_db_pool_stats_api():
+    # Stats are per worker process; each gunicorn worker has its own pool.
+    pool = get_existing_pool(get_db_path())
+    return jsonify(pool.stats() if pool else {}), 200
+
+@app.route('/api/db/writer', methods=['GET'])
+@jwt_required()
+def get_db_writer_stats_api():
+    # Group commit statistics of this worker's write queue (empty unless KITBOX_WRITE_QUEUE is enabled).
+    writer = get_existing_writer(get_db_path())
+    return jsonify(writer.stats() if writer else {}), 200
+
+@app.route('/api/auth/hasher', methods=['GET'])
+@jwt_required()
+def get_password_hasher_stats_api():
+    # Queue depth and timings of this worker's password hashing pool.
+    return jsonify(password_hasher.stats()), 200
+
+@app.route('/api/db/cache', methods=['GET'])
+@jwt_required()
+def get_read_cache_stats_api():
+    # Like the pool, the caches belong to the worker process serving the request.
+    return jsonify({**read_cache.stats(), "users": user_queries.user_cache.stats()}), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics_api():
+    # Prometheus scrape target with this worker's per-route histograms. Disabled unless KITBOX_METRICS_ENABLED is set.
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404, description="Metrics are disabled.")
+    return Response(instrumentation.route_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/api/test')
 def api_test():
@@ -524,6 +1321,10 @@ if not app.config['DEBUG']:
     # For simplicity, basicConfig is used here.
     logging.basicConfig(level=logging.INFO,
                         format='%(asctime)s %(levelname)s %(name)s %(process)d %(threadName)s : %(message)s')
+    if app.config['LOG_FORMAT'].lower() == 'json':
+        # One JSON object per line; request records carry their timings as fields (see finish_request_instrumentation).
+        for handler in logging.getLogger().handlers:
+            handler.setFormatter(instrumentation.JSONLogFormatter())
 else:
     # When DEBUG is True, Flask's default logger is usually quite good (logs to console at DEBUG level).
     # You can still customize it if needed.
@@ -534,7 +1335,7 @@ else:
 
 if __name__ == '__main__':
     with app.app_context(): 
-        init_db() 
+        migrate_db() 
     # Use DEBUG from app.config for app.run(), accessed via current_app
     app.run(debug=current_app.config['DEBUG'], port=5000)
 
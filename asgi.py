@@ -0,0 +1,24 @@
+# ASGI entry point: serves the same Flask app from an async server, e.g.
+#     uvicorn asgi:app --workers 4 --port 5000
+# Connections are handled by the server's event loop; requests run on a per-process thread pool.
+# GET /api/events is served natively on the event loop, so open event streams don't hold one of those threads.
+import sqlite3
+
+from app import app as flask_app, authenticate_event_stream, get_change_feed, get_db_path
+from src.asgi_adapter import WSGIToASGI
+from src.events import EventStreamEndpoint, PathRouter
+
+
+def _open_db():
+    with flask_app.app_context():
+        return sqlite3.connect(get_db_path(), check_same_thread=False)
+
+
+def _feed():
+    with flask_app.app_context():
+        return get_change_feed()
+
+
+app = PathRouter(WSGIToASGI(flask_app, threads=flask_app.config['ASGI_THREADS']), {
+    '/api/events': EventStreamEndpoint(authenticate_event_stream, _open_db, _feed, flask_app.config),
+})
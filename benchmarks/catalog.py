@@ -0,0 +1,129 @@
+import os
+import random
+import shutil
+import sqlite3
+from typing import Dict, List
+
+from src.database import migrate
+from src.data_access import location_queries
+
+CATEGORIES = ('Adventuring Gear', 'Ammunition', 'Armor', 'Cyberware', 'Magical Gadget', 'Tech Armor', 'Tech Gear', 'Weapon')
+LEGALITY = ('Legal', 'Restricted', 'Illegal', None)
+ADJECTIVES = ('Steel', 'Leather', 'Mana-Tech', 'Rusty', 'Polished', 'Ghost', 'Neural', 'Heavy', 'Compact', 'Elven')
+NOUNS = ('Helmet', 'Dagger', 'Rope', 'Lantern', 'Jerkin', 'Wand', 'Rations', 'Visor', 'Quiver', 'Toolkit', 'Bedroll', 'Flask')
+
+# Gear rows per character. Each character is a top-level body slot with nested containers:
+# Character -> 4 packs -> 3 pouches each, i.e. 17 locations (3 levels deep) per character.
+GEAR_PER_CHARACTER = 1000
+PACKS_PER_CHARACTER = 4
+POUCHES_PER_PACK = 3
+UNPLACED_SHARE = 0.1 # Share of gear rows without a location
+
+_INSERT_BATCH = 10000
+
+
+def parse_size(text: str) -> int:
+    """Parses a catalog size like '10k', '1M' or '2500'."""
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def catalog_path(data_dir: str, gear_rows: int, seed: int) -> str:
+    return os.path.join(data_dir, f"catalog_{gear_rows}_seed{seed}.db")
+
+
+def _create_locations(conn: sqlite3.Connection, characters: int) -> List[int]:
+    """Inserts the location tree and returns the ids of every location gear can be placed in."""
+    location_ids = []
+    for c in range(characters):
+        character_id = conn.execute(
+            "INSERT INTO locations (name, type) VALUES (?, 'Body Slot')", (f"Character {c}",)
+        ).lastrowid
+        location_ids.append(character_id)
+        for p in range(PACKS_PER_CHARACTER):
+            pack_id = conn.execute(
+                "INSERT INTO locations (name, type, parent_id) VALUES (?, 'Container', ?)", (f"Pack {c}.{p}", character_id)
+            ).lastrowid
+            location_ids.append(pack_id)
+            for q in range(POUCHES_PER_PACK):
+                location_ids.append(conn.execute(
+                    "INSERT INTO locations (name, type, parent_id) VALUES (?, 'Container', ?)", (f"Pouch {c}.{p}.{q}", pack_id)
+                ).lastrowid)
+    return location_ids
+
+
+def _gear_rows(rng: random.Random, count: int, location_ids: List[int]):
+    for i in range(count):
+        cost = round(rng.uniform(0.5, 5000.0), 2)
+        yield (
+            f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+            f"Synthetic benchmark item {i}" if rng.random() < 0.7 else None,
+            round(rng.uniform(0.1, 25.0), 2),
+            cost,
+            round(cost * rng.uniform(0.5, 1.0), 2),
+            rng.choice(LEGALITY),
+            rng.choice(CATEGORIES),
+            None if rng.random() < UNPLACED_SHARE else rng.choice(location_ids),
+        )
+
+
+def build_catalog(path: str, gear_rows: int, seed: int = 1) -> None:
+    """
+    Creates a synthetic database at `path` from the application's schema migrations (without seed.sql):
+    gear_rows gear items spread over a nested location tree. The same size and seed give the same data.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        migrate.migrate(conn)
+        location_ids = _create_locations(conn, max(1, gear_rows // GEAR_PER_CHARACTER))
+        location_queries.rebuild_location_closure(conn)
+        rows = _gear_rows(rng, gear_rows, location_ids)
+        while True:
+            batch = [row for _, row in zip(range(_INSERT_BATCH), rows)]
+            if not batch:
+                break
+            conn.executemany(
+                "INSERT INTO gear (name, description, weight, cost, value, legality, category, location_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                batch
+            )
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
+def prepare_catalog(data_dir: str, work_path: str, gear_rows: int, seed: int = 1) -> None:
+    """
+    Copies the catalog for (gear_rows, seed) to work_path, building and keeping it in data_dir first if needed,
+    so benchmarks that write start from identical data on every run. A kept catalog is migrated to the current
+    schema first.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    template = catalog_path(data_dir, gear_rows, seed)
+    if not os.path.exists(template):
+        build_catalog(template + '.tmp', gear_rows, seed)
+        os.replace(template + '.tmp', template)
+    else:
+        conn = sqlite3.connect(template)
+        try:
+            migrate.migrate(conn) # Closing the last connection checkpoints the WAL into the file copied below
+        finally:
+            conn.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(work_path + suffix):
+            os.remove(work_path + suffix)
+    shutil.copyfile(template, work_path)
+
+
+def describe_catalog(conn: sqlite3.Connection) -> Dict[str, int]:
+    return {
+        "gear": conn.execute("SELECT COUNT(*) FROM gear").fetchone()[0],
+        "locations": conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0],
+    }
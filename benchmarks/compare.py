@@ -0,0 +1,55 @@
+"""
+Compares two benchmark result files written by benchmarks.run, case by case.
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json --threshold 10
+
+Exits with status 1 if any case's p50 latency got slower by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(before: dict, after: dict, metric: str = "p50_ms"):
+    """Yields (size, phase, case, before value, after value, change in percent) for cases present in both."""
+    for size, phases in after["sizes"].items():
+        for phase, cases in phases.items():
+            if phase == "catalog":
+                continue
+            old_cases = before["sizes"].get(size, {}).get(phase, {})
+            for case, stats in cases.items():
+                if case not in old_cases:
+                    continue
+                old, new = old_cases[case][metric], stats[metric]
+                change = (new - old) / old * 100 if old else 0.0
+                yield size, phase, case, old, new, change
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two KitBox benchmark result files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--metric", default="p50_ms", choices=("mean_ms", "p50_ms", "p99_ms", "max_ms"))
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown reported as a regression (default: 10)")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    regressions = 0
+    print(f"{'size':>8}  {'phase':<6} {'case':<48} {'before':>10} {'after':>10} {'change':>8}")
+    for size, phase, case, old, new, change in compare(before, after, args.metric):
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{size:>8}  {phase:<6} {case:<48} {old:>10.3f} {new:>10.3f} {change:>+7.1f}%{flag}")
+    if regressions:
+        print(f"{regressions} case(s) regressed by more than {args.threshold}% ({args.metric})")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
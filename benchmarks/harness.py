@@ -0,0 +1,82 @@
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from app import app
+from src.database.pool import dispose_pool
+from src.database.writer import dispose_writer
+from src.data_access import user_queries
+from src.data_access.read_cache import read_cache
+
+
+def summarize(durations: List[float], elapsed: Optional[float] = None) -> Dict[str, float]:
+    """Latency percentiles (in milliseconds) and throughput for a list of per-call durations in seconds."""
+    ordered = sorted(durations)
+    count = len(ordered)
+
+    def percentile(p):
+        return ordered[min(count - 1, max(0, math.ceil(p / 100 * count) - 1))] * 1000
+
+    elapsed = elapsed if elapsed is not None else sum(ordered)
+    return {
+        "count": count,
+        "mean_ms": round(sum(ordered) / count * 1000, 4),
+        "p50_ms": round(percentile(50), 4),
+        "p99_ms": round(percentile(99), 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "ops_per_sec": round(count / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def measure(func: Callable[[int], object], iterations: int, max_seconds: float, warmup: int = 1) -> Dict[str, float]:
+    """
+    Calls func(i) up to `iterations` times (after `warmup` untimed calls), stopping early once max_seconds have
+    been spent so that slow cases at large catalog sizes still finish. At least one call is always timed.
+    """
+    for i in range(warmup):
+        func(i)
+    durations = []
+    started = time.perf_counter()
+    for i in range(warmup, warmup + iterations):
+        call_started = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - call_started)
+        if time.perf_counter() - started >= max_seconds:
+            break
+    return summarize(durations, time.perf_counter() - started)
+
+
+def _reset_caches() -> None:
+    read_cache.clear()
+    user_queries.user_cache.clear() # User ids are reused between databases
+
+
+@contextmanager
+def use_database(db_path: str, read_cache_enabled: bool, write_queue_enabled: bool = False):
+    """
+    Points the application at db_path for the duration of the block (in an app context), with the worker's
+    read cache and write queue enabled or disabled and info logging muted, and restores the previous settings
+    afterwards.
+    """
+    saved_filename = app.config['DATABASE_FILENAME']
+    saved_write_queue = app.config['WRITE_QUEUE_ENABLED']
+    saved_cache = (read_cache.max_entries, read_cache.ttl_seconds)
+    saved_log_level = app.logger.level
+    app.logger.setLevel(logging.WARNING) # Per-request info logging would dominate the timings
+    app.config['DATABASE_FILENAME'] = db_path # Absolute, so it isn't joined to app.root_path
+    app.config['WRITE_QUEUE_ENABLED'] = write_queue_enabled
+    read_cache.configure(saved_cache[0] if read_cache_enabled else 0, saved_cache[1])
+    _reset_caches()
+    try:
+        with app.app_context():
+            yield app
+    finally:
+        dispose_writer(db_path)
+        dispose_pool(db_path)
+        app.config['DATABASE_FILENAME'] = saved_filename
+        app.config['WRITE_QUEUE_ENABLED'] = saved_write_queue
+        read_cache.configure(*saved_cache)
+        app.logger.setLevel(saved_log_level)
+        _reset_caches()
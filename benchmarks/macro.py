@@ -0,0 +1,91 @@
+from typing import Callable, Dict, NamedTuple, Optional
+
+from .harness import measure
+from .micro import BenchContext, HEAVY_ITERATIONS
+
+# Macro-benchmarks: HTTP routes through Flask's test client, so routing, JWT checks, validation,
+# serialization and the data-access layer are all included. Requests are sent one at a time.
+
+BENCH_USERNAME = "bench_http_user"
+BENCH_PASSWORD = "password123"
+
+
+class Route(NamedTuple):
+    name: str # e.g. 'GET /api/gear/<id>'
+    method: str
+    path: Callable # path(ctx, arg) -> URL
+    body: Optional[Callable] = None # body(ctx, arg) -> JSON body
+    prepare: Optional[Callable] = None # prepare(client, headers, ctx, count) -> one untimed argument per request
+    heavy: bool = False # Whole-catalog responses: no warm-up request and at most HEAVY_ITERATIONS requests
+    authenticated: bool = True
+
+
+def _new_gear(client, headers, ctx, count):
+    return [client.post('/api/gear', json={"name": f"bench doomed {i}", "weight": 1.0}, headers=headers).get_json()["id"]
+            for i in range(count)]
+
+
+ROUTES = [
+    Route("POST /api/auth/login", "POST", lambda ctx, i: "/api/auth/login",
+          lambda ctx, i: {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}, authenticated=False),
+    Route("GET /api/gear?limit=100", "GET", lambda ctx, i: f"/api/gear?limit=100&after={ctx.gear_id()}"),
+    Route("GET /api/gear?limit=100&locations=map", "GET", lambda ctx, i: f"/api/gear?limit=100&locations=map&after={ctx.gear_id()}"),
+    Route("GET /api/gear?limit=100&fields=", "GET", lambda ctx, i: f"/api/gear?limit=100&fields=id,name,weight&after={ctx.gear_id()}"),
+    Route("GET /api/gear?format=ndjson&limit=1000", "GET", lambda ctx, i: f"/api/gear?format=ndjson&limit=1000&after={ctx.gear_id()}"),
+    Route("GET /api/gear?search=", "GET", lambda ctx, i: f"/api/gear?search={('hel', 'steel dagger', 'rope', 'lan')[i % 4]}"),
+    Route("GET /api/gear?category=", "GET", lambda ctx, i: "/api/gear?category=Armor", heavy=True), # Streamed, unpaginated
+    Route("GET /api/gear/export", "GET", lambda ctx, i: "/api/gear/export?format=ndjson", heavy=True),
+    Route("GET /api/gear/<id>", "GET", lambda ctx, i: f"/api/gear/{ctx.gear_id()}"),
+    Route("POST /api/gear", "POST", lambda ctx, i: "/api/gear",
+          lambda ctx, i: {"name": f"bench http {i}", "weight": 1.5, "category": "Bench", "location_id": ctx.pouch()}),
+    Route("PUT /api/gear/<id>", "PUT", lambda ctx, i: f"/api/gear/{ctx.gear_id()}",
+          lambda ctx, i: {"name": f"bench renamed {i}", "weight": 2.0}),
+    Route("PATCH /api/gear/<id>", "PATCH", lambda ctx, i: f"/api/gear/{ctx.gear_id()}", lambda ctx, i: {"weight": 3.0}),
+    Route("DELETE /api/gear/<id>", "DELETE", lambda ctx, gear_id: f"/api/gear/{gear_id}", prepare=_new_gear),
+    Route("PATCH /api/gear/batch", "PATCH", lambda ctx, i: "/api/gear/batch",
+          lambda ctx, i: {"ids": ctx.gear_ids(50), "location_id": ctx.pouch()}),
+    Route("POST /api/gear/bulk", "POST", lambda ctx, i: "/api/gear/bulk",
+          lambda ctx, i: [{"name": f"bench bulk {i}.{j}", "weight": 1.0} for j in range(100)]),
+    Route("GET /api/sync?since=", "GET", lambda ctx, i: f"/api/sync?since={ctx.recent_seq}"),
+    Route("GET /api/locations", "GET", lambda ctx, i: "/api/locations?type=Body Slot"),
+    Route("GET /api/locations/<id>", "GET", lambda ctx, i: f"/api/locations/{ctx.pouch()}"),
+    Route("GET /api/locations/<id>/items", "GET", lambda ctx, i: f"/api/locations/{ctx.pouch()}/items"),
+    Route("GET /api/locations/<id>/totals", "GET", lambda ctx, i: f"/api/locations/{ctx.character()}/totals"),
+    Route("GET /api/loadout?root=", "GET", lambda ctx, i: f"/api/loadout?root={ctx.character()}"),
+    Route("POST /api/locations", "POST", lambda ctx, i: "/api/locations",
+          lambda ctx, i: {"name": f"bench http location {i}", "type": "Container", "parent_id": ctx.pouch()}),
+    Route("PATCH /api/locations/<id>", "PATCH", lambda ctx, i: f"/api/locations/{ctx.pouch()}",
+          lambda ctx, i: {"type": "Container" if i % 2 else "Generic"}),
+]
+
+
+def run_macro(app, db, iterations: int, max_seconds: float, seed: int = 1, only: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Sends each route's requests through the test client and returns {route name: latency/throughput summary}.
+    Every response must succeed; a failing route raises, since its timings would be meaningless.
+    """
+    ctx = BenchContext(db, seed)
+    client = app.test_client()
+    client.post('/api/auth/register', json={"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+    token = client.post('/api/auth/login', json={"username": BENCH_USERNAME, "password": BENCH_PASSWORD}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    results = {}
+    for route in ROUTES:
+        if only and only not in route.name:
+            continue
+        count = min(iterations, HEAVY_ITERATIONS) if route.heavy else iterations
+        warmup = 0 if route.heavy else 1
+        args = route.prepare(client, headers, ctx, count + warmup) if route.prepare else range(count + warmup)
+
+        def send(i, route=route):
+            arg = args[i]
+            response = client.open(route.path(ctx, arg), method=route.method,
+                                   json=route.body(ctx, arg) if route.body else None,
+                                   headers=headers if route.authenticated else None)
+            response.get_data() # Consume streamed bodies
+            if response.status_code >= 400:
+                raise RuntimeError(f"{route.name} failed with {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+        results[route.name] = measure(send, count, max_seconds, warmup=warmup)
+    return results
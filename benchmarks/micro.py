@@ -0,0 +1,145 @@
+import inspect
+import random
+import sqlite3
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from app import GearCreate, GearUpdate, LocationCreate, LocationUpdate, UserCreate # Import Pydantic models
+from src.data_access import gear_queries, location_queries, user_queries, change_tracking, sync_queries
+from .harness import measure
+
+# Micro-benchmarks: every public data-access function, called directly on a pooled connection.
+
+DATA_ACCESS_MODULES = (gear_queries, location_queries, user_queries, change_tracking, sync_queries)
+
+SEARCH_TERMS = ("hel*", "steel dagger", "mana*", "rope", "ghost suit", "lan*")
+
+
+class BenchContext:
+    """Ids to run the cases against, read from the catalog once, plus a seeded random source."""
+
+    def __init__(self, db: sqlite3.Connection, seed: int):
+        self.rng = random.Random(seed)
+        self.max_gear_id = db.execute("SELECT MAX(id) FROM gear").fetchone()[0] or 0
+        self.characters = [row[0] for row in db.execute("SELECT id FROM locations WHERE parent_id IS NULL ORDER BY id")]
+        self.pouches = [row[0] for row in db.execute(
+            "SELECT descendant_id FROM location_closure WHERE depth = 2 ORDER BY descendant_id"
+        )]
+        self.user = user_queries.create_user(db, UserCreate(username="bench_user", password="password123"))
+        self.user_password_hash = user_queries.get_user_row_by_username(db, self.user.username)['password_hash']
+        # A delta sync cursor a couple of hundred changes behind the catalog as built.
+        self.recent_seq = max(0, db.execute("SELECT COALESCE(MAX(seq), 0) FROM row_changes").fetchone()[0] - 200)
+
+    def gear_id(self) -> int:
+        return self.rng.randint(1, self.max_gear_id)
+
+    def gear_ids(self, count: int) -> List[int]:
+        return [self.gear_id() for _ in range(count)]
+
+    def character(self) -> int:
+        return self.rng.choice(self.characters)
+
+    def pouch(self) -> int:
+        return self.rng.choice(self.pouches)
+
+
+class Case(NamedTuple):
+    name: str # Qualified function name, e.g. 'gear_queries.get_gear_by_id'
+    run: Callable # run(db, ctx, arg); arg is the iteration number, or the prepared value for that iteration
+    prepare: Optional[Callable] = None # prepare(db, ctx, count) -> one untimed argument per iteration
+    heavy: bool = False # Whole-table operations: no warm-up call and at most HEAVY_ITERATIONS calls
+
+
+HEAVY_ITERATIONS = 3
+
+
+def _new_gear(db, ctx, count):
+    return [gear_queries.create_gear(db, GearCreate(name=f"bench doomed {i}", weight=1.0, location_id=ctx.pouch())).id
+            for i in range(count)]
+
+
+def _new_locations(db, ctx, count):
+    return [location_queries.create_location(db, LocationCreate(name=f"bench doomed {i}", type="Container",
+                                                                  parent_id=ctx.pouch())).id
+            for i in range(count)]
+
+
+CASES = [
+    Case("gear_queries.create_gear", lambda db, ctx, i: gear_queries.create_gear(
+        db, GearCreate(name=f"bench new {i}", weight=1.0, category="Bench", location_id=ctx.pouch()))),
+    Case("gear_queries.bulk_write_gear", lambda db, ctx, i: gear_queries.bulk_write_gear(
+        db, [[(None, GearCreate(name=f"bench bulk {i}.{j}", weight=1.0)) for j in range(100)]])),
+    Case("gear_queries.get_gear_by_id", lambda db, ctx, i: gear_queries.get_gear_by_id(db, ctx.gear_id())),
+    Case("gear_queries.get_gear_by_ids", lambda db, ctx, i: gear_queries.get_gear_by_ids(db, ctx.gear_ids(50))),
+    Case("gear_queries.gear_row_to_dict", lambda db, ctx, i: [gear_queries.gear_row_to_dict(row) for row in db.execute(
+        gear_queries._GEAR_WITH_LOCATION_SELECT + " WHERE g.id > ? ORDER BY g.id LIMIT 100", (ctx.gear_id(),))]),
+    Case("gear_queries.gear_row_to_flat_dict", lambda db, ctx, i: [gear_queries.gear_row_to_flat_dict(row) for row in db.execute(
+        gear_queries._GEAR_SELECT + " WHERE g.id > ? ORDER BY g.id LIMIT 100", (ctx.gear_id(),))]),
+    Case("gear_queries.project_gear_fields", lambda db, ctx, i: list(gear_queries.iter_gear(
+        db, None, "Armor", after_id=ctx.gear_id(), limit=1000, fields=("id", "name", "weight")))),
+    Case("gear_queries.iter_gear", lambda db, ctx, i: list(gear_queries.iter_gear(
+        db, None, "Armor", after_id=ctx.gear_id(), limit=1000))),
+    Case("gear_queries.get_gear_page", lambda db, ctx, i: gear_queries.get_gear_page(db, None, None, ctx.gear_id(), 100)),
+    Case("gear_queries.build_search_query", lambda db, ctx, i: gear_queries.build_search_query(SEARCH_TERMS[i % len(SEARCH_TERMS)])),
+    Case("gear_queries.search_gear", lambda db, ctx, i: gear_queries.search_gear(db, SEARCH_TERMS[i % len(SEARCH_TERMS)])),
+    Case("gear_queries.get_all_gear", lambda db, ctx, i: gear_queries.get_all_gear(db, None, "Armor"), heavy=True),
+    Case("gear_queries.update_gear", lambda db, ctx, i: gear_queries.update_gear(db, ctx.gear_id(), GearUpdate(weight=float(i % 50)))),
+    Case("gear_queries.update_gear_batch", lambda db, ctx, i: gear_queries.update_gear_batch(
+        db, [(gear_id, GearUpdate(weight=2.0)) for gear_id in ctx.gear_ids(50)])),
+    Case("gear_queries.move_gear", lambda db, ctx, i: gear_queries.move_gear(db, ctx.gear_ids(50), ctx.pouch())),
+    Case("gear_queries.delete_gear", lambda db, ctx, gear_id: gear_queries.delete_gear(db, gear_id), prepare=_new_gear),
+    Case("gear_queries.rebuild_search_index", lambda db, ctx, i: gear_queries.rebuild_search_index(db), heavy=True),
+    Case("location_queries.create_location", lambda db, ctx, i: location_queries.create_location(
+        db, LocationCreate(name=f"bench location {i}", type="Container", parent_id=ctx.pouch()))),
+    Case("location_queries.get_location_by_id", lambda db, ctx, i: location_queries.get_location_by_id(db, ctx.pouch())),
+    Case("location_queries.get_location_ids", lambda db, ctx, i: location_queries.get_location_ids(db)),
+    Case("location_queries.get_all_locations", lambda db, ctx, i: location_queries.get_all_locations(db, None, "Body Slot")),
+    Case("location_queries.is_descendant", lambda db, ctx, i: location_queries.is_descendant(db, ctx.pouch(), ctx.character())),
+    Case("location_queries.get_location_subtree", lambda db, ctx, i: location_queries.get_location_subtree(db, ctx.character())),
+    Case("location_queries.get_location_totals", lambda db, ctx, i: location_queries.get_location_totals(db, ctx.character())),
+    Case("location_queries.get_locations_by_ids", lambda db, ctx, i: location_queries.get_locations_by_ids(
+        db, [ctx.pouch() for _ in range(20)])),
+    Case("location_queries.get_items_in_location", lambda db, ctx, i: location_queries.get_items_in_location(db, ctx.pouch())),
+    Case("location_queries.get_loadout", lambda db, ctx, i: location_queries.get_loadout(db, ctx.character())),
+    Case("location_queries.update_location", lambda db, ctx, i: location_queries.update_location(
+        db, ctx.pouch(), LocationUpdate(type="Container" if i % 2 else "Generic"))),
+    Case("location_queries.delete_location", lambda db, ctx, location_id: location_queries.delete_location(db, location_id),
+         prepare=_new_locations),
+    Case("location_queries.rebuild_location_closure", lambda db, ctx, i: location_queries.rebuild_location_closure(db), heavy=True),
+    Case("sync_queries.get_changes_since", lambda db, ctx, i: sync_queries.get_changes_since(db, ctx.recent_seq, 1000)),
+    Case("change_tracking.check_row_version", lambda db, ctx, i: change_tracking.check_row_version(
+        db, "gear", 0, 1)), # The lookup after a conditional write matched no row (ids start at 1)
+    Case("change_tracking.get_table_versions", lambda db, ctx, i: change_tracking.get_table_versions(db, change_tracking.TRACKED_TABLES)),
+    Case("user_queries.create_user", lambda db, ctx, i: user_queries.create_user(
+        db, UserCreate(username=f"bench_user_{i}", password="password123"))), # Dominated by password hashing
+    Case("user_queries.get_user_row_by_username", lambda db, ctx, i: user_queries.get_user_row_by_username(db, ctx.user.username)),
+    Case("user_queries.update_password_hash", lambda db, ctx, i: user_queries.update_password_hash(
+        db, ctx.user.id, ctx.user_password_hash)),
+    Case("user_queries.get_user_by_id", lambda db, ctx, i: user_queries.get_user_by_id(db, ctx.user.id)),
+]
+
+
+def uncovered_functions() -> set:
+    """Public data-access functions without a Case; new query functions should get one."""
+    public_functions = {
+        f"{module.__name__.rsplit('.', 1)[-1]}.{name}"
+        for module in DATA_ACCESS_MODULES
+        for name, func in inspect.getmembers(module, inspect.isfunction)
+        if not name.startswith("_") and func.__module__ == module.__name__
+    }
+    return public_functions - {case.name for case in CASES}
+
+
+def run_micro(db: sqlite3.Connection, iterations: int, max_seconds: float, seed: int = 1,
+              only: Optional[str] = None) -> Dict[str, dict]:
+    """Runs every case (or those whose name contains `only`) and returns {case name: latency summary}."""
+    ctx = BenchContext(db, seed)
+    results = {}
+    for case in CASES:
+        if only and only not in case.name:
+            continue
+        count = min(iterations, HEAVY_ITERATIONS) if case.heavy else iterations
+        warmup = 0 if case.heavy else 1
+        args = case.prepare(db, ctx, count + warmup) if case.prepare else range(count + warmup)
+        results[case.name] = measure(lambda i: case.run(db, ctx, args[i]), count, max_seconds, warmup=warmup)
+        db.commit() # The rebuild functions leave committing to their caller
+    return results
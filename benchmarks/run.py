@@ -0,0 +1,112 @@
+"""
+Benchmarks the data-access layer (micro) and the HTTP routes (macro) against synthetic catalogs.
+
+    python -m benchmarks.run --sizes 10k,100k,1M --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Catalogs are built once per size and seed in --data-dir and copied before each phase, so every run
+starts from the same data.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+
+from app import get_db
+from .catalog import describe_catalog, parse_size, prepare_catalog
+from .harness import use_database
+from .macro import run_macro
+from .micro import run_micro, uncovered_functions
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCHMARKS_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, phases=("micro", "macro"), iterations=200, max_seconds=10.0, seed=1,
+                   data_dir=None, read_cache_enabled=False, write_queue_enabled=False, only=None, log=print):
+    """Runs the selected phases for every catalog size and returns the results document."""
+    data_dir = data_dir or os.path.join(BENCHMARKS_DIR, 'data')
+    work_path = os.path.join(os.path.abspath(data_dir), 'work.db')
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "max_seconds": max_seconds,
+            "seed": seed,
+            "read_cache": read_cache_enabled,
+            "write_queue": write_queue_enabled,
+        },
+        "sizes": {},
+    }
+    for size in sizes:
+        size_results = {}
+        for phase in phases:
+            log(f"[{size} gear rows] preparing catalog for {phase} benchmarks")
+            prepare_catalog(data_dir, work_path, size, seed)
+            with use_database(work_path, read_cache_enabled, write_queue_enabled) as app:
+                db = get_db()
+                size_results.setdefault("catalog", describe_catalog(db))
+                log(f"[{size} gear rows] running {phase} benchmarks")
+                if phase == "micro":
+                    size_results[phase] = run_micro(db, iterations, max_seconds, seed, only)
+                else:
+                    size_results[phase] = run_macro(app, db, iterations, max_seconds, seed, only)
+        results["sizes"][str(size)] = size_results
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(work_path + suffix):
+            os.remove(work_path + suffix)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the KitBox data-access layer and API routes.")
+    parser.add_argument("--sizes", default="10k,100k,1M", help="Comma-separated gear row counts (default: 10k,100k,1M)")
+    parser.add_argument("--phases", default="micro,macro", help="micro, macro or both (default: micro,macro)")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per case (default: 200)")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="Time budget per case (default: 10)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the catalog and the ids queried (default: 1)")
+    parser.add_argument("--only", help="Only run cases whose name contains this text")
+    parser.add_argument("--read-cache", action="store_true", help="Keep the per-worker read cache enabled")
+    parser.add_argument("--write-queue", action="store_true", help="Send HTTP writes through the group-commit write queue")
+    parser.add_argument("--data-dir", help="Where generated catalogs are kept (default: benchmarks/data)")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+    phases = [phase.strip() for phase in args.phases.split(',')]
+    if not set(phases) <= {"micro", "macro"}:
+        parser.error("--phases must list 'micro' and/or 'macro'")
+
+    missing = uncovered_functions()
+    if missing:
+        print(f"Warning: no micro-benchmark for {', '.join(sorted(missing))}", file=sys.stderr)
+
+    results = run_benchmarks(
+        [parse_size(size) for size in args.sizes.split(',')],
+        phases=phases,
+        iterations=args.iterations, max_seconds=args.max_seconds, seed=args.seed,
+        data_dir=args.data_dir, read_cache_enabled=args.read_cache, write_queue_enabled=args.write_queue,
+        only=args.only,
+    )
+    output = args.output or os.path.join(BENCHMARKS_DIR, 'results', time.strftime("%Y%m%d-%H%M%S") + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Wrote {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -20,11 +20,96 @@ class Config:
     # Just the filename, the full path will be constructed in app.py using app.root_path
     DATABASE_FILENAME = os.environ.get('KITBOX_DATABASE_FILENAME', 'kitbox.db')
 
+    # SQLite connection pool (one pool per worker process)
+    # DB_POOL_SIZE is the number of idle connections kept open for reuse.
+    DB_POOL_SIZE = int(os.environ.get('KITBOX_DB_POOL_SIZE', '8'))
+    # PRAGMAs applied once to every pooled connection.
+    SQLITE_JOURNAL_MODE = os.environ.get('KITBOX_SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('KITBOX_SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KIB = int(os.environ.get('KITBOX_SQLITE_CACHE_SIZE_KIB', '16384')) # Page cache per connection
+    SQLITE_MMAP_SIZE = int(os.environ.get('KITBOX_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))) # Bytes; 0 disables mmap
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('KITBOX_SQLITE_BUSY_TIMEOUT_MS', '5000')) # Wait this long on a locked database
+
     # JWT Secret Key
     # IMPORTANT: This is a default development key.
     # CHANGE THIS IN PRODUCTION to a strong, random, and secret key.
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-default-dev-jwt-secret-key-CHANGE-THIS-IN-PROD')
 
+    # Gear listing pagination
+    # Page size used by GET /api/gear when `after` is given without `limit`, and the largest `limit` accepted.
+    GEAR_PAGE_DEFAULT_LIMIT = int(os.environ.get('KITBOX_GEAR_PAGE_DEFAULT_LIMIT', '100'))
+    GEAR_PAGE_MAX_LIMIT = int(os.environ.get('KITBOX_GEAR_PAGE_MAX_LIMIT', '1000'))
+
+    # Number of ranked results GET /api/gear?search=... returns when no `limit` is given.
+    GEAR_SEARCH_DEFAULT_LIMIT = int(os.environ.get('KITBOX_GEAR_SEARCH_DEFAULT_LIMIT', '50'))
+
+    # Most changes one GET /api/sync response returns; clients follow `has_more` for the rest.
+    SYNC_MAX_CHANGES = int(os.environ.get('KITBOX_SYNC_MAX_CHANGES', '1000'))
+
+    # Server-Sent Events (GET /api/events): how often each worker checks for new changes, the keep-alive comment
+    # interval, how long one stream stays open before the client reconnects with Last-Event-ID, the reconnect delay
+    # suggested to clients, and the most missed changes replayed on reconnect before sending a `resync` event.
+    EVENTS_POLL_INTERVAL = float(os.environ.get('KITBOX_EVENTS_POLL_INTERVAL', '0.5'))
+    EVENTS_KEEPALIVE_SECONDS = float(os.environ.get('KITBOX_EVENTS_KEEPALIVE_SECONDS', '15'))
+    EVENTS_STREAM_MAX_SECONDS = float(os.environ.get('KITBOX_EVENTS_STREAM_MAX_SECONDS', '300'))
+    EVENTS_RETRY_MS = int(os.environ.get('KITBOX_EVENTS_RETRY_MS', '2000'))
+    EVENTS_REPLAY_LIMIT = int(os.environ.get('KITBOX_EVENTS_REPLAY_LIMIT', '1000'))
+
+    # Serve GET /api/events from the WSGI app (gunicorn) too. Each open stream then holds a sync worker (or thread)
+    # for up to EVENTS_STREAM_MAX_SECONDS, so this is off by default and the WSGI route answers 204 No Content,
+    # which makes browsers stop reconnecting. The ASGI mode (asgi.py) always serves streams, without a thread each.
+    EVENTS_WSGI_STREAMS = os.environ.get('KITBOX_EVENTS_WSGI_STREAMS', 'False').lower() == 'true'
+
+    # EventSource can't send an Authorization header, so POST /api/events/session puts the access token in this
+    # HttpOnly cookie, sent only to GET /api/events: the token stays out of URLs and so out of access logs.
+    JWT_ACCESS_COOKIE_NAME = 'kitbox_events'
+    EVENTS_COOKIE_PATH = '/api/events'
+
+    # Bulk gear import: rows validated (and written with one executemany()) per batch.
+    BULK_IMPORT_BATCH_SIZE = int(os.environ.get('KITBOX_BULK_IMPORT_BATCH_SIZE', '1000'))
+
+    # Largest number of items accepted by one PATCH /api/gear/batch request.
+    GEAR_BATCH_MAX_ITEMS = int(os.environ.get('KITBOX_GEAR_BATCH_MAX_ITEMS', '1000'))
+
+    # Single-writer queue: run gear/location writes on one writer thread per worker, committing the writes queued
+    # together in one transaction (group commit) of at most WRITE_QUEUE_MAX_BATCH writes. A write the writer thread
+    # hasn't started within WRITE_QUEUE_TIMEOUT seconds is dropped and its request fails.
+    WRITE_QUEUE_ENABLED = os.environ.get('KITBOX_WRITE_QUEUE', 'False').lower() == 'true'
+    WRITE_QUEUE_MAX_BATCH = int(os.environ.get('KITBOX_WRITE_QUEUE_MAX_BATCH', '64'))
+    WRITE_QUEUE_TIMEOUT = float(os.environ.get('KITBOX_WRITE_QUEUE_TIMEOUT', '30'))
+
+    # Per-worker read cache for gear/location lookups and lists (0 disables it). Entries are dropped on writes
+    # (including other workers' writes) and after READ_CACHE_TTL_SECONDS at the latest.
+    READ_CACHE_MAX_ENTRIES = int(os.environ.get('KITBOX_READ_CACHE_MAX_ENTRIES', '2048'))
+    READ_CACHE_TTL_SECONDS = float(os.environ.get('KITBOX_READ_CACHE_TTL_SECONDS', '60'))
+
+    # Per-worker cache of the user loaded for every authenticated request (0 disables it).
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('KITBOX_USER_CACHE_MAX_ENTRIES', '1024'))
+    USER_CACHE_TTL_SECONDS = float(os.environ.get('KITBOX_USER_CACHE_TTL_SECONDS', '60'))
+
+    # Password hashing. The method is a Werkzeug method string with its cost, e.g. 'scrypt:32768:8:1' or
+    # 'pbkdf2:sha256:600000'; stored hashes made with other parameters are upgraded on the user's next login.
+    PASSWORD_HASH_METHOD = os.environ.get('KITBOX_PASSWORD_HASH_METHOD', 'scrypt')
+    # Hashing runs in a per-worker process pool of this many processes (0 hashes inline in the request worker).
+    PASSWORD_HASH_WORKERS = int(os.environ.get('KITBOX_PASSWORD_HASH_WORKERS', '2'))
+    # Logins/registrations waiting for the pool beyond this are answered with 503 and Retry-After.
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('KITBOX_PASSWORD_HASH_MAX_PENDING', '32'))
+
+    # Async serving mode (asgi.py): threads per worker process that run requests and their SQLite queries.
+    # Idle and slow connections don't occupy a thread, so this only bounds concurrently running requests.
+    ASGI_THREADS = int(os.environ.get('KITBOX_ASGI_THREADS', '8'))
+
+    # Request instrumentation: per-request SQL statement counts/timings, rows fetched and model/JSON time,
+    # reported in a Server-Timing header and one 'kitbox.requests' log record per request.
+    REQUEST_INSTRUMENTATION = os.environ.get('KITBOX_REQUEST_INSTRUMENTATION', 'True').lower() == 'true'
+    # Serve per-route Prometheus histograms at GET /api/metrics (unauthenticated; restrict access in the proxy).
+    METRICS_ENABLED = os.environ.get('KITBOX_METRICS_ENABLED', 'False').lower() == 'true'
+    # Log format outside debug mode: 'text', or 'json' for one JSON object per line including request fields.
+    LOG_FORMAT = os.environ.get('KITBOX_LOG_FORMAT', 'text')
+
+    # JSON encoder used for API responses: 'auto' (orjson if installed, else the stdlib json module), 'orjson' or 'stdlib'.
+    JSON_PROVIDER = os.environ.get('KITBOX_JSON_PROVIDER', 'auto')
+
     # Example of another config variable if needed later
     # API_VERSION = os.environ.get('API_VERSION', 'v1')
 
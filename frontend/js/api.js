@@ -1,8 +1,9 @@
 const API_BASE_URL = '/api'; // Nginx will proxy this
 
-async function request(endpoint, method = 'GET', body = null, requiresAuth = true) {
+async function request(endpoint, method = 'GET', body = null, requiresAuth = true, extraHeaders = {}) {
     const headers = {
         'Content-Type': 'application/json',
+        ...extraHeaders,
     };
     const token = localStorage.getItem('jwtToken');
     if (requiresAuth && token) {
@@ -75,15 +76,23 @@ async function request(endpoint, method = 'GET', body = null, requiresAuth = tru
 const loginUser = (credentials) => request('/auth/login', 'POST', credentials, false);
 const registerUser = (userData) => request('/auth/register', 'POST', userData, false);
 
+// Makes a write conditional on the row `version` the caller loaded: the server answers 412 if someone changed it since.
+const ifMatch = (version) => (version !== undefined && version !== null ? { 'If-Match': `"${version}"` } : {});
+
 // Gear API calls
 const getAllGear = (filters = {}) => {
     const queryParams = new URLSearchParams(filters).toString();
     return request(`/gear${queryParams ? '?' + queryParams : ''}`, 'GET');
 };
+// Ranked full-text search (prefix matching on name, description and category).
+const searchGear = (text, filters = {}) => getAllGear({ ...filters, search: text });
 const createGear = (gearData) => request('/gear', 'POST', gearData);
 const getGearById = (id) => request('/gear/' + id, 'GET');
-const updateGear = (id, gearData) => request('/gear/' + id, 'PUT', gearData);
-const deleteGear = (id) => request('/gear/' + id, 'DELETE');
+const updateGear = (id, gearData, version) => request('/gear/' + id, 'PUT', gearData, true, ifMatch(version));
+const deleteGear = (id, version) => request('/gear/' + id, 'DELETE', null, true, ifMatch(version));
+// Batch changes: one request and one transaction for many items.
+const moveGear = (ids, locationId) => request('/gear/batch', 'PATCH', { ids: ids, location_id: locationId });
+const batchUpdateGear = (updates) => request('/gear/batch', 'PATCH', { updates: updates });
 
 // Location API calls
 const getAllLocations = (filters = {}) => {
@@ -92,13 +101,25 @@ const getAllLocations = (filters = {}) => {
 };
 const createLocation = (locationData) => request('/locations', 'POST', locationData);
 const getLocationById = (id) => request('/locations/' + id, 'GET');
-const updateLocation = (id, locationData) => request('/locations/' + id, 'PUT', locationData);
-const deleteLocation = (id) => request('/locations/' + id, 'DELETE');
+const updateLocation = (id, locationData, version) => request('/locations/' + id, 'PUT', locationData, true, ifMatch(version));
+const deleteLocation = (id, version) => request('/locations/' + id, 'DELETE', null, true, ifMatch(version));
 const getItemsInLocation = (id) => request(`/locations/${id}/items`, 'GET');
+const getLocationTotals = (id) => request(`/locations/${id}/totals`, 'GET');
+// Body slots and containers with their items and totals, in one request (optionally one location's subtree).
+const getLoadout = (rootId = null) => request(`/loadout${rootId !== null ? '?root=' + rootId : ''}`, 'GET');
+
+// Delta sync: gear and location rows changed or deleted since change sequence number `since` of database
+// `epoch` (see sync.js).
+const syncChanges = (since = 0, epoch = null) =>
+    request(`/sync?since=${since}${epoch !== null ? '&epoch=' + encodeURIComponent(epoch) : ''}`, 'GET');
+
+// Puts the token in the HttpOnly cookie GET /api/events authenticates with (EventSource can't send headers).
+const openEventSession = () => request('/events/session', 'POST');
 
 export {
     loginUser, registerUser,
-    getAllGear, createGear, getGearById, updateGear, deleteGear,
-    getAllLocations, createLocation, getLocationById, updateLocation, deleteLocation, getItemsInLocation,
+    getAllGear, searchGear, createGear, getGearById, updateGear, deleteGear, moveGear, batchUpdateGear,
+    getAllLocations, createLocation, getLocationById, updateLocation, deleteLocation, getItemsInLocation, getLocationTotals,
+    getLoadout, syncChanges, openEventSession,
     request // Exporting generic request for one-off calls if needed
 };
@@ -37,6 +37,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const data = await loginUser({ username, password });
                 if (data && data.access_token) {
                     localStorage.setItem('jwtToken', data.access_token);
+                    sessionStorage.removeItem('kitboxEventsUnavailable'); // A rejected old token may have set it (sync.js)
                     window.location.href = 'master_list.html'; // Redirect to the main app page
                 } else {
                     displayError('Login failed. No token received.');
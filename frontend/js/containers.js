@@ -1,4 +1,5 @@
-import { getItemsInLocation, getAllGear, updateGear } from './api.js';
+import { getItemsInLocation, getLocationTotals, searchGear, moveGear } from './api.js';
+import { createCatalogSync, subscribeToChanges } from './sync.js';
 
 document.addEventListener('DOMContentLoaded', () => {
     const token = localStorage.getItem('jwtToken');
@@ -34,6 +35,7 @@ document.addEventListener('DOMContentLoaded', () => {
     let currentContainerId = null;
     let currentContainerName = 'Container';
     let allGearItems = []; // To store all available gear for adding
+    const catalog = createCatalogSync(); // Local copy of the gear list, kept current with delta syncs
 
     function displayError(message, modal = false) {
         const div = modal ? addItemModalErrorMessageDiv : errorMessageDiv;
@@ -64,10 +66,12 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         clearError();
         try {
-            const items = await getItemsInLocation(currentContainerId);
+            // Totals are aggregated server-side and include nested containers.
+            const [items, totals] = await Promise.all([
+                getItemsInLocation(currentContainerId),
+                getLocationTotals(currentContainerId)
+            ]);
             itemsTableBody.innerHTML = '';
-            let runningTotalWeight = 0;
-            let runningTotalValue = 0;
 
             if (items.length === 0) {
                 itemsTableBody.innerHTML = '<tr><td colspan="5" class="text-center p-4">This container is empty.</td></tr>';
@@ -86,12 +90,10 @@ document.addEventListener('DOMContentLoaded', () => {
                             </button>
                         </td>
                     `;
-                    runningTotalWeight += item.weight || 0;
-                    runningTotalValue += item.value || 0;
                 });
             }
-            totalWeightEl.textContent = runningTotalWeight.toFixed(2);
-            totalValueEl.textContent = runningTotalValue.toFixed(2);
+            totalWeightEl.textContent = totals.total_weight.toFixed(2);
+            totalValueEl.textContent = totals.total_value.toFixed(2);
             addRemoveButtonListeners();
 
         } catch (error) {
@@ -103,7 +105,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function fetchAllGearForModal() {
         try {
-            allGearItems = await getAllGear(); // Fetch all gear
+            await catalog.refresh(); // Only the changes since the previous refresh are fetched
+            allGearItems = catalog.gearList();
             renderItemListForModal(); // Initial render (might be empty or show all)
         } catch (error) {
             console.error("Error fetching all gear for modal:", error);
@@ -111,10 +114,9 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    function renderItemListForModal(filterText = "") {
+    function renderItemListForModal(items = allGearItems) {
         itemListContainer.innerHTML = ''; // Clear previous items
-        const filteredItems = allGearItems.filter(item =>
-            item.name.toLowerCase().includes(filterText.toLowerCase()) &&
+        const filteredItems = items.filter(item =>
             item.location_id !== parseInt(currentContainerId) // Exclude items already in this container
         );
 
@@ -126,7 +128,7 @@ document.addEventListener('DOMContentLoaded', () => {
         filteredItems.forEach(item => {
             const itemDiv = document.createElement('div');
             itemDiv.className = 'p-2 hover:bg-gray-100 cursor-pointer border-b border-gray-200 text-sm text-gray-800';
-            itemDiv.textContent = `${item.name} (W: ${item.weight}, V: ${item.value || 0}) ${item.location ? '- In: '+item.location.name : ''}`;
+            itemDiv.textContent = `${item.name} (W: ${item.weight}, V: ${item.value || 0}) ${catalog.locationName(item.location_id) ? '- In: ' + catalog.locationName(item.location_id) : ''}`;
             itemDiv.dataset.itemId = item.id;
             itemDiv.addEventListener('click', async () => {
                 await handleAddItemToContainer(item.id);
@@ -135,15 +137,30 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    // Search runs server-side against the full-text index; wait for a pause in typing before querying.
+    let searchTimer = null;
     itemSearchInput.addEventListener('input', (e) => {
-        renderItemListForModal(e.target.value);
+        const text = e.target.value.trim();
+        clearTimeout(searchTimer);
+        if (!text) {
+            renderItemListForModal();
+            return;
+        }
+        searchTimer = setTimeout(async () => {
+            try {
+                renderItemListForModal(await searchGear(text));
+            } catch (error) {
+                console.error("Error searching gear:", error);
+                displayError("Search failed.", true);
+            }
+        }, 150);
     });
 
     async function handleAddItemToContainer(itemId) {
         clearError(true); // Clear modal error
         try {
             // The item to add needs its location_id updated to currentContainerId
-            await updateGear(itemId, { location_id: parseInt(currentContainerId) });
+            await moveGear([itemId], parseInt(currentContainerId));
             addItemModal.style.display = 'none'; // Close modal
             fetchContainerItems(); // Refresh items in container
             fetchAllGearForModal(); // Refresh items in modal (as one is now moved)
@@ -162,7 +179,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (confirm(`Are you sure you want to remove this item from ${currentContainerName}? It will become unassigned.`)) {
             clearError();
             try {
-                await updateGear(itemId, { location_id: null });
+                await moveGear([parseInt(itemId)], null);
                 fetchContainerItems(); // Refresh list
                 fetchAllGearForModal(); // Refresh items in modal (as one is now available)
             } catch (error) {
@@ -202,6 +219,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // Initial Load
     if (currentContainerId) {
         fetchContainerItems();
+        subscribeToChanges(fetchContainerItems); // Items moved in or out elsewhere show up without a reload
     } else {
         displayError("Container not specified. Please go back to the paperdoll and select a container.");
         itemsTableBody.innerHTML = '<tr><td colspan="5" class="text-center p-4">No container selected.</td></tr>';
@@ -1,6 +1,7 @@
 import {
-    getAllGear, createGear, updateGear, deleteGear, getAllLocations
+    createGear, updateGear, deleteGear, getAllLocations
 } from './api.js';
+import { createCatalogSync, subscribeToChanges } from './sync.js';
 
 document.addEventListener('DOMContentLoaded', () => {
     // Authentication Check
@@ -22,6 +23,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const errorMessageDiv = document.getElementById('errorMessage');
 
     let allLocations = []; // To store locations for the dropdown
+    let editingVersion = null; // Row version of the item open for editing, sent back in If-Match when saving
+    const catalog = createCatalogSync(); // Refreshes only fetch what changed since the last one
 
     // Modified displayError
     function displayError(message, errorObj) {
@@ -63,7 +66,8 @@ document.addEventListener('DOMContentLoaded', () => {
         clearError();
         gearTableBody.innerHTML = '<tr><td colspan="9" class="text-center p-4 font-semibold text-sepia">Loading gear... <span class="material-icons animate-spin">refresh</span></td></tr>'; // Loading indicator
         try {
-            const gearList = await getAllGear();
+            await catalog.refresh();
+            const gearList = catalog.gearList();
             gearTableBody.innerHTML = ''; // Clear existing rows (including loading)
 
             if (gearList.length === 0) {
@@ -75,7 +79,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const row = gearTableBody.insertRow();
                 row.className = 'border-t border-sepia bg-opacity-50 hover:bg-sepia-dark hover:bg-opacity-20 transition-colors duration-100';
 
-                const locationName = gear.location ? gear.location.name : 'N/A';
+                const locationName = catalog.locationName(gear.location_id) || 'N/A';
 
                 row.innerHTML = `
                     <td class="px-4 py-3 font-semibold">${gear.name}</td>
@@ -97,7 +101,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         <button class="edit-btn p-1 text-sepia hover-sepia transition-colors duration-150" data-id="${gear.id}" title="Edit">
                             <span class="material-icons text-lg">edit</span>
                         </button>
-                        <button class="delete-btn p-1 text-red-700 hover:text-red-900 transition-colors duration-150" data-id="${gear.id}" title="Delete">
+                        <button class="delete-btn p-1 text-red-700 hover:text-red-900 transition-colors duration-150" data-id="${gear.id}" data-version="${gear.version}" title="Delete">
                             <span class="material-icons text-lg">delete</span>
                         </button>
                     </td>
@@ -142,6 +146,7 @@ document.addEventListener('DOMContentLoaded', () => {
         modalTitle.textContent = 'Add New Item';
         gearForm.reset();
         gearIdInput.value = ''; // Ensure ID is cleared for creation
+        editingVersion = null;
         gearLocationSelect.value = ''; // Reset location dropdown
         gearModal.style.display = 'block';
             gearForm.name.focus(); // Focus the name input
@@ -159,6 +164,7 @@ document.addEventListener('DOMContentLoaded', () => {
             gearForm.reset(); // Reset form first
 
             gearIdInput.value = gearItem.id;
+            editingVersion = gearItem.version;
             gearForm.name.value = gearItem.name;
             gearForm.description.value = gearItem.description || '';
             gearForm.weight.value = gearItem.weight;
@@ -219,7 +225,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
         try {
             if (id) { // Update existing item
-                await updateGear(id, gearData);
+                await updateGear(id, gearData, editingVersion);
             } else { // Create new item
                 await createGear(gearData);
             }
@@ -237,11 +243,11 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     async function handleDeleteItem(event) {
-        const gearId = event.currentTarget.dataset.id;
+        const { id: gearId, version } = event.currentTarget.dataset;
         if (confirm('Are you sure you want to delete this item?')) {
             clearError();
             try {
-                await deleteGear(gearId);
+                await deleteGear(gearId, version);
                 fetchAndDisplayGear(); // Refresh the list
             } catch (error) {
                 console.error('Failed to delete gear:', error);
@@ -253,4 +259,5 @@ document.addEventListener('DOMContentLoaded', () => {
     // Initial data load
     fetchLocations(); // Load locations for the modal first
     fetchAndDisplayGear(); // Then load gear
+    subscribeToChanges(fetchAndDisplayGear); // And reload it when anyone changes the catalog
 });
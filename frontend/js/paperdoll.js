@@ -1,4 +1,4 @@
-import { getAllGear, getAllLocations } from './api.js';
+import { getLoadout } from './api.js';
 
 document.addEventListener('DOMContentLoaded', () => {
     const token = localStorage.getItem('jwtToken');
@@ -56,10 +56,14 @@ document.addEventListener('DOMContentLoaded', () => {
     async function initializePaperdoll() {
         clearError();
         try {
-            const [gearItems, locations] = await Promise.all([
-                getAllGear(),
-                getAllLocations()
-            ]);
+            // One request: every location with its items and totals, nested under its parent.
+            const loadout = await getLoadout();
+            const locations = [];
+            const collectLocations = (node) => {
+                locations.push(node);
+                node.children.forEach(collectLocations);
+            };
+            [...loadout.body_slots, ...loadout.containers].forEach(collectLocations);
 
             // Create visual slots on paperdoll image
             slotDefinitions.forEach(slotDef => {
@@ -79,7 +83,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const bodySlotLocations = locations.filter(loc => loc.type === 'Body Slot');
 
             bodySlotLocations.forEach(loc => {
-                const itemsInSlot = gearItems.filter(item => item.location_id === loc.id);
+                const itemsInSlot = loc.items;
                 const slotP = document.createElement('p');
                 slotP.className = 'text-sm mb-1 p-2 rounded container-list-item';
 
@@ -120,7 +124,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     containerLink.className = 'block p-3 mb-2 rounded-md hover:bg-sepia-light transition-colors duration-150 container-list-item shadow';
                     containerLink.innerHTML = `
                         <strong class="font-semibold text-md">${container.name}</strong>
-                        <span class="text-xs block text-gray-600">(Click to view contents)</span>
+                        <span class="text-xs block text-gray-600">${container.totals.item_count} items, ${container.totals.total_weight.toFixed(2)} lbs (Click to view contents)</span>
                     `;
                     containersListDiv.appendChild(containerLink);
                 });
@@ -0,0 +1,79 @@
+import { openEventSession, syncChanges } from './api.js';
+
+// Local copy of the gear and location tables kept current through GET /api/sync: after the first full load,
+// each refresh only transfers the rows changed (or deleted) since the previous one.
+function createCatalogSync() {
+    const gear = new Map();
+    const locations = new Map();
+    let seq = 0;
+    let epoch = null; // Identifies the database `seq` belongs to; kept as the string the server sends
+
+    async function refresh() {
+        let page;
+        do {
+            page = await syncChanges(seq, epoch);
+            if (page.reset) { // The server's database was replaced since our last sync; start over
+                gear.clear();
+                locations.clear();
+            }
+            page.gear.forEach(item => gear.set(item.id, item));
+            page.locations.forEach(location => locations.set(location.id, location));
+            page.deleted.gear.forEach(id => gear.delete(id));
+            page.deleted.locations.forEach(id => locations.delete(id));
+            seq = page.seq;
+            epoch = page.epoch;
+        } while (page.has_more);
+    }
+
+    return {
+        refresh,
+        gearList: () => [...gear.values()].sort((a, b) => a.id - b.id),
+        locationName: (id) => (id !== null && locations.has(id) ? locations.get(id).name : null),
+    };
+}
+
+// Set for the rest of the browser session once the server has answered GET /api/events with 204 No Content
+// (event streams are only served in the ASGI mode unless KITBOX_EVENTS_WSGI_STREAMS is set).
+const EVENTS_UNAVAILABLE_KEY = 'kitboxEventsUnavailable';
+
+// Calls onChange (at most once per `delayMs`) whenever another tab, user or worker changes gear or locations,
+// using the GET /api/events stream. EventSource can't send headers, so the token goes in an HttpOnly cookie
+// set by openEventSession() (never in the URL, where access logs would record it); on reconnects the browser
+// sends the cookie and Last-Event-ID, and the server replays what was missed.
+// Does nothing where the server doesn't serve event streams: pages then refresh on their own actions only.
+function subscribeToChanges(onChange, delayMs = 250) {
+    const token = localStorage.getItem('jwtToken');
+    if (!token || typeof EventSource === 'undefined' || sessionStorage.getItem(EVENTS_UNAVAILABLE_KEY)) {
+        return () => {};
+    }
+    let source = null;
+    let closed = false;
+    let timer = null;
+    const schedule = () => {
+        if (timer === null) {
+            timer = setTimeout(() => { timer = null; onChange(); }, delayMs);
+        }
+    };
+    openEventSession().then(() => {
+        if (closed) {
+            return;
+        }
+        source = new EventSource('/api/events');
+        source.addEventListener('error', () => {
+            // EventSource gives up (CLOSED) on 204 No Content or an error status; it keeps retrying after dropped streams.
+            if (source.readyState === EventSource.CLOSED) {
+                sessionStorage.setItem(EVENTS_UNAVAILABLE_KEY, '1');
+            }
+        });
+        source.addEventListener('change', schedule);
+        source.addEventListener('resync', schedule); // Too much was missed to replay; a delta sync catches up
+    }).catch(() => {}); // No live updates then; request() has already reported the error
+    return () => {
+        closed = true;
+        if (source !== null) {
+            source.close();
+        }
+    };
+}
+
+export { createCatalogSync, subscribeToChanges };
@@ -0,0 +1,193 @@
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# Chunks a response may run ahead of the client before the thread producing it waits (see WSGIToASGI).
+_RESPONSE_QUEUE_CHUNKS = 16
+
+_END = object()
+
+
+class ClientDisconnected(Exception):
+    """Raised in the thread running a streamed response once the client has gone away."""
+
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    """Translates an ASGI HTTP scope and its request body into a WSGI environ."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        # WSGI carries the path as the request's bytes decoded as latin-1.
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if client:
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = client[0], str(client[1])
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue # Replaced by the length of the body actually received
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class WSGIToASGI:
+    """
+    Serves a WSGI application (the Flask app) from an ASGI server such as uvicorn.
+
+    The event loop only does network I/O: it receives the request body, and sends the response as it is
+    produced, so idle keep-alive connections and slow uploads cost no thread. Running the application itself,
+    and with it every SQLite query, happens on a dedicated pool of `threads` threads. A thread is returned to
+    the pool as soon as the response is produced; slow readers are buffered up to _RESPONSE_QUEUE_CHUNKS chunks,
+    after which a long streamed response (e.g. the NDJSON export) waits for the client to catch up.
+    The thread pool is created on first use and belongs to one process, like the connection pool.
+    """
+
+    def __init__(self, wsgi_app, threads: int = 8):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='kitbox-asgi')
+                self._pid = os.getpid()
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._handle_lifespan(receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _handle_http(self, scope, receive, send):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        environ = build_environ(scope, b''.join(chunks))
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_RESPONSE_QUEUE_CHUNKS)
+        disconnected = threading.Event()
+        worker = loop.run_in_executor(self._get_executor(), self._run_app, environ, loop, queue, disconnected)
+        watcher = asyncio.ensure_future(self._watch_disconnect(receive, disconnected))
+        try:
+            await self._send_response(queue, worker, send, disconnected)
+        finally:
+            disconnected.set() # Stops the producing thread if the response wasn't sent completely
+            watcher.cancel()
+            while not worker.done():
+                # Make room for a producer blocked on the full queue so it sees the flag and finishes.
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait([getter, worker], return_when=asyncio.FIRST_COMPLETED)
+                getter.cancel()
+        await worker # Re-raises an error of the application itself
+
+    @staticmethod
+    async def _watch_disconnect(receive, disconnected: threading.Event):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+                return
+
+    @staticmethod
+    async def _send_response(queue: asyncio.Queue, worker, send, disconnected: threading.Event):
+        while not disconnected.is_set():
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait([getter, worker], return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                if queue.empty(): # The application failed before finishing its response
+                    return
+                message = queue.get_nowait()
+            else:
+                message = getter.result()
+            if message is _END:
+                return
+            await send(message)
+
+    def _run_app(self, environ, loop, queue: asyncio.Queue, disconnected: threading.Event) -> None:
+        """Runs the WSGI application on a pool thread, handing each ASGI message to the event loop."""
+        def put(message):
+            if disconnected.is_set():
+                raise ClientDisconnected()
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response_start.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start.update({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            })
+            return lambda data: None # The legacy write() callable isn't used by Flask
+
+        def send_start():
+            if not response_start.get('sent'):
+                put({key: value for key, value in response_start.items() if key != 'sent'})
+                response_start['sent'] = True
+
+        body = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in body:
+                if chunk:
+                    send_start()
+                    put({'type': 'http.response.body', 'body': bytes(chunk), 'more_body': True})
+            send_start()
+            put({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except ClientDisconnected:
+            pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close() # Ends the request context: Flask's teardown returns the connection to the pool
+        if not disconnected.is_set():
+            asyncio.run_coroutine_threadsafe(queue.put(_END), loop).result()
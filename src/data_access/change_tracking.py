@@ -0,0 +1,56 @@
+import json
+import sqlite3
+from typing import Dict, Iterable, Optional
+
+# Tables whose writes are counted in table_versions by the triggers in schema.sql.
+TRACKED_TABLES = ('gear', 'locations')
+
+# table_versions row holding the random number chosen when the database was created.
+EPOCH_KEY = '_epoch'
+
+
+def get_table_versions(db: sqlite3.Connection, tables: Iterable[str]) -> Dict[str, int]:
+    """
+    Fetches the change counters of the given tables, plus the database epoch under EPOCH_KEY, in one query.
+    A counter only ever grows while the database exists; any committed write to the table changes it.
+    Raises ValueError for a table that isn't tracked.
+    """
+    tables = list(tables)
+    untracked = [table for table in tables if table not in TRACKED_TABLES]
+    if untracked:
+        raise ValueError(f"Tables without a change counter: {', '.join(untracked)}")
+
+    cursor = db.execute(
+        "SELECT table_name, version FROM table_versions WHERE table_name IN (SELECT value FROM json_each(?))",
+        (json.dumps([EPOCH_KEY] + tables),)
+    )
+    return {row['table_name']: row['version'] for row in cursor.fetchall()}
+
+
+# --- Row versions ---
+# gear and locations rows carry a `version` that every write through the data-access layer bumps. Conditional
+# writes (If-Match) add "AND version = ?" to their statement and call check_row_version() if it matched nothing.
+
+class VersionConflict(Exception):
+    """A conditional write found its row at another version than expected (HTTP 412 Precondition Failed)."""
+
+    def __init__(self, table: str, row_id: int, current_version: int):
+        super().__init__(f"{table} row {row_id} is at version {current_version}")
+        self.table = table
+        self.row_id = row_id
+        self.current_version = current_version
+
+
+def check_row_version(db: sqlite3.Connection, table: str, row_id: int, expected_version: Optional[int]) -> None:
+    """
+    Called after a write (conditional on expected_version, or not) matched no row: returns if the row doesn't exist,
+    and raises VersionConflict with its current version if it does. Costs nothing when expected_version is None.
+    Raises ValueError for a table without row versions.
+    """
+    if expected_version is None:
+        return
+    if table not in TRACKED_TABLES:
+        raise ValueError(f"Table without row versions: {table}")
+    row = db.execute(f"SELECT version FROM {table} WHERE id = ?", (row_id,)).fetchone()
+    if row is not None:
+        raise VersionConflict(table, row_id, row[0])
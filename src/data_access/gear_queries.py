@@ -1,11 +1,51 @@
+import json
+import re
 import sqlite3
-from typing import Optional, List
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional, List, Iterator, Iterable, Sequence, Tuple, Union
 
 # Import Pydantic models from app.py, assuming app.py can be imported or models are defined in a way that avoids circularity.
 # This is a common challenge in Flask/Pydantic setups and might require a dedicated models.py in a real app.
 from app import GearCreate, GearUpdate, GearInDB, LocationInDB # LocationInDB is needed for _make_gear_in_db_from_row
+from .read_cache import read_cache, table_version_returning, MISSING, LISTS
+from .change_tracking import check_row_version, VersionConflict
+from src.instrumentation import timed_models
 
 
+# Columns selected by every gear read that embeds the item's location. gear_row_to_dict() reads them by position,
+# so keep the order in sync with it.
+_GEAR_WITH_LOCATION_COLUMNS = """
+        g.id, g.name, g.description, g.weight, g.cost, g.value, g.legality, g.category, g.location_id, g.version,
+        l.id as loc_id, l.name as loc_name, l.type as loc_type, l.parent_id as loc_parent_id, l.version as loc_version
+"""
+
+# Shared SELECT for gear reads that embed the item's location.
+_GEAR_WITH_LOCATION_SELECT = f"""
+    SELECT {_GEAR_WITH_LOCATION_COLUMNS}
+    FROM gear g
+    LEFT JOIN locations l ON g.location_id = l.id
+"""
+
+# Gear columns alone, for reads that return locations separately instead of embedding them in every item
+# (see gear_row_to_flat_dict() and location_queries.get_locations_by_ids()). No JOIN is needed.
+_GEAR_COLUMNS = "g.id, g.name, g.description, g.weight, g.cost, g.value, g.legality, g.category, g.location_id, g.version"
+_GEAR_SELECT = f"SELECT {_GEAR_COLUMNS} FROM gear g"
+
+# RETURNING clause that gives INSERT/UPDATE statements on gear the same columns as _GEAR_WITH_LOCATION_SELECT,
+# so writes get their item back without a second query. RETURNING can't join, hence the PK-lookup subqueries.
+# The trailing table_version column is for read_cache.note_row_write().
+_GEAR_RETURNING = (
+    "RETURNING id, name, description, weight, cost, value, legality, category, location_id, version, "
+    + ", ".join(f"(SELECT l.{column} FROM locations l WHERE l.id = gear.location_id) AS loc_{column}"
+                for column in ('id', 'name', 'type', 'parent_id', 'version'))
+    + ", " + table_version_returning('gear')
+)
+
+# Number of rows pulled from the cursor per fetchmany() call when iterating large result sets.
+DEFAULT_FETCH_BATCH_SIZE = 500
+
+
+@timed_models
 def _make_gear_in_db_from_row(row_data: sqlite3.Row) -> GearInDB:
     """
     Helper function to convert a database row (potentially from a join) into a GearInDB Pydantic model.
@@ -19,7 +59,8 @@ def _make_gear_in_db_from_row(row_data: sqlite3.Row) -> GearInDB:
             id=row_dict['loc_id'],
             name=row_dict['loc_name'],
             type=row_dict['loc_type'],
-            parent_id=row_dict.get('loc_parent_id') # Use .get for optional parent_id from join
+            parent_id=row_dict.get('loc_parent_id'), # Use .get for optional parent_id from join
+            version=row_dict['loc_version']
         )
 
     gear_data_for_model = {
@@ -32,67 +73,247 @@ def _make_gear_in_db_from_row(row_data: sqlite3.Row) -> GearInDB:
         'legality': row_dict.get('legality'),
         'category': row_dict.get('category'),
         'location_id': row_dict.get('location_id'),
+        'version': row_dict['version'],
         'location': location_info
     }
     return GearInDB.model_validate(gear_data_for_model)
 
 
+@timed_models
+def gear_row_to_dict(row: sqlite3.Row) -> dict:
+    """
+    Read-side fast path: maps a row selected with _GEAR_WITH_LOCATION_COLUMNS straight to the dict that
+    _make_gear_in_db_from_row(row).model_dump() would return (same keys, same order, same values) without
+    running Pydantic validation. Only for rows read back from our own tables, which were validated on write;
+    the REAL column affinity in schema.sql already guarantees weight/cost/value come back as floats.
+    """
+    if row[10] is not None and row[11] is not None and row[12] is not None:
+        location = {'name': row[11], 'type': row[12], 'parent_id': row[13], 'id': row[10], 'version': row[14]}
+    else:
+        location = None
+    return {
+        'name': row[1],
+        'description': row[2],
+        'weight': row[3],
+        'cost': row[4],
+        'value': row[5],
+        'legality': row[6],
+        'category': row[7],
+        'location_id': row[8],
+        'id': row[0],
+        'version': row[9],
+        'location': location,
+    }
+
+
+@timed_models
+def gear_row_to_flat_dict(row: sqlite3.Row) -> dict:
+    """
+    Like gear_row_to_dict(), for a row selected with _GEAR_COLUMNS: the item's fields without the
+    'location' key. Clients look the location up by location_id in a separately returned map.
+    """
+    return {
+        'name': row[1],
+        'description': row[2],
+        'weight': row[3],
+        'cost': row[4],
+        'value': row[5],
+        'legality': row[6],
+        'category': row[7],
+        'location_id': row[8],
+        'id': row[0],
+        'version': row[9],
+    }
+
+
+def _row_mapper(as_dicts: bool, embed_location: bool):
+    """Picks the row-to-item function for a read: models, dicts with the location embedded, or flat dicts."""
+    if not embed_location:
+        return gear_row_to_flat_dict
+    return gear_row_to_dict if as_dicts else _make_gear_in_db_from_row
+
+
+# Fields a gear listing can be narrowed to (the `fields=` query parameter), in the key order of gear_row_to_dict(),
+# with the columns each one selects. Only 'location', the embedded location object, needs the locations JOIN.
+GEAR_FIELDS = ('name', 'description', 'weight', 'cost', 'value', 'legality', 'category', 'location_id', 'id', 'version',
+               'location')
+_FIELD_COLUMNS = {
+    'name': ('g.name',),
+    'description': ('g.description',),
+    'weight': ('g.weight',),
+    'cost': ('g.cost',),
+    'value': ('g.value',),
+    'legality': ('g.legality',),
+    'category': ('g.category',),
+    'location_id': ('g.location_id',),
+    'id': ('g.id',),
+    'version': ('g.version',),
+    'location': ('l.id', 'l.name', 'l.type', 'l.parent_id', 'l.version'),
+}
+
+
+class GearProjection(NamedTuple):
+    """A sparse fieldset: the SELECT for just those columns and the matching row-to-dict function."""
+    fields: Tuple[str, ...]
+    columns: str
+    joins_locations: bool
+    row_to_dict: Callable[[sqlite3.Row], dict]
+
+
+@lru_cache(maxsize=64)
+def project_gear_fields(fields: Tuple[str, ...]) -> GearProjection:
+    """
+    Builds the projection for a set of GEAR_FIELDS names. 'id' is always included (it is the pagination cursor)
+    and keys come out in GEAR_FIELDS order, so each dict is gear_row_to_dict()'s output with the other keys removed.
+    Raises ValueError for unknown field names.
+    """
+    unknown = set(fields) - set(GEAR_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown gear field(s): {', '.join(sorted(unknown))}")
+    selected = tuple(name for name in GEAR_FIELDS if name in fields or name == 'id')
+    scalar_fields = [(name, position) for position, name in enumerate(selected) if name != 'location']
+    joins_locations = 'location' in selected
+    location_position = len(scalar_fields) # 'location' is last in GEAR_FIELDS, so its five columns come last
+
+    @timed_models
+    def row_to_dict(row: sqlite3.Row) -> dict:
+        item = {name: row[position] for name, position in scalar_fields}
+        if joins_locations:
+            loc_id, loc_name, loc_type, loc_parent_id, loc_version = row[location_position:location_position + 5]
+            if loc_id is not None and loc_name is not None and loc_type is not None:
+                item['location'] = {'name': loc_name, 'type': loc_type, 'parent_id': loc_parent_id, 'id': loc_id,
+                                    'version': loc_version}
+            else:
+                item['location'] = None
+        return item
+
+    columns = ", ".join(column for name in selected for column in _FIELD_COLUMNS[name])
+    return GearProjection(selected, columns, joins_locations, row_to_dict)
+
+
+def _projection_select(projection: GearProjection) -> str:
+    """The SELECT ... FROM part of a gear read narrowed to `projection`."""
+    select = f"SELECT {projection.columns} FROM gear g"
+    if projection.joins_locations:
+        select += " LEFT JOIN locations l ON g.location_id = l.id"
+    return select
+
+
+# Read cache tags for results made of whole gear lists (see read_cache.ReadCache).
+_GEAR_LIST_CACHE_TAGS = ('gear', 'locations', ('gear', LISTS))
+
+
+def _gear_cache_tags(gear_id: int, location_id: Optional[int]) -> List:
+    """Read cache tags for a single gear item, which embeds its location."""
+    tags = ['gear', 'locations', ('gear', gear_id)]
+    if location_id is not None:
+        tags.append(('locations', location_id))
+    return tags
+
+
 def create_gear(db: sqlite3.Connection, gear_data: GearCreate) -> GearInDB:
     """
     Creates a new gear item in the database.
     Commits the transaction if successful.
-    Returns the created GearInDB item, including joined location data.
+    Returns the created GearInDB item, including joined location data, from the INSERT's RETURNING clause.
     Raises sqlite3.IntegrityError for database integrity issues.
     """
     try:
-        cursor = db.execute(
-            "INSERT INTO gear (name, description, weight, cost, value, legality, category, location_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        row = db.execute(
+            "INSERT INTO gear (name, description, weight, cost, value, legality, category, location_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            + _GEAR_RETURNING,
             (gear_data.name, gear_data.description, gear_data.weight, gear_data.cost, gear_data.value, gear_data.legality, gear_data.category, gear_data.location_id)
-        )
+        ).fetchone()
+        read_cache.note_row_write('gear', row['table_version'], [('gear', LISTS)])
         db.commit()
-        new_gear_id = cursor.lastrowid
-
-        # Fetch the newly created gear item with its location data
-        fetched_gear = get_gear_by_id(db, new_gear_id)
-        if fetched_gear is None:
-             raise Exception(f"Failed to fetch newly created gear with id {new_gear_id}")
-        return fetched_gear
+        return _make_gear_in_db_from_row(row)
     except sqlite3.IntegrityError:
         # db.rollback() # Handled by app level
         raise
 
 
-def get_gear_by_id(db: sqlite3.Connection, gear_id: int) -> Optional[GearInDB]:
+# Writable gear columns, in the order used by bulk statements.
+GEAR_COLUMNS = ('name', 'description', 'weight', 'cost', 'value', 'legality', 'category', 'location_id')
+
+_BULK_INSERT_SQL = f"INSERT INTO gear ({', '.join(GEAR_COLUMNS)}) VALUES ({', '.join('?' for _ in GEAR_COLUMNS)})"
+_BULK_UPSERT_SQL = (
+    f"INSERT INTO gear (id, {', '.join(GEAR_COLUMNS)}) VALUES (?, {', '.join('?' for _ in GEAR_COLUMNS)}) "
+    f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{col} = excluded.{col}' for col in GEAR_COLUMNS)}, version = version + 1"
+)
+
+
+def bulk_write_gear(db: sqlite3.Connection, batches: Iterable[List[Tuple[Optional[int], GearCreate]]]) -> Tuple[int, int]:
     """
-    Fetches a single gear item by its ID, including its location data.
-    Returns GearInDB instance or None if not found.
+    Writes already-validated gear items with executemany(), one statement per batch, in a single transaction.
+    Each batch is a list of (gear_id, gear_data) pairs: gear_id None inserts a new item, otherwise the item with
+    that id is inserted or, if it already exists, overwritten (upsert).
+    Commits once after the last batch. Returns (created_count, updated_count).
+    Raises sqlite3.IntegrityError (and rolls nothing back itself) if any row violates a constraint.
     """
-    query = """
-        SELECT
-            g.id, g.name, g.description, g.weight, g.cost, g.value, g.legality, g.category, g.location_id,
-            l.id as loc_id, l.name as loc_name, l.type as loc_type, l.parent_id as loc_parent_id
-        FROM gear g
-        LEFT JOIN locations l ON g.location_id = l.id
-        WHERE g.id = ?
+    versions_before = read_cache.begin_write(db, ['gear'])
+    created = updated = 0
+    written_ids = []
+    for batch in batches:
+        new_rows = []
+        upsert_rows = []
+        for gear_id, gear_data in batch:
+            values = tuple(getattr(gear_data, col) for col in GEAR_COLUMNS)
+            if gear_id is None:
+                new_rows.append(values)
+            else:
+                upsert_rows.append((gear_id,) + values)
+
+        if upsert_rows:
+            # One round trip to find out which of the ids are updates rather than inserts. An id can occur more
+            # than once in a batch: only its first row can be an insert, the later ones update that row.
+            distinct_ids = {row[0] for row in upsert_rows}
+            existing = db.execute("SELECT COUNT(*) FROM gear WHERE id IN (SELECT value FROM json_each(?))",
+                                  (json.dumps(list(distinct_ids)),)).fetchone()[0]
+            db.executemany(_BULK_UPSERT_SQL, upsert_rows)
+            created += len(distinct_ids) - existing
+            updated += len(upsert_rows) - (len(distinct_ids) - existing)
+        if new_rows:
+            db.executemany(_BULK_INSERT_SQL, new_rows)
+            created += len(new_rows)
+        written_ids.extend(row[0] for row in upsert_rows)
+    read_cache.note_write(db, versions_before, [('gear', LISTS)] + [('gear', gear_id) for gear_id in written_ids])
+    db.commit()
+    return created, updated
+
+
+def get_gear_by_id(db: sqlite3.Connection, gear_id: int, as_dicts: bool = False) -> Optional[Union[GearInDB, dict]]:
+    """
+    Fetches a single gear item by its ID, including its location data.
+    Returns GearInDB instance (or, with as_dicts=True, the equivalent plain dict) or None if not found.
+    Served from the read cache when possible.
     """
+    cache_key = ('gear_by_id', gear_id, as_dicts)
+    cached, generation = read_cache.lookup(db, cache_key)
+    if cached is not MISSING:
+        return cached
+
+    query = _GEAR_WITH_LOCATION_SELECT + " WHERE g.id = ?"
     cursor = db.execute(query, (gear_id,))
     row_data = cursor.fetchone()
     if row_data is None:
         return None
-    return _make_gear_in_db_from_row(row_data)
+    item = gear_row_to_dict(row_data) if as_dicts else _make_gear_in_db_from_row(row_data)
+    read_cache.store(cache_key, item, _gear_cache_tags(gear_id, row_data['location_id']), generation)
+    return item
 
 
-def get_all_gear(db: sqlite3.Connection, name_filter: Optional[str], category_filter: Optional[str]) -> List[GearInDB]:
+def _build_gear_list_query(name_filter: Optional[str], category_filter: Optional[str],
+                           after_id: Optional[int] = None, limit: Optional[int] = None,
+                           embed_location: bool = True, projection: Optional[GearProjection] = None) -> Tuple[str, tuple]:
     """
-    Fetches all gear items, optionally filtered by name and/or category, including location data.
-    """
-    base_query = """
-        SELECT
-            g.id, g.name, g.description, g.weight, g.cost, g.value, g.legality, g.category, g.location_id,
-            l.id as loc_id, l.name as loc_name, l.type as loc_type, l.parent_id as loc_parent_id
-        FROM gear g
-        LEFT JOIN locations l ON g.location_id = l.id
+    Builds the keyset-ordered gear listing query and its parameters.
+    Results are always ordered by g.id so that `after_id` can be used as a cursor.
+    Without embed_location, the locations JOIN is left out; a projection replaces the SELECT list altogether.
     """
+    if projection is not None:
+        query = _projection_select(projection)
+    else:
+        query = _GEAR_WITH_LOCATION_SELECT if embed_location else _GEAR_SELECT
     filters = []
     params = []
 
@@ -104,59 +325,287 @@ def get_all_gear(db: sqlite3.Connection, name_filter: Optional[str], category_fi
         filters.append("g.category = ?")
         params.append(category_filter)
 
+    if after_id is not None:
+        filters.append("g.id > ?")
+        params.append(after_id)
+
     if filters:
-        base_query += " WHERE " + " AND ".join(filters)
+        query += " WHERE " + " AND ".join(filters)
+
+    query += " ORDER BY g.id"
+
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    return query, tuple(params)
+
+
+def iter_gear(db: sqlite3.Connection, name_filter: Optional[str] = None, category_filter: Optional[str] = None,
+              after_id: Optional[int] = None, limit: Optional[int] = None,
+              batch_size: int = DEFAULT_FETCH_BATCH_SIZE, as_dicts: bool = False,
+              embed_location: bool = True, fields: Optional[Sequence[str]] = None) -> Iterator[Union[GearInDB, dict]]:
+    """
+    Lazily yields gear items in ascending id order, optionally filtered by name and/or category.
+    Only items with an id greater than `after_id` are returned (keyset pagination).
+    Rows are read from the cursor `batch_size` at a time, so memory use does not grow with the table.
+    With as_dicts=True, yields plain dicts from gear_row_to_dict() instead of validated GearInDB models.
+    With embed_location=False, yields flat dicts from gear_row_to_flat_dict() and skips the locations JOIN.
+    With `fields` (names from GEAR_FIELDS), only those columns are selected and yielded as dicts; the JOIN
+    is skipped unless 'location' is one of them.
+    """
+    projection = project_gear_fields(tuple(fields)) if fields is not None else None
+    make_item = projection.row_to_dict if projection else _row_mapper(as_dicts, embed_location)
+    query, params = _build_gear_list_query(name_filter, category_filter, after_id, limit, embed_location, projection)
+    cursor = db.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield make_item(row)
+
+
+def get_gear_page(db: sqlite3.Connection, name_filter: Optional[str], category_filter: Optional[str],
+                  after_id: Optional[int], limit: int, as_dicts: bool = False, embed_location: bool = True,
+                  fields: Optional[Sequence[str]] = None) -> Tuple[List[Union[GearInDB, dict]], Optional[int]]:
+    """
+    Fetches one page of at most `limit` gear items with an id greater than `after_id`.
+    Returns a tuple of (items, next_after) where next_after is the cursor for the following page,
+    or None if this is the last page. as_dicts, embed_location and fields are passed through to iter_gear().
+    Pages are cached per filter/cursor combination.
+    """
+    fields = tuple(fields) if fields is not None else None
+    cache_key = ('gear_page', name_filter, category_filter, after_id, limit, as_dicts, embed_location, fields)
+    cached, generation = read_cache.lookup(db, cache_key)
+    if cached is not MISSING:
+        return cached
+
+    # Read one row past the page to find out whether another page exists.
+    items = list(iter_gear(db, name_filter, category_filter, after_id=after_id, limit=limit + 1,
+                           as_dicts=as_dicts, embed_location=embed_location, fields=fields))
+    next_after = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_after = items[-1]['id'] if isinstance(items[-1], dict) else items[-1].id
+    read_cache.store(cache_key, (items, next_after), _GEAR_LIST_CACHE_TAGS, generation)
+    return items, next_after
+
+
+# bm25() column weights for gear_fts (name, description, category): a hit in the name counts the most.
+_SEARCH_RANK_WEIGHTS = (10.0, 1.0, 4.0)
+
+
+def build_search_query(search_text: str) -> Optional[str]:
+    """
+    Turns free text typed by a user into an FTS5 MATCH expression.
+    Every word becomes a quoted prefix term ("hel"* matches "Helmet") and all of them must match.
+    Returns None if the text contains no searchable words.
+    """
+    terms = re.findall(r"\w+", search_text)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_gear(db: sqlite3.Connection, search_text: str, name_filter: Optional[str] = None,
+                category_filter: Optional[str] = None, limit: int = 50, as_dicts: bool = False,
+                embed_location: bool = True, fields: Optional[Sequence[str]] = None) -> List[Union[GearInDB, dict]]:
+    """
+    Full-text search over gear name, description and category using the gear_fts index.
+    Matches word prefixes and returns at most `limit` items, best bm25 rank first.
+    With as_dicts=True, returns plain dicts from gear_row_to_dict() instead of validated GearInDB models;
+    with embed_location=False, flat dicts from gear_row_to_flat_dict() without joining locations.
+    `fields` narrows the selected columns as in iter_gear().
+    Results are cached per search text and filters.
+    """
+    match_query = build_search_query(search_text)
+    if match_query is None:
+        return []
+
+    fields = tuple(fields) if fields is not None else None
+    cache_key = ('gear_search', match_query, name_filter, category_filter, limit, as_dicts, embed_location, fields)
+    cached, generation = read_cache.lookup(db, cache_key)
+    if cached is not MISSING:
+        return cached
+
+    projection = project_gear_fields(fields) if fields is not None else None
+    if projection is not None:
+        columns, joins_locations = projection.columns, projection.joins_locations
+    else:
+        columns, joins_locations = (_GEAR_WITH_LOCATION_COLUMNS if embed_location else _GEAR_COLUMNS), embed_location
+    query = f"""
+        SELECT {columns}
+        FROM gear_fts f
+        JOIN gear g ON g.id = f.rowid
+        {"LEFT JOIN locations l ON g.location_id = l.id" if joins_locations else ""}
+        WHERE gear_fts MATCH ?
+    """
+    params = [match_query]
+    if name_filter:
+        query += " AND g.name LIKE ?"
+        params.append(f"%{name_filter}%")
+    if category_filter:
+        query += " AND g.category = ?"
+        params.append(category_filter)
+    query += f" ORDER BY bm25(gear_fts, {', '.join(str(w) for w in _SEARCH_RANK_WEIGHTS)}), g.id LIMIT ?"
+    params.append(limit)
+
+    make_item = projection.row_to_dict if projection else _row_mapper(as_dicts, embed_location)
+    cursor = db.execute(query, tuple(params))
+    results = [make_item(row) for row in cursor.fetchall()]
+    read_cache.store(cache_key, results, _GEAR_LIST_CACHE_TAGS, generation)
+    return results
 
-    cursor = db.execute(base_query, tuple(params))
-    gear_rows = cursor.fetchall()
-    return [_make_gear_in_db_from_row(row) for row in gear_rows]
+
+def rebuild_search_index(db: sqlite3.Connection) -> None:
+    """
+    Rebuilds gear_fts from the gear table. Needed once after the index is added to an existing database;
+    afterwards the triggers in schema.sql keep it current. Commits the transaction.
+    """
+    db.execute("INSERT INTO gear_fts (gear_fts) VALUES ('rebuild')")
+    db.commit()
+
+
+def get_gear_by_ids(db: sqlite3.Connection, gear_ids: Iterable[int]) -> List[GearInDB]:
+    """
+    Fetches several gear items (with location data) in one query, ordered by id.
+    Ids that don't exist are simply absent from the result.
+    """
+    # json_each() binds the whole id list as one parameter, so there is no limit on the number of ids.
+    query = _GEAR_WITH_LOCATION_SELECT + " WHERE g.id IN (SELECT value FROM json_each(?)) ORDER BY g.id"
+    cursor = db.execute(query, (json.dumps(list(gear_ids)),))
+    return [_make_gear_in_db_from_row(row) for row in cursor.fetchall()]
+
+
+def get_all_gear(db: sqlite3.Connection, name_filter: Optional[str], category_filter: Optional[str]) -> List[GearInDB]:
+    """
+    Fetches all gear items, optionally filtered by name and/or category, including location data.
+    Prefer iter_gear() or get_gear_page() for large catalogs. Results are cached per filter combination.
+    """
+    cache_key = ('all_gear', name_filter, category_filter)
+    cached, generation = read_cache.lookup(db, cache_key)
+    if cached is not MISSING:
+        return cached
+
+    items = list(iter_gear(db, name_filter, category_filter))
+    read_cache.store(cache_key, items, _GEAR_LIST_CACHE_TAGS, generation)
+    return items
 
 
-def update_gear(db: sqlite3.Connection, gear_id: int, gear_data: GearUpdate) -> Optional[GearInDB]:
+def update_gear(db: sqlite3.Connection, gear_id: int, gear_data: GearUpdate,
+                expected_version: Optional[int] = None) -> Optional[GearInDB]:
     """
-    Updates an existing gear item.
+    Updates an existing gear item and bumps its version.
     Only updates fields present in gear_data using model_dump(exclude_unset=True).
-    Commits transaction if successful.
+    With expected_version (the client's If-Match), the update only applies while the item is still at that version.
+    One UPDATE ... RETURNING statement; commits transaction if successful.
     Returns updated GearInDB or None if gear_id not found.
+    Raises change_tracking.VersionConflict if the item exists at a version other than expected_version.
     Raises sqlite3.IntegrityError for database integrity issues.
     """
-    existing_gear = get_gear_by_id(db, gear_id) # Check existence and get current data (not strictly needed here but good check)
-    if existing_gear is None:
-        return None
-
     update_fields = gear_data.model_dump(exclude_unset=True)
     if not update_fields:
-        return existing_gear # No fields to update, return current state
+        existing_gear = get_gear_by_id(db, gear_id) # No fields to update, return current state
+        if existing_gear is not None and expected_version is not None and existing_gear.version != expected_version:
+            raise VersionConflict('gear', gear_id, existing_gear.version)
+        return existing_gear
 
     set_clauses = [f"{field} = ?" for field in update_fields.keys()]
     params = list(update_fields.values())
     params.append(gear_id)
 
-    query = f"UPDATE gear SET {', '.join(set_clauses)} WHERE id = ?"
+    query = f"UPDATE gear SET {', '.join(set_clauses)}, version = version + 1 WHERE id = ?"
+    if expected_version is not None:
+        query += " AND version = ?"
+        params.append(expected_version)
 
     try:
-        db.execute(query, tuple(params))
+        row = db.execute(f"{query} {_GEAR_RETURNING}", tuple(params)).fetchone()
+        if row is None:
+            check_row_version(db, 'gear', gear_id, expected_version) # Missing, or at another version
+            return None
+        read_cache.note_row_write('gear', row['table_version'], [('gear', gear_id), ('gear', LISTS)])
         db.commit()
-        return get_gear_by_id(db, gear_id) # Fetch the updated record with location
+        return _make_gear_in_db_from_row(row)
     except sqlite3.IntegrityError:
         # db.rollback()
         raise
 
 
-def delete_gear(db: sqlite3.Connection, gear_id: int) -> bool:
+def delete_gear(db: sqlite3.Connection, gear_id: int, expected_version: Optional[int] = None) -> bool:
     """
-    Deletes a gear item by its ID.
-    Commits transaction if successful.
+    Deletes a gear item by its ID, only while it is at expected_version if one is given (If-Match).
+    One DELETE statement, whose change count tells whether the item existed. Commits transaction if successful.
     Returns True if deletion occurred, False if gear_id not found.
+    Raises change_tracking.VersionConflict if the item exists at a version other than expected_version.
     """
-    cursor = db.execute("SELECT id FROM gear WHERE id = ?", (gear_id,))
-    if cursor.fetchone() is None:
-        return False
+    query = "DELETE FROM gear WHERE id = ?"
+    params = (gear_id,)
+    if expected_version is not None:
+        query += " AND version = ?"
+        params += (expected_version,)
 
     try:
-        db.execute("DELETE FROM gear WHERE id = ?", (gear_id,))
+        row = db.execute(f"{query} RETURNING {table_version_returning('gear')}", params).fetchone()
+        if row is None:
+            check_row_version(db, 'gear', gear_id, expected_version)
+            return False
+        read_cache.note_row_write('gear', row['table_version'], [('gear', gear_id), ('gear', LISTS)])
         db.commit()
         return True
     except sqlite3.IntegrityError: # Should not happen with gear unless other tables FK to it without ON DELETE CASCADE/SET NULL
         # db.rollback()
         raise
+
+
+def update_gear_batch(db: sqlite3.Connection, patches: List[Tuple[int, GearUpdate]]) -> Tuple[List[GearInDB], List[int]]:
+    """
+    Applies a list of (gear_id, GearUpdate) patches in a single transaction with one commit.
+    Consecutive patches that set the same fields share one executemany() call; order is preserved.
+    Returns (updated items read back in one query, ids that were not found).
+    Raises sqlite3.IntegrityError (e.g. an invalid location_id); nothing is committed in that case.
+    """
+    runs = []
+    for gear_id, gear_data in patches:
+        update_fields = gear_data.model_dump(exclude_unset=True)
+        if not update_fields:
+            continue
+        fields = tuple(update_fields.keys())
+        if runs and runs[-1][0] == fields:
+            runs[-1][1].append(tuple(update_fields.values()) + (gear_id,))
+        else:
+            runs.append((fields, [tuple(update_fields.values()) + (gear_id,)]))
+
+    versions_before = read_cache.begin_write(db, ['gear']) if runs else {}
+    for fields, rows in runs:
+        set_clauses = ", ".join(f"{field} = ?" for field in fields)
+        db.executemany(f"UPDATE gear SET {set_clauses}, version = version + 1 WHERE id = ?", rows)
+    if runs:
+        read_cache.note_write(db, versions_before, [('gear', LISTS)] + [('gear', gear_id) for gear_id, _ in patches])
+    db.commit()
+
+    requested_ids = list(dict.fromkeys(gear_id for gear_id, _ in patches))
+    updated_items = get_gear_by_ids(db, requested_ids)
+    found_ids = {item.id for item in updated_items}
+    return updated_items, [gear_id for gear_id in requested_ids if gear_id not in found_ids]
+
+
+def move_gear(db: sqlite3.Connection, gear_ids: List[int], location_id: Optional[int]) -> Tuple[List[GearInDB], List[int]]:
+    """
+    Moves every listed gear item to location_id (None unassigns them) with one UPDATE and one commit.
+    Returns (moved items read back in one query, ids that were not found).
+    Raises sqlite3.IntegrityError if location_id doesn't exist.
+    """
+    requested_ids = list(dict.fromkeys(gear_ids))
+    versions_before = read_cache.begin_write(db, ['gear'])
+    db.execute(
+        "UPDATE gear SET location_id = ?, version = version + 1 WHERE id IN (SELECT value FROM json_each(?))",
+        (location_id, json.dumps(requested_ids))
+    )
+    read_cache.note_write(db, versions_before, [('gear', LISTS)] + [('gear', gear_id) for gear_id in requested_ids])
+    db.commit()
+
+    moved_items = get_gear_by_ids(db, requested_ids)
+    found_ids = {item.id for item in moved_items}
+    return moved_items, [gear_id for gear_id in requested_ids if gear_id not in found_ids]
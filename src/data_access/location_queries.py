@@ -1,5 +1,6 @@
+import json
 import sqlite3
-from typing import Optional, List
+from typing import Dict, Iterable, Optional, List, Sequence, Set, Tuple, Union
 
 # Assuming Pydantic models are in app.py or a models.py file accessible via from .. import
 # For now, to avoid circular dependency issues if models are in app.py and app.py imports these query files,
@@ -9,28 +10,117 @@ from typing import Optional, List
 # A better structure would be a dedicated models.py.
 # For the purpose of this task, we'll assume this import works or will be resolved later.
 from app import LocationCreate, LocationInDB, GearInDB, LocationUpdate # GearInDB for get_items_in_location
-from .gear_queries import _make_gear_in_db_from_row # Import from sibling module
+from app import LocationTotals, LocationSubtotal, LocationSummary
+from .gear_queries import _GEAR_WITH_LOCATION_SELECT, _GEAR_SELECT, _projection_select, _row_mapper, project_gear_fields # Import from sibling module
+from .read_cache import read_cache, table_version_returning, MISSING, LISTS
+from . import change_tracking
+from .change_tracking import check_row_version, VersionConflict
+from src.instrumentation import timed_models
+
+# RETURNING clause giving INSERT/UPDATE statements on locations the row as LocationInDB expects it, plus the
+# table_version column for read_cache.note_row_write().
+_LOCATION_RETURNING = f"RETURNING id, name, type, parent_id, version, {table_version_returning('locations')}"
+
+@timed_models
+def _make_location_in_db_from_row(row: sqlite3.Row) -> LocationInDB:
+    """Converts a locations row into a LocationInDB model."""
+    return LocationInDB.model_validate(dict(row))
+
+# --- Location closure table maintenance ---
+# location_closure holds one row per (ancestor, descendant) pair, including (id, id, 0) for every location.
+# A trigger in the schema adds the rows of a new location; the helpers below keep it in step when parent_id
+# changes, inside the caller's transaction. They do not commit.
+
+def _attach_subtree(db: sqlite3.Connection, location_id: int, parent_id: Optional[int]) -> None:
+    """
+    Records location_id's subtree, detached by _detach_subtree(), as hanging under parent_id.
+    """
+    if parent_id is None:
+        return
+    db.execute("""
+        INSERT OR REPLACE INTO location_closure (ancestor_id, descendant_id, depth)
+        SELECT p.ancestor_id, c.descendant_id, p.depth + c.depth + 1
+        FROM location_closure p, location_closure c
+        WHERE p.descendant_id = ? AND c.ancestor_id = ?
+    """, (parent_id, location_id))
+
+
+def _detach_subtree(db: sqlite3.Connection, location_id: int) -> None:
+    """Removes every path from location_id's strict ancestors into its subtree, making it a root."""
+    db.execute("""
+        DELETE FROM location_closure
+        WHERE descendant_id IN (SELECT descendant_id FROM location_closure WHERE ancestor_id = :id)
+          AND ancestor_id IN (SELECT ancestor_id FROM location_closure WHERE descendant_id = :id AND ancestor_id <> :id)
+    """, {"id": location_id})
+
+
+def rebuild_location_closure(db: sqlite3.Connection) -> None:
+    """
+    Recomputes the whole closure table from locations.parent_id.
+    Used when initializing or upgrading a database. Commits the transaction.
+    """
+    db.execute("DELETE FROM location_closure")
+    # Walk upwards from every location. The depth bound guarantees termination if parent_id data contains a cycle.
+    db.execute("""
+        WITH RECURSIVE paths(ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM locations
+            UNION ALL
+            SELECT l.parent_id, p.descendant_id, p.depth + 1
+            FROM paths p
+            JOIN locations l ON l.id = p.ancestor_id
+            WHERE l.parent_id IS NOT NULL AND p.depth < (SELECT COUNT(*) FROM locations)
+        )
+        INSERT OR IGNORE INTO location_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, MIN(depth) FROM paths GROUP BY ancestor_id, descendant_id
+    """)
+    db.commit()
+
+
+def is_descendant(db: sqlite3.Connection, location_id: int, ancestor_id: int) -> bool:
+    """
+    Returns True if location_id is ancestor_id itself or is nested (at any depth) inside it.
+    A single primary-key lookup on the closure table.
+    """
+    cursor = db.execute(
+        "SELECT 1 FROM location_closure WHERE ancestor_id = ? AND descendant_id = ?",
+        (ancestor_id, location_id)
+    )
+    return cursor.fetchone() is not None
+
+
+def get_location_subtree(db: sqlite3.Connection, location_id: int) -> Optional[List[LocationInDB]]:
+    """
+    Fetches a location and every location nested inside it, ordered by depth, in one query.
+    Returns None if the location doesn't exist.
+    """
+    query = """
+        SELECT l.id, l.name, l.type, l.parent_id, l.version
+        FROM location_closure c
+        JOIN locations l ON l.id = c.descendant_id
+        WHERE c.ancestor_id = ?
+        ORDER BY c.depth, l.id
+    """
+    rows = db.execute(query, (location_id,)).fetchall()
+    if not rows:
+        return None
+    return [_make_location_in_db_from_row(row) for row in rows]
+
 
 def create_location(db: sqlite3.Connection, location_data: LocationCreate) -> LocationInDB:
     """
-    Creates a new location in the database.
+    Creates a new location in the database, read back through the INSERT's RETURNING clause.
+    Its location_closure rows are added by a schema trigger, so this is a single statement.
     Commits the transaction if successful.
     Raises sqlite3.IntegrityError for database integrity issues.
     """
     try:
-        cursor = db.execute(
-            "INSERT INTO locations (name, type, parent_id) VALUES (?, ?, ?)",
+        created_location_row = db.execute(
+            f"INSERT INTO locations (name, type, parent_id) VALUES (?, ?, ?) {_LOCATION_RETURNING}",
             (location_data.name, location_data.type, location_data.parent_id)
-        )
+        ).fetchone()
+        read_cache.note_row_write('locations', created_location_row['table_version'], [('locations', LISTS)])
         db.commit()
-        new_location_id = cursor.lastrowid
-
-        created_location_row = db.execute("SELECT * FROM locations WHERE id = ?", (new_location_id,)).fetchone()
-        if created_location_row is None:
-            # This case should ideally not be reached if INSERT was successful and auto-increment ID works
-            raise Exception(f"Failed to fetch newly created location with id {new_location_id}")
-
-        return LocationInDB.model_validate(created_location_row)
+        return _make_location_in_db_from_row(created_location_row)
     except sqlite3.IntegrityError:
         # db.rollback() # Handled by app level error handler or teardown
         raise
@@ -42,19 +132,40 @@ def create_location(db: sqlite3.Connection, location_data: LocationCreate) -> Lo
 def get_location_by_id(db: sqlite3.Connection, location_id: int) -> Optional[LocationInDB]:
     """
     Fetches a single location by its ID.
-    Returns LocationInDB instance or None if not found.
+    Returns LocationInDB instance or None if not found. Served from the read cache when possible.
     """
+    cache_key = ('location_by_id', location_id)
+    cached, generation = read_cache.lookup(db, cache_key)
+    if cached is not MISSING:
+        return cached
+
     cursor = db.execute("SELECT * FROM locations WHERE id = ?", (location_id,))
     row = cursor.fetchone()
     if row is None:
         return None
-    return LocationInDB.model_validate(row)
+    location = _make_location_in_db_from_row(row)
+    read_cache.store(cache_key, location, ['locations', ('locations', location_id)], generation)
+    return location
+
+
+def get_location_ids(db: sqlite3.Connection) -> Set[int]:
+    """
+    Returns the ids of all locations.
+    Used to check location_id references for many rows at once (e.g. bulk imports) without a query per row.
+    """
+    return {row[0] for row in db.execute("SELECT id FROM locations")}
 
 
 def get_all_locations(db: sqlite3.Connection, name_filter: Optional[str], type_filter: Optional[str]) -> List[LocationInDB]:
     """
     Fetches all locations, optionally filtered by name and/or type.
+    Results are cached per filter combination.
     """
+    cache_key = ('all_locations', name_filter, type_filter)
+    cached, generation = read_cache.lookup(db, cache_key)
+    if cached is not MISSING:
+        return cached
+
     base_query = "SELECT * FROM locations"
     filters = []
     params = []
@@ -72,59 +183,103 @@ def get_all_locations(db: sqlite3.Connection, name_filter: Optional[str], type_f
 
     cursor = db.execute(base_query, tuple(params))
     location_rows = cursor.fetchall()
-    return [LocationInDB.model_validate(row) for row in location_rows]
+    locations = [_make_location_in_db_from_row(row) for row in location_rows]
+    read_cache.store(cache_key, locations, ['locations', ('locations', LISTS)], generation)
+    return locations
 
 
-def update_location(db: sqlite3.Connection, location_id: int, location_data: LocationUpdate) -> Optional[LocationInDB]:
+def update_location(db: sqlite3.Connection, location_id: int, location_data: LocationUpdate,
+                    expected_version: Optional[int] = None) -> Optional[LocationInDB]:
     """
-    Updates an existing location.
+    Updates an existing location and bumps its version.
     Only updates fields present in location_data.
+    With expected_version (the client's If-Match), the update only applies while the location is still at that version.
+    The row is updated and read back by one UPDATE ... RETURNING; re-parenting also updates the closure table.
     Commits transaction if successful.
     Returns updated LocationInDB or None if location_id not found.
+    Raises change_tracking.VersionConflict if the location exists at a version other than expected_version.
+    Raises ValueError if the new parent_id is the location itself or one of its descendants.
     Raises sqlite3.IntegrityError for database integrity issues.
     """
-    # First, check if the location exists
-    existing_location_row = db.execute("SELECT id FROM locations WHERE id = ?", (location_id,)).fetchone()
-    if existing_location_row is None:
-        return None
-
     update_fields = location_data.model_dump(exclude_unset=True)
     if not update_fields:
-        # No fields to update, but location exists. Return current state.
-        return get_location_by_id(db, location_id)
+        # No fields to update. Return current state.
+        existing_location = get_location_by_id(db, location_id)
+        if existing_location is not None and expected_version is not None and existing_location.version != expected_version:
+            raise VersionConflict('locations', location_id, existing_location.version)
+        return existing_location
+
+    reparenting = 'parent_id' in update_fields
+    new_parent_id = update_fields.get('parent_id')
+    if new_parent_id is not None:
+        # The cycle check, the UPDATE and the closure rewrite share one write transaction: checked before taking
+        # the lock, two concurrent moves could each pass it and together create a cycle.
+        if not db.in_transaction:
+            db.execute("BEGIN IMMEDIATE")
+        if is_descendant(db, new_parent_id, location_id):
+            db.rollback() # Releases the write lock
+            raise ValueError(f"Location {new_parent_id} is nested inside location {location_id}; moving it there would create a cycle")
 
     set_clauses = [f"{field} = ?" for field in update_fields.keys()]
     params = list(update_fields.values())
     params.append(location_id)
 
-    query = f"UPDATE locations SET {', '.join(set_clauses)} WHERE id = ?"
+    query = f"UPDATE locations SET {', '.join(set_clauses)}, version = version + 1 WHERE id = ?"
+    if expected_version is not None:
+        query += " AND version = ?"
+        params.append(expected_version)
 
     try:
-        db.execute(query, tuple(params))
+        updated_location_row = db.execute(f"{query} {_LOCATION_RETURNING}", tuple(params)).fetchone()
+        if updated_location_row is None:
+            check_row_version(db, 'locations', location_id, expected_version) # Missing, or at another version
+            return None
+        if reparenting:
+            _detach_subtree(db, location_id)
+            _attach_subtree(db, location_id, new_parent_id)
+        # Gear reads embed the location, so gear lists (and items tagged with this location) go too.
+        read_cache.note_row_write('locations', updated_location_row['table_version'],
+                                  [('locations', location_id), ('locations', LISTS), ('gear', LISTS)])
         db.commit()
-
-        updated_location_row = db.execute("SELECT * FROM locations WHERE id = ?", (location_id,)).fetchone()
-        if updated_location_row is None: # Should not happen
-            raise Exception("Failed to fetch location post-update, though update seemed successful.")
-        return LocationInDB.model_validate(updated_location_row)
+        return _make_location_in_db_from_row(updated_location_row)
     except sqlite3.IntegrityError:
         # db.rollback()
         raise
 
 
-def delete_location(db: sqlite3.Connection, location_id: int) -> bool:
+def delete_location(db: sqlite3.Connection, location_id: int, expected_version: Optional[int] = None) -> bool:
     """
-    Deletes a location by its ID.
+    Deletes a location by its ID, only while it is at expected_version if one is given (If-Match).
+    Child locations and the gear stored in it are unassigned (and their versions bumped).
+    The DELETE's change count tells whether the location existed; for a missing id the statements before it
+    match nothing. Only a conditional delete checks the version first, as those statements can't be made conditional.
     Commits transaction if successful.
     Returns True if deletion occurred, False if location_id not found.
+    Raises change_tracking.VersionConflict if the location exists at a version other than expected_version.
     """
-    # Check if location exists first
-    cursor = db.execute("SELECT id FROM locations WHERE id = ?", (location_id,))
-    if cursor.fetchone() is None:
-        return False
+    versions_before = read_cache.begin_write(db, ['locations', 'gear']) # The version check runs under the write lock
+    if expected_version is not None:
+        row = db.execute("SELECT version FROM locations WHERE id = ?", (location_id,)).fetchone()
+        if row is None or row[0] != expected_version:
+            db.rollback() # Releases the write lock
+            if row is None:
+                return False
+            raise VersionConflict('locations', location_id, row[0])
 
     try:
-        db.execute("DELETE FROM locations WHERE id = ?", (location_id,))
+        # Children become top-level locations (mirrors ON DELETE SET NULL on locations.parent_id).
+        _detach_subtree(db, location_id)
+        db.execute("DELETE FROM location_closure WHERE ancestor_id = ? OR descendant_id = ?", (location_id, location_id))
+        child_ids = [row[0] for row in db.execute("UPDATE locations SET parent_id = NULL, version = version + 1 WHERE parent_id = ? RETURNING id", (location_id,))]
+        # Likewise for the gear stored here (done explicitly rather than by ON DELETE SET NULL, to bump versions).
+        db.execute("UPDATE gear SET location_id = NULL, version = version + 1 WHERE location_id = ?", (location_id,))
+        if db.execute("DELETE FROM locations WHERE id = ?", (location_id,)).rowcount == 0:
+            return False
+        # The unassigned gear items are tagged with this location.
+        read_cache.note_write(
+            db, versions_before,
+            [('locations', location_id), ('locations', LISTS), ('gear', LISTS)] + [('locations', child_id) for child_id in child_ids]
+        )
         db.commit()
         return True
     except sqlite3.IntegrityError: # Should be less likely due to ON DELETE SET NULL
@@ -132,27 +287,190 @@ def delete_location(db: sqlite3.Connection, location_id: int) -> bool:
         raise
 
 
-def get_items_in_location(db: sqlite3.Connection, location_id: int) -> Optional[List[GearInDB]]:
+def get_locations_by_ids(db: sqlite3.Connection, location_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Fetches several locations in one query, as {id: location dict} with the same keys as LocationInDB.model_dump().
+    Used to return one deduplicated location map alongside a list of gear items. Missing ids are left out.
+    """
+    rows = db.execute(
+        "SELECT id, name, type, parent_id, version FROM locations WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(location_ids)),)
+    ).fetchall()
+    return {row[0]: {'name': row[1], 'type': row[2], 'parent_id': row[3], 'id': row[0], 'version': row[4]} for row in rows}
+
+
+def get_items_in_location(db: sqlite3.Connection, location_id: int, as_dicts: bool = False,
+                          embed_location: bool = True, fields: Optional[Sequence[str]] = None) -> Optional[List[Union[GearInDB, dict]]]:
     """
     Fetches all gear items for a given location_id.
     Returns a list of GearInDB items, or None if the location itself doesn't exist.
-    Uses _make_gear_in_db_from_row (or similar logic) for object creation.
+    With as_dicts=True, the items are plain dicts from gear_row_to_dict() (no Pydantic validation);
+    with embed_location=False, flat dicts from gear_row_to_flat_dict(), read without joining locations.
+    `fields` narrows the selected columns as in gear_queries.iter_gear().
+    Results are cached per location.
     """
+    fields = tuple(fields) if fields is not None else None
+    cache_key = ('items_in_location', location_id, as_dicts, embed_location, fields)
+    cached, generation = read_cache.lookup(db, cache_key)
+    if cached is not MISSING:
+        return cached
+
     loc_cursor = db.execute("SELECT id FROM locations WHERE id = ?", (location_id,))
     if loc_cursor.fetchone() is None:
         return None # Location not found
 
+    projection = project_gear_fields(fields) if fields is not None else None
+    if projection is not None:
+        select, make_item = _projection_select(projection), projection.row_to_dict
+    else:
+        select = _GEAR_WITH_LOCATION_SELECT if embed_location else _GEAR_SELECT
+        make_item = _row_mapper(as_dicts, embed_location) # Imported from .gear_queries
+    gear_cursor = db.execute(select + " WHERE g.location_id = ?", (location_id,))
+    gear_rows = gear_cursor.fetchall()
+
+    gear_list = [make_item(row) for row in gear_rows]
+    read_cache.store(cache_key, gear_list, ['gear', 'locations', ('gear', LISTS), ('locations', location_id)], generation)
+    return gear_list
+
+
+def get_location_totals(db: sqlite3.Connection, location_id: int) -> Optional[LocationSummary]:
+    """
+    Computes item count, weight, cost and value for a location and all of its nested locations.
+    Everything is aggregated by a single query over the closure table; no gear rows leave the database.
+    Returns a LocationSummary with a subtotal per immediate child, or None if the location doesn't exist.
+    """
+    # For each descendant d at depth n below the root, its ancestor at depth n - 1 above d is the root's
+    # immediate child that d sits under (none for the root itself). Grouping by that "branch" yields both the
+    # direct totals and a recursive subtotal per child in one pass.
     query = """
         SELECT
-            g.id, g.name, g.description, g.weight, g.cost, g.value, g.legality, g.category, g.location_id,
-            l.id as loc_id, l.name as loc_name, l.type as loc_type, l.parent_id as loc_parent_id
+            b.ancestor_id AS branch_id, bl.name AS branch_name,
+            COUNT(g.id) AS item_count,
+            COALESCE(SUM(g.weight), 0.0) AS total_weight,
+            COALESCE(SUM(g.cost), 0.0) AS total_cost,
+            COALESCE(SUM(g.value), 0.0) AS total_value
+        FROM location_closure c
+        LEFT JOIN location_closure b ON b.descendant_id = c.descendant_id AND b.depth = c.depth - 1
+        LEFT JOIN locations bl ON bl.id = b.ancestor_id
+        LEFT JOIN gear g ON g.location_id = c.descendant_id
+        WHERE c.ancestor_id = :root_id
+        GROUP BY b.ancestor_id
+        ORDER BY b.ancestor_id
+    """
+    rows = db.execute(query, {"root_id": location_id}).fetchall()
+    if not rows:
+        return None # Location not found
+
+    summary = LocationSummary(location_id=location_id)
+    for row in rows:
+        totals = LocationTotals(
+            item_count=row['item_count'],
+            total_weight=row['total_weight'],
+            total_cost=row['total_cost'],
+            total_value=row['total_value'],
+        )
+        if row['branch_id'] is None:
+            summary.direct = totals
+        else:
+            summary.children.append(LocationSubtotal(location_id=row['branch_id'], name=row['branch_name'], **totals.model_dump()))
+        summary.item_count += totals.item_count
+        summary.total_weight += totals.total_weight
+        summary.total_cost += totals.total_cost
+        summary.total_value += totals.total_value
+    return summary
+
+
+def _loadout_queries(scoped: bool) -> Tuple[str, str, str]:
+    """
+    The three grouped queries behind get_loadout(): locations, their items, and recursive totals per location.
+    When scoped, each is limited to the subtree of :root_id through the closure table (alias s).
+    """
+    scope = "JOIN location_closure s ON s.descendant_id = {column} AND s.ancestor_id = :root_id" if scoped else ""
+    locations_query = f"""
+        SELECT l.id, l.name, l.type, l.parent_id
+        FROM locations l
+        {scope.format(column="l.id")}
+        ORDER BY l.id
+    """
+    items_query = f"""
+        SELECT g.location_id, g.id, g.name, g.weight, g.value
         FROM gear g
-        LEFT JOIN locations l ON g.location_id = l.id
-        WHERE g.location_id = ?
+        {scope.format(column="g.location_id")}
+        WHERE g.location_id IS NOT NULL
+        ORDER BY g.location_id, g.id
     """
-    gear_cursor = db.execute(query, (location_id,))
-    gear_rows = gear_cursor.fetchall()
+    # Every closure row (a, d) adds d's items to a's totals, so grouping by ancestor gives recursive totals.
+    totals_query = f"""
+        SELECT
+            c.ancestor_id,
+            COUNT(g.id) AS item_count,
+            COALESCE(SUM(g.weight), 0.0) AS total_weight,
+            COALESCE(SUM(g.cost), 0.0) AS total_cost,
+            COALESCE(SUM(g.value), 0.0) AS total_value
+        FROM location_closure c
+        {scope.format(column="c.ancestor_id")}
+        JOIN gear g ON g.location_id = c.descendant_id
+        GROUP BY c.ancestor_id
+    """
+    return locations_query, items_query, totals_query
 
-    # _make_gear_in_db_from_row is now imported from .gear_queries
-    gear_list = [_make_gear_in_db_from_row(row) for row in gear_rows]
-    return gear_list
+
+def get_loadout(db: sqlite3.Connection, root_id: Optional[int] = None) -> Optional[dict]:
+    """
+    Builds the paperdoll's whole equipped state in one read transaction, as JSON-ready dicts:
+    {"version": ..., "body_slots": [node, ...], "containers": [node, ...]} where each top-level location is a node
+    {"id", "name", "type", "parent_id", "items": [{"id", "name", "weight", "value"}, ...],
+     "totals": {"item_count", "total_weight", "total_cost", "total_value"}, "children": [node, ...]}.
+    Totals include nested locations. Top-level Body Slot nodes go in body_slots, the other types in containers.
+    "version" is the gear/locations change counters the snapshot was read at.
+    With root_id, only that location's subtree is returned (None if it doesn't exist).
+    Results are cached per root.
+    """
+    cache_key = ('loadout', root_id)
+    cached, generation = read_cache.lookup(db, cache_key)
+    if cached is not MISSING:
+        return cached
+
+    locations_query, items_query, totals_query = _loadout_queries(root_id is not None)
+    params = {"root_id": root_id}
+    started_transaction = not db.in_transaction
+    if started_transaction:
+        db.execute("BEGIN") # One snapshot for all four reads, so totals always match the items
+    try:
+        versions = change_tracking.get_table_versions(db, ('gear', 'locations'))
+        location_rows = db.execute(locations_query, params).fetchall()
+        item_rows = db.execute(items_query, params).fetchall()
+        total_rows = db.execute(totals_query, params).fetchall()
+    finally:
+        if started_transaction:
+            db.rollback() # Read-only
+    if root_id is not None and not location_rows:
+        return None # Location not found
+
+    nodes = {}
+    for location_id, name, location_type, parent_id in location_rows:
+        nodes[location_id] = {
+            'id': location_id, 'name': name, 'type': location_type, 'parent_id': parent_id, 'items': [],
+            'totals': {'item_count': 0, 'total_weight': 0.0, 'total_cost': 0.0, 'total_value': 0.0},
+            'children': [],
+        }
+    for location_id, gear_id, name, weight, value in item_rows:
+        nodes[location_id]['items'].append({'id': gear_id, 'name': name, 'weight': weight, 'value': value})
+    for location_id, item_count, total_weight, total_cost, total_value in total_rows:
+        nodes[location_id]['totals'] = {'item_count': item_count, 'total_weight': total_weight,
+                                        'total_cost': total_cost, 'total_value': total_value}
+
+    loadout = {
+        'version': f"{versions[change_tracking.EPOCH_KEY]}.{versions['gear']}.{versions['locations']}",
+        'body_slots': [],
+        'containers': [],
+    }
+    for node in nodes.values(): # In id order, so children lists are too
+        parent = None if node['id'] == root_id else nodes.get(node['parent_id'])
+        if parent is not None:
+            parent['children'].append(node)
+        else:
+            loadout['body_slots' if node['type'] == 'Body Slot' else 'containers'].append(node)
+
+    read_cache.store(cache_key, loadout, ['gear', 'locations', ('gear', LISTS), ('locations', LISTS)], generation)
+    return loadout
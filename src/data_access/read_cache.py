@@ -0,0 +1,233 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from .change_tracking import EPOCH_KEY, TRACKED_TABLES
+
+# Returned by ReadCache.lookup() when the key isn't cached (None is a legitimate cached value for nothing).
+MISSING = object()
+
+_SYNC_TABLES_JSON = json.dumps([EPOCH_KEY] + list(TRACKED_TABLES))
+
+# Tag carried by every cached list result of a table, e.g. ('gear', LISTS).
+LISTS = 'lists'
+
+
+def table_version_returning(table: str) -> str:
+    """
+    A RETURNING column (table_version) giving a single-row write the table's change counter as it was before the
+    statement, for note_row_write(). The uncorrelated subquery is evaluated before the statement's own triggers bump
+    the counter; were that ever not the case, note_row_write() would merely drop more entries than needed.
+    """
+    if table not in TRACKED_TABLES:
+        raise ValueError(f"Table without a change counter: {table}")
+    return f"(SELECT version FROM table_versions WHERE table_name = '{table}') AS table_version"
+
+
+class ReadCache:
+    """
+    A bounded LRU cache with a TTL for built read results (GearInDB/LocationInDB objects and lists),
+    owned by one worker process. Cached values are shared between requests and must be treated as read-only.
+
+    Every entry carries tags: the tables it was read from ('gear'), the rows it contains (('gear', 42)) and,
+    for list results, (table, LISTS). Write functions in the data-access layer call note_row_write() or
+    note_write() inside their transaction, which drops exactly the entries tagged with what they changed.
+
+    Other workers' writes are detected through the database: the schema triggers count every row change in
+    table_versions. Before each lookup, sync() compares the counters with what this worker last saw and drops
+    every entry of a table another process (or a manual edit) has written to. A write of this worker tells, from
+    the counters as they were when it took the write lock, whether anyone else wrote since; if not, it adopts the
+    counters its own write leads to, so that the rest of the cache stays valid.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 60.0):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, frozenset, Any]]" = OrderedDict()
+        self._keys_by_tag: Dict[Hashable, set] = {}
+        self._known: Dict[str, int] = {} # table -> change counter this worker's entries match
+        self._epoch: Optional[int] = None
+        self._generation = 0 # Bumped by every invalidation; see store()
+        self.configure(max_entries, ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0 # Entries dropped to stay within max_entries
+        self.expirations = 0 # Entries found past their TTL
+        self.invalidations = 0 # Entries dropped because their data was written to
+
+    def configure(self, max_entries: int, ttl_seconds: float) -> None:
+        """Resizes the cache and empties it. max_entries <= 0 disables caching."""
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl_seconds = ttl_seconds
+            self._clear_locked()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_locked()
+
+    def _clear_locked(self) -> None:
+        self._entries.clear()
+        self._keys_by_tag.clear()
+        self._known.clear()
+        self._epoch = None
+        self._generation += 1
+
+    # --- Reads ---
+
+    def lookup(self, db: sqlite3.Connection, key: Hashable) -> Tuple[Any, int]:
+        """
+        Returns (value, generation) for key, with value MISSING if it isn't cached (or the cache is disabled).
+        Pass the generation to store() along with the value read from the database.
+        """
+        if not self.enabled:
+            return MISSING, self._generation
+        self.sync(db)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, self._generation
+                self._remove_locked(key)
+                self.expirations += 1
+            self.misses += 1
+            return MISSING, self._generation
+
+    def store(self, key: Hashable, value: Any, tags: Iterable[Hashable], generation: int) -> None:
+        """
+        Caches value under key. Skipped if anything was invalidated since lookup() returned `generation`,
+        since the value may then have been read before a write that this worker has already applied.
+        """
+        if not self.enabled:
+            return
+        tags = frozenset(tags)
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, tags, value)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove_locked(self, key: Hashable) -> None:
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def _invalidate_locked(self, tags: Iterable[Hashable]) -> None:
+        self._generation += 1
+        for tag in tags:
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._remove_locked(key)
+                self.invalidations += 1
+
+    def invalidate(self, tags: Iterable[Hashable]) -> None:
+        """Drops every entry carrying any of the tags."""
+        with self._lock:
+            self._invalidate_locked(tags)
+
+    # --- Cross-process invalidation ---
+
+    def sync(self, db: sqlite3.Connection) -> None:
+        """Drops the entries of every table whose change counter moved since this worker last saw it."""
+        rows = db.execute(
+            "SELECT table_name, version FROM table_versions WHERE table_name IN (SELECT value FROM json_each(?))",
+            (_SYNC_TABLES_JSON,)
+        ).fetchall()
+        state = {row[0]: row[1] for row in rows}
+        with self._lock:
+            epoch = state.get(EPOCH_KEY)
+            if epoch != self._epoch:
+                # A different (e.g. re-initialized) database: nothing cached can be trusted.
+                self._clear_locked()
+                self._epoch = epoch
+            for table in TRACKED_TABLES:
+                current = state.get(table)
+                if current != self._known.get(table):
+                    self._invalidate_locked([table])
+                    self._known[table] = current
+
+    def _adopt_locked(self, table: str, before: Optional[int], after: Optional[int]) -> None:
+        """This worker's write moved table's counter from `before` to `after`."""
+        if before is None or before != self._known.get(table):
+            self._invalidate_locked([table]) # Another process wrote since this worker last synced
+        self._known[table] = after
+
+    def note_row_write(self, table: str, table_version: int, tags: Iterable[Hashable]) -> None:
+        """
+        Records a write of one row by a single statement, given the table_version column that
+        table_version_returning() added to its RETURNING clause. Drops the entries tagged with `tags`.
+        Runs no SQL: the statement's trigger bumps the counter by exactly one.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._invalidate_locked(tags)
+            self._adopt_locked(table, table_version, table_version + 1)
+
+    def begin_write(self, db: sqlite3.Connection, tables: Iterable[str]) -> Dict[str, int]:
+        """
+        For writes of several statements: call it before the first one, and pass its result to note_write().
+        Takes the write lock (BEGIN IMMEDIATE) unless a transaction is already open, whether or not the cache
+        is enabled: the counters it returns, and anything the write checks before its first statement (such as
+        an If-Match version), must be the state the writes start from. Returns {} when the cache is disabled.
+        """
+        if not db.in_transaction:
+            db.execute("BEGIN IMMEDIATE")
+        if not self.enabled:
+            return {}
+        return self._read_versions(db, tables)
+
+    def note_write(self, db: sqlite3.Connection, versions_before: Dict[str, int], tags: Iterable[Hashable]) -> None:
+        """
+        Records a write of several statements, made since begin_write() returned versions_before; call it after
+        the writes and before commit(). Drops the entries tagged with `tags` and reads the tables' new counters.
+        """
+        if not self.enabled:
+            return
+        versions = self._read_versions(db, versions_before)
+        with self._lock:
+            self._invalidate_locked(tags)
+            for table, before in versions_before.items():
+                self._adopt_locked(table, before, versions.get(table))
+
+    @staticmethod
+    def _read_versions(db: sqlite3.Connection, tables: Iterable[str]) -> Dict[str, int]:
+        return dict(db.execute(
+            "SELECT table_name, version FROM table_versions WHERE table_name IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(tables)),)
+        ).fetchall())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# The worker's cache, sized from the Flask config by app.py.
+read_cache = ReadCache()
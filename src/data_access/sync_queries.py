@@ -0,0 +1,68 @@
+import json
+import sqlite3
+from typing import Optional
+
+from .change_tracking import EPOCH_KEY
+from .gear_queries import _GEAR_SELECT, gear_row_to_flat_dict
+
+# Delta sync (GET /api/sync) over the row_changes log that the triggers in schema.sql keep for gear and locations.
+
+
+def get_changes_since(db: sqlite3.Connection, since: int, limit: int, epoch: Optional[str] = None) -> dict:
+    """
+    Returns the gear and location rows changed after change sequence number `since`, oldest change first,
+    for at most `limit` changes, read in one transaction from the row_changes log kept by the schema triggers:
+    {"seq": last seq included, "has_more": bool, "reset": bool, "epoch": database epoch,
+     "gear": [flat gear dicts], "locations": [location dicts], "deleted": {"gear": [ids], "locations": [ids]}}.
+    Pass "seq" back as `since` and "epoch" as `epoch` to continue; while has_more is true there are further
+    changes to fetch. The epoch is a string, as JavaScript numbers can't hold all of its 63 bits.
+    A different `epoch` means the client synced with another database (e.g. before `flask init-db`), whose seqs
+    mean nothing here; so does a `since` beyond the newest seq, for clients that don't send the epoch.
+    The changes are then returned from the beginning with reset=True, and the client should drop its copy.
+    """
+    started_transaction = not db.in_transaction
+    if started_transaction:
+        db.execute("BEGIN") # The log and the rows it points to must come from the same snapshot
+    try:
+        current_epoch = str(db.execute("SELECT version FROM table_versions WHERE table_name = ?", (EPOCH_KEY,)).fetchone()[0])
+        latest_seq = db.execute("SELECT COALESCE(MAX(seq), 0) FROM row_changes").fetchone()[0]
+        reset = since > latest_seq or (epoch is not None and epoch != current_epoch)
+        if reset:
+            since = 0
+        change_rows = db.execute(
+            "SELECT seq, table_name, row_id, deleted FROM row_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (since, limit + 1)
+        ).fetchall()
+        has_more = len(change_rows) > limit
+        change_rows = change_rows[:limit]
+
+        changed = {'gear': [], 'locations': []}
+        deleted = {'gear': [], 'locations': []}
+        for _, table_name, row_id, is_deleted in change_rows:
+            (deleted if is_deleted else changed)[table_name].append(row_id)
+
+        gear = []
+        if changed['gear']:
+            rows = db.execute(_GEAR_SELECT + " WHERE g.id IN (SELECT value FROM json_each(?)) ORDER BY g.id",
+                              (json.dumps(changed['gear']),)).fetchall()
+            gear = [gear_row_to_flat_dict(row) for row in rows]
+        locations = []
+        if changed['locations']:
+            rows = db.execute(
+                "SELECT id, name, type, parent_id, version FROM locations WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id",
+                (json.dumps(changed['locations']),)
+            ).fetchall()
+            locations = [{'name': row[1], 'type': row[2], 'parent_id': row[3], 'id': row[0], 'version': row[4]} for row in rows]
+    finally:
+        if started_transaction:
+            db.rollback() # Read-only
+
+    return {
+        'seq': change_rows[-1][0] if change_rows else since,
+        'has_more': has_more,
+        'reset': reset,
+        'epoch': current_epoch,
+        'gear': gear,
+        'locations': locations,
+        'deleted': deleted,
+    }
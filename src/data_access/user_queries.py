@@ -1,17 +1,91 @@
 import sqlite3
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # Assuming Pydantic models are in app.py or a models.py file accessible.
 from app import UserCreate, UserInDB # UserBase is implicitly handled by UserInDB for returns
 
-def create_user(db: sqlite3.Connection, user_data: UserCreate) -> UserInDB:
+class UserCache:
+    """
+    Per-worker LRU cache of UserInDB by id with a TTL, in front of the JWT user lookup that runs on every
+    authenticated request. Hits don't touch the database (or check out a pooled connection) at all.
+    User writes in this module invalidate entries in this worker; the TTL bounds how long another worker's
+    change can go unnoticed.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.configure(max_entries, ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_entries: int, ttl_seconds: float) -> None:
+        """Resizes the cache and empties it. max_entries <= 0 disables caching."""
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl_seconds = ttl_seconds
+            self._entries.clear()
+
+    def get(self, user_id: int) -> Optional[UserInDB]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None
+
+    def put(self, user: UserInDB) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# The worker's user cache, sized from the Flask config by app.py.
+user_cache = UserCache()
+
+
+def create_user(db: sqlite3.Connection, user_data: UserCreate,
+                hash_password: Callable[[str], str] = generate_password_hash) -> UserInDB:
     """
     Creates a new user in the database with a hashed password.
+    `hash_password` turns the plain password into the stored hash (the app passes its PasswordHasher.hash);
+    it runs before the INSERT, so no write lock is held while hashing.
     Commits the transaction if successful.
     Raises sqlite3.IntegrityError if the username already exists.
     """
-    hashed_password = generate_password_hash(user_data.password)
+    hashed_password = hash_password(user_data.password)
     try:
         cursor = db.execute(
             "INSERT INTO users (username, password_hash) VALUES (?, ?)",
@@ -19,12 +93,13 @@ def create_user(db: sqlite3.Connection, user_data: UserCreate) -> UserInDB:
         )
         db.commit()
         new_user_id = cursor.lastrowid
+        user_cache.invalidate(new_user_id) # The id may have belonged to a user of a previous database
         # Fetch the user to return as UserInDB (without password hash)
         created_user_row = db.execute("SELECT id, username FROM users WHERE id = ?", (new_user_id,)).fetchone()
         if created_user_row is None:
             # This should not happen if INSERT was successful
             raise Exception(f"Failed to fetch newly created user with id {new_user_id} after insert.")
-        return UserInDB.model_validate(created_user_row)
+        return UserInDB.model_validate(dict(created_user_row))
     except sqlite3.IntegrityError: # Handles UNIQUE constraint on username
         # db.rollback() should be handled by the route calling this if an error bubbles up
         raise
@@ -38,6 +113,16 @@ def get_user_row_by_username(db: sqlite3.Connection, username: str) -> Optional[
     row = cursor.fetchone()
     return row
 
+def update_password_hash(db: sqlite3.Connection, user_id: int, password_hash: str) -> bool:
+    """
+    Replaces a user's stored password hash, e.g. to upgrade it to the configured method after a successful login.
+    Commits the transaction if successful.
+    Returns True if the user exists.
+    """
+    cursor = db.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
+    db.commit()
+    return cursor.rowcount > 0
+
 def get_user_by_id(db: sqlite3.Connection, user_id: int) -> Optional[UserInDB]:
     """
     Fetches a user by their ID.
@@ -48,4 +133,4 @@ def get_user_by_id(db: sqlite3.Connection, user_id: int) -> Optional[UserInDB]:
     row = cursor.fetchone()
     if row is None:
         return None
-    return UserInDB.model_validate(row)
+    return UserInDB.model_validate(dict(row))
@@ -0,0 +1,95 @@
+import os
+import re
+import sqlite3
+from typing import List, NamedTuple, Optional, Tuple
+
+# Schema migrations, tracked in the database's PRAGMA user_version. Migration 1 is schema.sql, the baseline
+# schema (idempotent, so it also completes databases created before migrations existed); the later ones are the
+# numbered scripts in migrations/, named NNNN_description.sql and numbered from 2 without gaps.
+# A script is applied once, and never edited after it has shipped: change the schema with a new script instead.
+
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_SCRIPT = os.path.join(DATABASE_DIR, 'schema.sql')
+MIGRATIONS_DIR = os.path.join(DATABASE_DIR, 'migrations')
+
+_SCRIPT_NAME = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+class Migration(NamedTuple):
+    version: int # The user_version the database is at once the script has been applied
+    name: str
+    path: str
+
+
+def list_migrations(migrations_dir: str = MIGRATIONS_DIR) -> List[Migration]:
+    """
+    Returns every migration in order, starting with the baseline schema.sql.
+    Raises ValueError for a misnamed .sql file or a gap or duplicate in the numbering.
+    """
+    migrations = [Migration(1, 'schema', BASELINE_SCRIPT)]
+    for filename in sorted(os.listdir(migrations_dir)):
+        if not filename.endswith('.sql'):
+            continue
+        match = _SCRIPT_NAME.match(filename)
+        if match is None:
+            raise ValueError(f"Migration script {filename} isn't named NNNN_description.sql")
+        migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(migrations_dir, filename)))
+    for expected, migration in enumerate(migrations, start=1):
+        if migration.version != expected:
+            raise ValueError(f"Expected migration {expected}, found {os.path.basename(migration.path)}")
+    return migrations
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """The number of the last migration applied to the database (0 for a new or pre-migration database)."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _split_statements(script: str) -> List[str]:
+    """Splits an SQL script into single statements (trigger bodies included), for execution inside a transaction."""
+    statements = []
+    pending = ''
+    for line in script.splitlines(keepends=True):
+        pending += line
+        if sqlite3.complete_statement(pending):
+            statements.append(pending)
+            pending = ''
+    if any(line.strip() and not line.strip().startswith('--') for line in pending.splitlines()):
+        raise ValueError(f"Incomplete SQL statement at the end of the script: {pending.strip()[:80]}")
+    return statements
+
+
+def migrate(conn: sqlite3.Connection, migrations: Optional[List[Migration]] = None) -> Tuple[int, int]:
+    """
+    Applies the migrations the database hasn't had yet, in order. Each one runs in its own write transaction,
+    together with the user_version update that records it, so a failing script leaves the database at the
+    previous version. Safe to run from several processes at once: whoever gets the write lock first applies
+    a migration, and the others see the new user_version and skip it.
+    Returns (version before, version after).
+    Raises RuntimeError if the database is at a newer version than the last migration (newer code migrated it).
+    """
+    if migrations is None:
+        migrations = list_migrations()
+    latest = migrations[-1].version
+    start = get_schema_version(conn)
+    if start > latest:
+        raise RuntimeError(f"The database is at schema version {start}, newer than this code's latest migration ({latest})")
+
+    for migration in migrations[start:]:
+        with open(migration.path, mode='r') as f:
+            statements = _split_statements(f.read())
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= migration.version: # Applied by another process meanwhile
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return start, get_schema_version(conn)
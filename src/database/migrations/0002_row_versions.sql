@@ -0,0 +1,6 @@
+-- src/database/migrations/0002_row_versions.sql
+-- Row versions for optimistic concurrency: bumped by every write to the row through the data-access layer,
+-- and compared against the If-Match header of conditional PUT/PATCH/DELETE requests.
+
+ALTER TABLE locations ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE gear ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,10 @@
+-- src/database/migrations/0003_location_closure_insert_trigger.sql
+-- Add the location_closure rows of a new location in the INSERT itself: its self row, plus one row per ancestor
+-- of its parent. Re-parenting existing locations is still handled by location_queries.py.
+
+CREATE TRIGGER IF NOT EXISTS locations_closure_after_insert AFTER INSERT ON locations BEGIN
+    INSERT OR IGNORE INTO location_closure (ancestor_id, descendant_id, depth)
+    SELECT new.id, new.id, 0
+    UNION ALL
+    SELECT ancestor_id, new.id, depth + 1 FROM location_closure WHERE descendant_id = new.parent_id;
+END;
@@ -0,0 +1,6 @@
+-- src/database/migrations/0004_drop_cache_stamps.sql
+-- The read cache now tells its own writes from other processes' by the table_versions counters alone
+-- (src/data_access/read_cache.py), so writes no longer bump a separate stamp. schema.sql no longer creates the
+-- table; this drops it from databases created while it did.
+
+DROP TABLE IF EXISTS cache_stamps;
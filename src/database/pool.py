@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from src.instrumentation import InstrumentedConnection
+
+# Values accepted for the PRAGMAs that can't be bound as parameters and are interpolated into the statement.
+_JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+_SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+
+class ConnectionPool:
+    """
+    A bounded pool of long-lived SQLite connections to one database file.
+
+    Connections are configured once when they are opened (row factory, PRAGMAs) and then reused across
+    requests. At most `max_size` idle connections are kept; if more are checked out at once the extra ones
+    are opened on demand and closed when they are returned.
+    The pool belongs to a single process: a pool inherited through fork() is discarded by get_pool().
+    """
+
+    def __init__(self, db_path: str, max_size: int = 8, journal_mode: str = 'WAL', synchronous: str = 'NORMAL',
+                 cache_size_kib: int = 16384, mmap_size: int = 268435456, busy_timeout_ms: int = 5000,
+                 factory: type = sqlite3.Connection):
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in _JOURNAL_MODES:
+            raise ValueError(f"Unsupported SQLite journal_mode: {journal_mode}")
+        if synchronous not in _SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unsupported SQLite synchronous level: {synchronous}")
+
+        self.db_path = db_path
+        self.max_size = max_size
+        self.pid = os.getpid()
+        self._pragmas = [
+            f"PRAGMA journal_mode = {journal_mode}",
+            f"PRAGMA synchronous = {synchronous}",
+            f"PRAGMA cache_size = {-int(cache_size_kib)}", # Negative values are in KiB rather than pages
+            f"PRAGMA mmap_size = {int(mmap_size)}",
+            "PRAGMA foreign_keys = ON",
+        ]
+        self._busy_timeout = busy_timeout_ms / 1000.0
+        self._factory = factory # Connection class, e.g. InstrumentedConnection
+        self._idle = []
+        self._lock = threading.Lock()
+        self.hits = 0 # acquire() served by an idle connection
+        self.misses = 0 # acquire() had to open a new connection
+        self.discards = 0 # release() closed a connection because the pool was full
+        self.checked_out = 0
+
+    def connect(self) -> sqlite3.Connection:
+        """Opens a new connection configured like the pooled ones. It isn't tracked by the pool."""
+        conn = sqlite3.connect(
+            self.db_path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            timeout=self._busy_timeout,
+            check_same_thread=False, # The pool guarantees a connection is only used by one request at a time
+            factory=self._factory,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self._pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Checks out a connection, reusing an idle one when available."""
+        with self._lock:
+            self.checked_out += 1
+            if self._idle:
+                self.hits += 1
+                return self._idle.pop()
+            self.misses += 1
+        return self.connect()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Returns a connection to the pool. Any transaction left open by the request is rolled back."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A connection in an unknown state is not worth keeping.
+            self._close_quietly(conn)
+            with self._lock:
+                self.checked_out -= 1
+                self.discards += 1
+            return
+
+        with self._lock:
+            self.checked_out -= 1
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+            self.discards += 1
+        self._close_quietly(conn)
+
+    def close_all(self) -> None:
+        """Closes every idle connection. Checked-out connections are closed when they are released."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.max_size = 0 # Connections released after this point are closed rather than kept
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "checked_out": self.checked_out,
+                "hits": self.hits,
+                "misses": self.misses,
+                "discards": self.discards,
+            }
+
+    @staticmethod
+    def _close_quietly(conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str, config) -> ConnectionPool:
+    """
+    Returns this process's pool for db_path, creating it from the Flask config on first use.
+    Pools created before a fork are dropped (without closing the parent's connections) and rebuilt.
+    """
+    pool = _pools.get(db_path)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None or pool.pid != os.getpid():
+            pool = ConnectionPool(
+                db_path,
+                max_size=config['DB_POOL_SIZE'],
+                journal_mode=config['SQLITE_JOURNAL_MODE'],
+                synchronous=config['SQLITE_SYNCHRONOUS'],
+                cache_size_kib=config['SQLITE_CACHE_SIZE_KIB'],
+                mmap_size=config['SQLITE_MMAP_SIZE'],
+                busy_timeout_ms=config['SQLITE_BUSY_TIMEOUT_MS'],
+                factory=InstrumentedConnection if config['REQUEST_INSTRUMENTATION'] else sqlite3.Connection,
+            )
+            _pools[db_path] = pool
+        return pool
+
+
+def dispose_pool(db_path: str) -> None:
+    """Closes and forgets the pool for db_path, e.g. before the database file is deleted."""
+    with _pools_lock:
+        pool = _pools.pop(db_path, None)
+    if pool is not None and pool.pid == os.getpid():
+        pool.close_all()
+
+
+def get_existing_pool(db_path: str) -> Optional[ConnectionPool]:
+    """Returns the current process's pool for db_path without creating one."""
+    pool = _pools.get(db_path)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    return None
@@ -1,4 +1,7 @@
 -- src/database/schema.sql
+-- Baseline schema: migration 1 of src/database/migrate.py, applied by `flask migrate`. Later schema changes are
+-- the numbered scripts in migrations/. Every statement is idempotent so the file also completes databases
+-- created before migrations existed. Initial data lives in seed.sql.
 
 PRAGMA foreign_keys = ON; -- Enforce foreign key constraints
 
@@ -29,44 +32,133 @@ CREATE TABLE IF NOT EXISTS gear (
     FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE SET NULL -- If location is deleted, item becomes unassigned
 );
 
--- Initial Data for Locations (Body Slots & Common Containers)
--- Body Slots
-INSERT INTO locations (name, type) VALUES ('Head', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Neck', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Shoulders', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Shoulder L', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Shoulder R', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Arms', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Arms L', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Arms R', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Hands', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Hand L', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Hand R', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Torso', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Waist', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Legs', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Foot L', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Foot R', 'Body Slot');
-INSERT INTO locations (name, type) VALUES ('Feet', 'Body Slot');
-
--- Common Containers (these are also locations items can be in)
-INSERT INTO locations (name, type) VALUES ('Backpack', 'Container');
-INSERT INTO locations (name, type) VALUES ('Belt Pouch', 'Container');
-INSERT INTO locations (name, type) VALUES ('Saddlebags', 'Container');
-INSERT INTO locations (name, type) VALUES ('Generic Storage', 'Container'); -- A place for items not actively carried
-
--- Sample Gear (for testing, can be expanded or put in a separate seed file)
-INSERT INTO gear (name, description, weight, cost, value, legality, category, location_id) VALUES
-('Steel Helmet', 'A sturdy helmet for combat', 2.0, 50.0, 45.0, 'Legal', 'Armor', (SELECT id from locations WHERE name = 'Head')),
-('Leather Jerkin', 'Basic torso protection', 3.0, 20.0, 15.0, 'Legal', 'Armor', (SELECT id from locations WHERE name = 'Torso')),
-('Dagger', 'A simple sidearm', 0.5, 5.0, 4.0, 'Legal', 'Weapon', (SELECT id from locations WHERE name = 'Belt Pouch')),
-('Rope (50ft)', 'Useful for climbing and other tasks', 5.0, 1.0, 1.0, 'Legal', 'Adventuring Gear', (SELECT id from locations WHERE name = 'Backpack')),
-('Rations (3 days)', 'Travel sustenance', 3.0, 1.5, 1.0, 'Legal', 'Adventuring Gear', (SELECT id from locations WHERE name = 'Backpack')),
--- Thematic Gear Additions
-('Neural Interface Jack', 'Basic cranial data port for direct neural machine interface. Allows connection to compliant devices.', 0.1, 1200.0, 900.0, 'Restricted', 'Cyberware', (SELECT id from locations WHERE name = 'Generic Storage')),
-('"Ghost" Infiltration Suit', 'Lightweight nano-weave suit with chameleonic properties, offering minor stealth benefits.', 1.5, 3500.0, 2800.0, 'Illegal', 'Tech Armor', (SELECT id from locations WHERE name = 'Generic Storage')),
-('Mana-Tech Focus Wand', 'A wand that interweaves arcane energies with micro-circuitry to stabilize and slightly amplify simple offensive spells. Requires attunement.', 0.5, 800.0, 650.0, 'Legal', 'Magical Gadget', (SELECT id from locations WHERE name = 'Generic Storage')),
-('"Street Doc" Med-Patch', 'Single-use advanced chemical patch that can stabilize critical wounds and provide temporary pain relief. Less effective than professional medical attention.', 0.05, 150.0, 100.0, 'Legal', 'Tech Gear', (SELECT id from locations WHERE name = 'Generic Storage')),
-('Data Scrambler Optics', 'Retinal implants that project a subtle disruptive pattern, making facial recognition harder. Causes slight eye strain.', 0.02, 2000.0, 1500.0, 'Restricted', 'Cyberware', (SELECT id from locations WHERE name = 'Generic Storage')),
-('"Brightburn" Chemical Rounds (10 pack)', 'Specialized ammunition for projectile weapons, containing a payload that ignites with an intense, disorienting flare on impact.', 0.2, 300.0, 200.0, 'Illegal', 'Ammunition', (SELECT id from locations WHERE name = 'Generic Storage')),
-('Urban Survival Multi-tool', 'A ruggedized tool incorporating various technological and mundane implements useful for navigating and surviving in a dense, often hostile, urban environment. Includes a signal jammer detector.', 0.8, 450.0, 300.0, 'Legal', 'Tech Gear', (SELECT id from locations WHERE name = 'Generic Storage'));
+-- Secondary indexes for the filters and joins used in src/data_access/.
+-- gear(location_id, ...) serves "items in location" lookups and ON DELETE SET NULL from locations, and covers
+-- the weight/cost/value sums in location totals so they never touch the gear table itself.
+CREATE INDEX IF NOT EXISTS idx_gear_location_totals ON gear (location_id, weight, cost, value);
+-- Category equality filter; rowid order inside each category also satisfies ORDER BY g.id for listings.
+CREATE INDEX IF NOT EXISTS idx_gear_category ON gear (category);
+-- Child lookups (re-parenting, ON DELETE SET NULL) and type filters. (type, name, parent_id) covers
+-- the listing columns apart from id, which every index carries.
+CREATE INDEX IF NOT EXISTS idx_locations_parent ON locations (parent_id);
+CREATE INDEX IF NOT EXISTS idx_locations_type ON locations (type, name, parent_id);
+
+-- Closure table for the location hierarchy: one row per (ancestor, descendant) pair, including each
+-- location paired with itself at depth 0. Kept in step with locations.parent_id by location_queries.py.
+CREATE TABLE IF NOT EXISTS location_closure (
+    ancestor_id INTEGER NOT NULL,
+    descendant_id INTEGER NOT NULL,
+    depth INTEGER NOT NULL, -- Number of parent_id hops from ancestor down to descendant
+    PRIMARY KEY (ancestor_id, descendant_id),
+    FOREIGN KEY (ancestor_id) REFERENCES locations(id) ON DELETE CASCADE,
+    FOREIGN KEY (descendant_id) REFERENCES locations(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_location_closure_descendant ON location_closure (descendant_id, depth);
+
+-- Full-text index over gear name, description and category (external content table: the text lives in gear).
+-- prefix='2 3' adds prefix indexes so search-as-you-type queries like "hel*" don't scan the term list.
+CREATE VIRTUAL TABLE IF NOT EXISTS gear_fts USING fts5(
+    name, description, category,
+    content='gear', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+-- Keep gear_fts in step with gear.
+CREATE TRIGGER IF NOT EXISTS gear_fts_after_insert AFTER INSERT ON gear BEGIN
+    INSERT INTO gear_fts (rowid, name, description, category) VALUES (new.id, new.name, new.description, new.category);
+END;
+
+CREATE TRIGGER IF NOT EXISTS gear_fts_after_delete AFTER DELETE ON gear BEGIN
+    INSERT INTO gear_fts (gear_fts, rowid, name, description, category) VALUES ('delete', old.id, old.name, old.description, old.category);
+END;
+
+CREATE TRIGGER IF NOT EXISTS gear_fts_after_update AFTER UPDATE OF name, description, category ON gear BEGIN
+    INSERT INTO gear_fts (gear_fts, rowid, name, description, category) VALUES ('delete', old.id, old.name, old.description, old.category);
+    INSERT INTO gear_fts (rowid, name, description, category) VALUES (new.id, new.name, new.description, new.category);
+END;
+
+-- Change counters used for HTTP ETags: every write to a tracked table bumps its row, from any process.
+-- The '_epoch' row is a random number picked when the database is created, so counters restarting at 0
+-- after `flask init-db` can't reproduce an ETag a client cached from the previous database.
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO table_versions (table_name, version) VALUES
+    ('_epoch', random() & 9223372036854775807),
+    ('gear', 0),
+    ('locations', 0);
+
+CREATE TRIGGER IF NOT EXISTS gear_version_after_insert AFTER INSERT ON gear BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'gear';
+END;
+
+CREATE TRIGGER IF NOT EXISTS gear_version_after_update AFTER UPDATE ON gear BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'gear';
+END;
+
+CREATE TRIGGER IF NOT EXISTS gear_version_after_delete AFTER DELETE ON gear BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'gear';
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_version_after_insert AFTER INSERT ON locations BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'locations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_version_after_update AFTER UPDATE ON locations BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'locations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_version_after_delete AFTER DELETE ON locations BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'locations';
+END;
+
+-- Change log for delta sync (GET /api/sync): one row per gear/location row, holding the sequence number of its
+-- latest change. Every insert, update or delete (including ON DELETE SET NULL actions) replaces the row's entry
+-- with a fresh seq, so "everything changed since N" is a range scan on seq. Deleted rows keep their entry as a
+-- tombstone (deleted = 1). AUTOINCREMENT keeps seq increasing even when the newest entry is replaced.
+-- The triggers delete and re-insert rather than INSERT OR REPLACE, whose conflict policy an outer upsert would override.
+CREATE TABLE IF NOT EXISTS row_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (table_name, row_id)
+);
+
+CREATE TRIGGER IF NOT EXISTS gear_changes_after_insert AFTER INSERT ON gear BEGIN
+    DELETE FROM row_changes WHERE table_name = 'gear' AND row_id = new.id;
+    INSERT INTO row_changes (table_name, row_id, deleted) VALUES ('gear', new.id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS gear_changes_after_update AFTER UPDATE ON gear BEGIN
+    DELETE FROM row_changes WHERE table_name = 'gear' AND row_id = new.id;
+    INSERT INTO row_changes (table_name, row_id, deleted) VALUES ('gear', new.id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS gear_changes_after_delete AFTER DELETE ON gear BEGIN
+    DELETE FROM row_changes WHERE table_name = 'gear' AND row_id = old.id;
+    INSERT INTO row_changes (table_name, row_id, deleted) VALUES ('gear', old.id, 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_changes_after_insert AFTER INSERT ON locations BEGIN
+    DELETE FROM row_changes WHERE table_name = 'locations' AND row_id = new.id;
+    INSERT INTO row_changes (table_name, row_id, deleted) VALUES ('locations', new.id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_changes_after_update AFTER UPDATE ON locations BEGIN
+    DELETE FROM row_changes WHERE table_name = 'locations' AND row_id = new.id;
+    INSERT INTO row_changes (table_name, row_id, deleted) VALUES ('locations', new.id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_changes_after_delete AFTER DELETE ON locations BEGIN
+    DELETE FROM row_changes WHERE table_name = 'locations' AND row_id = old.id;
+    INSERT INTO row_changes (table_name, row_id, deleted) VALUES ('locations', old.id, 1);
+END;
+
+-- Databases created before row_changes existed: give every current row an entry (no-op afterwards).
+INSERT OR IGNORE INTO row_changes (table_name, row_id) SELECT 'gear', id FROM gear;
+INSERT OR IGNORE INTO row_changes (table_name, row_id) SELECT 'locations', id FROM locations;
@@ -0,0 +1,236 @@
+import contextvars
+import os
+import queue
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional
+
+from src.database.pool import get_pool
+
+
+class _Write:
+    """One queued call of a write function, and its outcome once the batch it was in has been committed."""
+    __slots__ = ('func', 'args', 'context', 'done', 'result', 'error', 'started', 'cancelled')
+
+    def __init__(self, func: Callable, args: tuple):
+        self.func = func
+        self.args = args
+        self.context = contextvars.copy_context() # So its SQL is timed into the submitting request's stats
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.started = False # Set by the writer thread, under the queue's lock, when it picks the write up
+        self.cancelled = False # Set by a caller that timed out before that; the writer thread then skips it
+
+
+class _BatchConnection:
+    """
+    The writer's connection as seen by one write function. commit() is deferred to the end of the batch, and
+    rollback() only undoes this write (back to its savepoint). Everything else goes to the real connection.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        self._conn.execute("ROLLBACK TO write")
+
+
+class WriteQueue:
+    """
+    Runs data-access write functions on one writer thread with its own connection, for one database file.
+    Writes queued while the previous batch was being committed are run together in one transaction, each in
+    its own savepoint, and committed once (group commit): a write that raises is rolled back on its own and its
+    caller gets the exception, while the other writes of the batch still commit. The write functions' own
+    commit() calls are deferred to the end of the batch, so results are only returned once they are durable.
+    If the writer thread itself fails (e.g. it can't connect), the writes it had taken or that are queued get the
+    error, and the next submit() starts a new thread.
+    Like the connection pool, the queue belongs to a single process; get_writer() replaces it after a fork.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], max_batch: int = 64,
+                 on_failed_commit: Optional[Callable[[], None]] = None, timeout: float = 30.0):
+        self.pid = os.getpid()
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._connect = connect
+        self._on_failed_commit = on_failed_commit # e.g. drop caches that may hold the rolled back rows
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.writes = 0
+        self.failed_writes = 0 # Writes that raised (including whole batches whose commit failed)
+        self.batches = 0
+        self.largest_batch = 0
+        self.timeouts = 0
+        self.thread_failures = 0
+
+    def submit(self, func: Callable, *args):
+        """
+        Calls func(connection, *args) on the writer thread and returns its result, or raises its exception.
+        Raises TimeoutError, without the write having been run, if the writer thread hasn't picked it up within
+        `timeout` seconds. A write already running is waited for: SQLite's busy timeout bounds how long it takes.
+        """
+        write = _Write(func, args)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The write queue has been closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='kitbox-writer', daemon=True)
+                self._thread.start()
+            self._queue.put(write)
+        if not write.done.wait(self.timeout):
+            with self._lock:
+                if not write.started:
+                    write.cancelled = True
+                    self.timeouts += 1
+                    raise TimeoutError(f"The write queue didn't take the write within {self.timeout} seconds")
+            write.done.wait()
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def close(self) -> None:
+        """Lets the queued writes finish, then stops the writer thread and closes its connection."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "writes": self.writes,
+            "failed_writes": self.failed_writes,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "timeouts": self.timeouts,
+            "thread_failures": self.thread_failures,
+            "queued": self._queue.qsize(),
+        }
+
+    def _run(self) -> None:
+        writes = []
+        try:
+            conn = self._connect()
+            try:
+                while True:
+                    batch = [self._queue.get()]
+                    while batch[-1] is not None and len(batch) < self.max_batch:
+                        try:
+                            batch.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    stop = batch[-1] is None
+                    with self._lock: # Writes whose caller timed out are dropped; the others can't be cancelled now
+                        writes = [write for write in batch if write is not None and not write.cancelled]
+                        for write in writes:
+                            write.started = True
+                    if writes:
+                        self._run_batch(conn, writes)
+                    writes = []
+                    if stop:
+                        return
+            finally:
+                conn.close()
+        except BaseException as e:
+            self._fail_thread(writes, e)
+
+    def _fail_thread(self, writes: List['_Write'], error: BaseException) -> None:
+        """
+        The writer thread is dying: fails the writes it had taken and the queued ones with `error`, and lets the
+        next submit() start a new thread. Nothing these writes did was committed.
+        """
+        with self._lock:
+            self._thread = None
+            self.thread_failures += 1
+            while True:
+                try:
+                    write = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if write is not None:
+                    writes.append(write)
+            failed = [write for write in writes if not write.done.is_set()]
+            for write in failed:
+                write.started = True
+                write.result, write.error = None, error
+            self.writes += len(failed)
+            self.failed_writes += len(failed)
+        for write in failed:
+            write.done.set()
+
+    def _run_batch(self, conn: sqlite3.Connection, writes: List['_Write']) -> None:
+        batch_conn = _BatchConnection(conn)
+        try:
+            conn.execute("BEGIN IMMEDIATE") # Take the write lock up front rather than on the first write
+            for write in writes:
+                conn.execute("SAVEPOINT write")
+                try:
+                    write.result = write.context.run(write.func, batch_conn, *write.args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    write.error = e
+                conn.execute("RELEASE write")
+            conn.commit()
+        except sqlite3.Error as e:
+            # BEGIN or COMMIT failed (e.g. the database stayed locked by another process): nothing was written.
+            if conn.in_transaction:
+                conn.rollback()
+            if self._on_failed_commit is not None:
+                self._on_failed_commit()
+            for write in writes:
+                write.result, write.error = None, write.error or e
+        self.batches += 1
+        self.writes += len(writes)
+        self.failed_writes += sum(1 for write in writes if write.error is not None)
+        self.largest_batch = max(self.largest_batch, len(writes))
+        for write in writes:
+            write.done.set()
+
+
+_writers: Dict[str, WriteQueue] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path: str, config, on_failed_commit: Optional[Callable[[], None]] = None) -> WriteQueue:
+    """
+    Returns this process's write queue for db_path, creating it (with a connection configured like the pool's)
+    on first use. Queues created before a fork are dropped and rebuilt, as their thread didn't survive it.
+    """
+    writer = _writers.get(db_path)
+    if writer is not None and writer.pid == os.getpid():
+        return writer
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None or writer.pid != os.getpid():
+            writer = WriteQueue(get_pool(db_path, config).connect, max_batch=config['WRITE_QUEUE_MAX_BATCH'],
+                                on_failed_commit=on_failed_commit, timeout=config['WRITE_QUEUE_TIMEOUT'])
+            _writers[db_path] = writer
+        return writer
+
+
+def get_existing_writer(db_path: str) -> Optional[WriteQueue]:
+    """Returns the current process's write queue for db_path without creating one."""
+    writer = _writers.get(db_path)
+    if writer is not None and writer.pid == os.getpid():
+        return writer
+    return None
+
+
+def dispose_writer(db_path: str) -> None:
+    """Stops and forgets the write queue for db_path, e.g. before the database file is deleted."""
+    with _writers_lock:
+        writer = _writers.pop(db_path, None)
+    if writer is not None and writer.pid == os.getpid():
+        writer.close()
@@ -0,0 +1,333 @@
+import asyncio
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Server-Sent Events change feed (GET /api/events). Every write to gear or locations is recorded in row_changes
+# by the schema triggers, so committed changes from any worker process show up there. Each process runs one
+# ChangeFeed thread per database that tails the table and hands new changes to that process's subscribers.
+
+# (seq, table_name, row_id, deleted); seq doubles as the SSE event id.
+Change = Tuple[int, str, int, bool]
+
+# Changes read from row_changes per query.
+_BATCH_SIZE = 500
+
+# Batches a subscriber may have waiting before it is dropped with a resync event (see Subscriber.deliver).
+_MAX_PENDING_BATCHES = 64
+
+EVENT_STREAM_MIMETYPE = 'text/event-stream'
+KEEPALIVE = b": keepalive\n\n"
+
+
+def read_changes(conn: sqlite3.Connection, after_seq: int, limit: int) -> List[Change]:
+    """The oldest `limit` changes with a seq greater than after_seq."""
+    rows = conn.execute(
+        "SELECT seq, table_name, row_id, deleted FROM row_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+        (after_seq, limit)
+    ).fetchall()
+    return [(row[0], row[1], row[2], bool(row[3])) for row in rows]
+
+
+def latest_seq(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM row_changes").fetchone()[0]
+
+
+def format_change(change: Change) -> bytes:
+    seq, table_name, row_id, deleted = change
+    data = json.dumps({'table': table_name, 'id': row_id, 'deleted': deleted}, separators=(',', ':'))
+    return f"id: {seq}\nevent: change\ndata: {data}\n\n".encode('utf-8')
+
+
+def format_resync(seq: int) -> bytes:
+    """Tells the client that changes were skipped and it should run a delta sync (GET /api/sync) instead."""
+    return f"id: {seq}\nevent: resync\ndata: {{}}\n\n".encode('utf-8')
+
+
+def format_retry(milliseconds: int) -> bytes:
+    return f"retry: {milliseconds}\n\n".encode('utf-8')
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    """The seq from a Last-Event-ID header (or query parameter); None if absent or not a seq."""
+    if value is None or not value.strip().isdigit():
+        return None
+    return int(value.strip())
+
+
+class Subscriber:
+    """
+    One open event stream. The feed thread queues batches of changes with deliver() and calls `wakeup`, which the
+    stream sets up to wake whatever it is waiting on (a threading.Event, or an asyncio.Event via its loop).
+    """
+
+    def __init__(self, wakeup: Callable[[], None]):
+        self.wakeup = wakeup
+        self.pending = collections.deque()
+        self.overflowed = False
+        self.last_sent = 0 # Seq of the last event written to the stream; older changes are skipped
+
+    def deliver(self, changes: List[Change]) -> None:
+        # A stream that stopped reading (e.g. a stalled client) is cut off rather than buffered without bound;
+        # it gets a resync event and reconnects with Last-Event-ID.
+        if len(self.pending) >= _MAX_PENDING_BATCHES:
+            self.overflowed = True
+        else:
+            self.pending.append(changes)
+        self.wakeup()
+
+    def take(self) -> bytes:
+        """The queued changes the client hasn't seen yet, formatted as events."""
+        chunks = []
+        while self.pending:
+            for change in self.pending.popleft():
+                if change[0] > self.last_sent:
+                    chunks.append(format_change(change))
+                    self.last_sent = change[0]
+        return b"".join(chunks)
+
+    def replay(self, conn: sqlite3.Connection, after_seq: int, limit: int) -> bytes:
+        """
+        The events after `after_seq` that were committed before the feed could deliver them, read from the database.
+        Past `limit` missed changes a single resync event is sent instead.
+        """
+        changes = read_changes(conn, after_seq, limit + 1)
+        if len(changes) > limit:
+            self.last_sent = latest_seq(conn)
+            return format_resync(self.last_sent)
+        self.last_sent = changes[-1][0] if changes else after_seq
+        return b"".join(format_change(change) for change in changes)
+
+
+class ChangeFeed:
+    """
+    Tails row_changes for one database file and fans new changes out to this process's subscribers.
+    The thread only runs while someone is subscribed, and most polls are a single PRAGMA data_version, which
+    only changes when another connection (in this process or another) has committed.
+    Subscribers must replay anything committed after their starting seq themselves (Subscriber.replay):
+    the feed only delivers changes it reads after they subscribed.
+    """
+
+    def __init__(self, db_path: str, poll_interval: float = 0.5):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Subscriber] = {}
+        self._next_token = 0
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self.polls = 0 # Poll loop iterations
+        self.reads = 0 # Polls that found a commit and queried row_changes
+
+    def subscribe(self, subscriber: Subscriber, after_seq: int) -> int:
+        """Adds a subscriber and returns its token for unsubscribe(). A new feed thread starts from after_seq."""
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = subscriber
+            if self._thread is None or self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, args=(after_seq,), name='kitbox-change-feed',
+                                                daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+            return self._next_token
+
+    def unsubscribe(self, token: int) -> None:
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'running': self._thread is not None,
+                    'polls': self.polls, 'reads': self.reads}
+
+    def _run(self, last_seq: int) -> None:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            data_version = None
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None # The next subscribe() starts a new thread
+                        return
+                self.polls += 1
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if version != data_version:
+                    data_version = version
+                    self.reads += 1
+                    while True:
+                        changes = read_changes(conn, last_seq, _BATCH_SIZE)
+                        if not changes:
+                            break
+                        last_seq = changes[-1][0]
+                        # Snapshot after the read: a stream that subscribed meanwhile replayed only up to the
+                        # changes committed before it subscribed, so it needs these too (take() skips repeats).
+                        with self._lock:
+                            subscribers = list(self._subscribers.values())
+                        for subscriber in subscribers:
+                            subscriber.deliver(changes)
+                        if len(changes) < _BATCH_SIZE:
+                            break
+                time.sleep(self.poll_interval)
+        except Exception:
+            with self._lock:
+                self._thread = None
+            raise
+        finally:
+            conn.close()
+
+
+_feeds: Dict[str, ChangeFeed] = {}
+_feeds_lock = threading.Lock()
+
+
+def get_change_feed(db_path: str, poll_interval: float) -> ChangeFeed:
+    """Returns this process's feed for db_path, creating it on first use."""
+    with _feeds_lock:
+        feed = _feeds.get(db_path)
+        if feed is None:
+            feed = _feeds[db_path] = ChangeFeed(db_path, poll_interval)
+        return feed
+
+
+def open_stream(feed: ChangeFeed, conn: sqlite3.Connection, subscriber: Subscriber, after_seq: Optional[int],
+                config) -> Tuple[int, bytes]:
+    """
+    Subscribes to the feed and returns (token, first chunk): the retry interval and the replay of anything after
+    after_seq (or nothing, for a new client, which starts at the latest change). Subscribing before the replay
+    query means no change falls between the two; changes seen by both are skipped by Subscriber.take().
+    """
+    start = latest_seq(conn) if after_seq is None else after_seq
+    token = feed.subscribe(subscriber, start)
+    try:
+        first = format_retry(config['EVENTS_RETRY_MS']) + subscriber.replay(conn, start, config['EVENTS_REPLAY_LIMIT'])
+    except Exception:
+        feed.unsubscribe(token)
+        raise
+    return token, first
+
+
+def stream_events_sync(feed: ChangeFeed, token: int, subscriber: Subscriber, wakeup: threading.Event, first: bytes,
+                       config):
+    """
+    Generator for the WSGI route: the first chunk from open_stream(), then live events until
+    EVENTS_STREAM_MAX_SECONDS, with keep-alive comments in between. Blocks a worker thread for the whole stream.
+    """
+    try:
+        yield first
+        deadline = time.monotonic() + config['EVENTS_STREAM_MAX_SECONDS']
+        while not subscriber.overflowed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            woken = wakeup.wait(min(config['EVENTS_KEEPALIVE_SECONDS'], remaining))
+            wakeup.clear()
+            chunk = subscriber.take() if woken else KEEPALIVE
+            if chunk:
+                yield chunk
+        yield format_resync(subscriber.last_sent)
+    finally:
+        feed.unsubscribe(token)
+
+
+class EventStreamEndpoint:
+    """
+    Native ASGI handler for GET /api/events, used by asgi.py: an idle subscriber is just an asyncio.Event on the
+    event loop, so open streams cost no thread. Only authentication and the initial replay run on a thread.
+    `authenticate(token)` returns True for a valid access token; `open_db()` returns a new sqlite3 connection;
+    `feed_for()` returns the ChangeFeed; config holds the EVENTS_* settings and JWT_ACCESS_COOKIE_NAME.
+    """
+
+    def __init__(self, authenticate, open_db, feed_for, config):
+        self.authenticate = authenticate
+        self.open_db = open_db
+        self.feed_for = feed_for
+        self.config = config
+
+    async def __call__(self, scope, receive, send):
+        if scope['method'] != 'GET':
+            await self._send_error(send, 405, "Method not allowed")
+            return
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+        query = dict(pair.split('=', 1) if '=' in pair else (pair, '')
+                     for pair in scope.get('query_string', b'').decode('latin-1').split('&') if pair)
+        cookie = SimpleCookie(headers.get('cookie', '')).get(self.config['JWT_ACCESS_COOKIE_NAME'])
+        token = cookie.value if cookie is not None else None # Set by POST /api/events/session
+        authorization = headers.get('authorization', '')
+        if authorization.lower().startswith('bearer '):
+            token = authorization[7:].strip()
+        loop = asyncio.get_running_loop()
+        if not token or not await loop.run_in_executor(None, self.authenticate, token):
+            await self._send_error(send, 401, "Missing or invalid access token")
+            return
+
+        after_seq = parse_last_event_id(headers.get('last-event-id', query.get('last_event_id')))
+        wakeup = asyncio.Event()
+        subscriber = Subscriber(lambda: loop.call_soon_threadsafe(wakeup.set))
+        feed = self.feed_for()
+        token_id, first = await loop.run_in_executor(None, self._subscribe, feed, subscriber, after_seq)
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', EVENT_STREAM_MIMETYPE.encode('latin-1')),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'), # Tell nginx not to buffer the stream
+            ]})
+            await send({'type': 'http.response.body', 'body': first, 'more_body': True})
+            deadline = loop.time() + self.config['EVENTS_STREAM_MAX_SECONDS']
+            while not subscriber.overflowed and not disconnected.done():
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                waiter = asyncio.ensure_future(wakeup.wait())
+                done, _ = await asyncio.wait([waiter, disconnected], return_when=asyncio.FIRST_COMPLETED,
+                                             timeout=min(self.config['EVENTS_KEEPALIVE_SECONDS'], remaining))
+                waiter.cancel()
+                if disconnected.done():
+                    return
+                wakeup.clear()
+                chunk = subscriber.take() if waiter in done else KEEPALIVE
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            tail = format_resync(subscriber.last_sent) if subscriber.overflowed else b''
+            await send({'type': 'http.response.body', 'body': tail, 'more_body': False})
+        finally:
+            feed.unsubscribe(token_id)
+            disconnected.cancel()
+
+    def _subscribe(self, feed: ChangeFeed, subscriber: Subscriber, after_seq: Optional[int]):
+        conn = self.open_db()
+        try:
+            return open_stream(feed, conn, subscriber, after_seq, self.config)
+        finally:
+            conn.close()
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+    @staticmethod
+    async def _send_error(send, status: int, message: str):
+        body = json.dumps({"error": {"code": status, "message": message}}).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+
+class PathRouter:
+    """ASGI app that sends HTTP requests for the paths in `routes` to their own handler, and the rest to `default`."""
+
+    def __init__(self, default, routes: dict):
+        self.default = default
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        handler = self.routes.get(scope.get('path')) if scope['type'] == 'http' else None
+        await (handler or self.default)(scope, receive, send)
@@ -0,0 +1,288 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+# Statistics of the request being handled by the current thread, or None outside requests.
+_current: ContextVar[Optional['RequestStats']] = ContextVar('kitbox_request_stats', default=None)
+
+request_logger = logging.getLogger('kitbox.requests')
+
+
+class RequestStats:
+    """Counters for one request: SQL statements and the time spent in sqlite3, rows fetched, and model/JSON time."""
+    __slots__ = ('started', 'sql_statements', 'sql_seconds', 'rows', 'model_seconds', 'serialize_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.model_seconds = 0.0 # Building Pydantic models (or response dicts) from rows
+        self.serialize_seconds = 0.0 # Encoding JSON
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """The Server-Timing header value (durations in milliseconds) for the time spent so far."""
+        return (
+            f'db;dur={self.sql_seconds * 1000:.3f};desc="{self.sql_statements} statements, {self.rows} rows", '
+            f'model;dur={self.model_seconds * 1000:.3f}, '
+            f'json;dur={self.serialize_seconds * 1000:.3f}, '
+            f'total;dur={self.elapsed() * 1000:.3f}'
+        )
+
+    def log_fields(self) -> dict:
+        return {
+            'duration_ms': round(self.elapsed() * 1000, 3),
+            'sql_statements': self.sql_statements,
+            'sql_ms': round(self.sql_seconds * 1000, 3),
+            'rows': self.rows,
+            'model_ms': round(self.model_seconds * 1000, 3),
+            'serialize_ms': round(self.serialize_seconds * 1000, 3),
+        }
+
+
+def start_request() -> RequestStats:
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+
+def finish_request(stats: RequestStats) -> None:
+    """Stops recording into stats (if they still belong to the current context)."""
+    if _current.get() is stats:
+        _current.set(None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def timed_models(func):
+    """Adds the time spent in func (a row-to-model/dict helper) to the current request's model time."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.model_seconds += time.perf_counter() - started
+    return wrapper
+
+
+def timed_serialization(func):
+    """Adds the time spent in func (a JSON encoder) to the current request's serialization time."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.serialize_seconds += time.perf_counter() - started
+    return wrapper
+
+
+# --- SQL instrumentation ---
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """A cursor that records its statements, the time spent in sqlite3 and the rows fetched into the current request."""
+
+    def _timed(self, method, statements: int, *args):
+        stats = _current.get()
+        if stats is None:
+            return method(*args)
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            stats.sql_seconds += time.perf_counter() - started
+            stats.sql_statements += statements
+
+    def execute(self, *args):
+        return self._timed(super().execute, 1, *args)
+
+    def executemany(self, *args):
+        return self._timed(super().executemany, 1, *args)
+
+    def executescript(self, *args):
+        return self._timed(super().executescript, 1, *args)
+
+    def _fetch(self, method, *args):
+        stats = _current.get()
+        if stats is None:
+            return method(*args)
+        started = time.perf_counter()
+        try:
+            result = method(*args)
+        finally:
+            stats.sql_seconds += time.perf_counter() - started
+        if isinstance(result, list):
+            stats.rows += len(result)
+        elif result is not None:
+            stats.rows += 1
+        return result
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        return self._fetch(super().__next__)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connection factory for the pool: every statement, fetch and commit is timed into the current request's
+    RequestStats. Outside a request it behaves like a plain connection (one ContextVar lookup per call).
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection's shortcuts create their cursor in C without calling cursor(), so route them explicitly.
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+    def commit(self):
+        stats = _current.get()
+        if stats is None:
+            return super().commit()
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            stats.sql_seconds += time.perf_counter() - started
+
+
+# --- Per-route metrics ---
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # The last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total!r}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RouteMetrics:
+    """Per-route request histograms for this worker process, exported in the Prometheus text format."""
+
+    _HISTOGRAMS = (
+        ('kitbox_request_duration_seconds', 'Wall time per request, including streaming the body.', DURATION_BUCKETS),
+        ('kitbox_request_sql_seconds', 'Time spent inside sqlite3 per request.', DURATION_BUCKETS),
+        ('kitbox_request_sql_statements', 'SQL statements executed per request.', STATEMENT_BUCKETS),
+        ('kitbox_request_model_seconds', 'Time spent building models from rows per request.', DURATION_BUCKETS),
+        ('kitbox_request_serialize_seconds', 'Time spent encoding JSON per request.', DURATION_BUCKETS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], list] = {} # (method, route) -> histograms in _HISTOGRAMS order
+        self._responses: Dict[Tuple[str, str, int], int] = {} # (method, route, status) -> count
+
+    def observe(self, method: str, route: str, status: int, stats: RequestStats) -> None:
+        values = (stats.elapsed(), stats.sql_seconds, stats.sql_statements, stats.model_seconds, stats.serialize_seconds)
+        with self._lock:
+            histograms = self._routes.get((method, route))
+            if histograms is None:
+                histograms = self._routes[(method, route)] = [_Histogram(spec[2]) for spec in self._HISTOGRAMS]
+            for histogram, value in zip(histograms, values):
+                histogram.observe(value)
+            key = (method, route, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._responses.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                '# HELP kitbox_requests_total Requests handled by this worker process.',
+                '# TYPE kitbox_requests_total counter',
+            ]
+            for (method, route, status), count in sorted(self._responses.items()):
+                lines.append(f'kitbox_requests_total{{method="{method}",route="{_escape_label(route)}",status="{status}"}} {count}')
+            for index, (name, help_text, _) in enumerate(self._HISTOGRAMS):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (method, route), histograms in sorted(self._routes.items()):
+                    lines.extend(histograms[index].render(name, f'method="{method}",route="{_escape_label(route)}"'))
+        return '\n'.join(lines) + '\n'
+
+
+# This worker's metrics, served by GET /api/metrics when enabled.
+route_metrics = RouteMetrics()
+
+
+# --- Structured logging ---
+
+class JSONLogFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including request fields passed via `extra`."""
+
+    _RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'process': record.process,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self._RESERVED})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
@@ -0,0 +1,113 @@
+from functools import lru_cache
+from typing import Any, List, Optional, Union
+
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from pydantic import BaseModel, TypeAdapter
+
+from .instrumentation import timed_serialization
+
+try:
+    import orjson
+except ImportError: # Optional dependency; StdlibJSONProvider is used without it
+    orjson = None
+
+# Values accepted by the KITBOX_JSON_PROVIDER setting.
+JSON_PROVIDERS = ('auto', 'orjson', 'stdlib')
+
+
+@lru_cache(maxsize=None)
+def _model_list_adapter(model_class: type) -> TypeAdapter:
+    return TypeAdapter(List[model_class])
+
+
+def dump_models_json(obj: Any) -> Optional[bytes]:
+    """
+    Serializes a Pydantic model, or a list/tuple of models of one class, directly to JSON bytes with Pydantic's
+    own serializer, so no intermediate dicts are built. Keys come out in field order.
+    Returns None for anything else, which the caller then encodes normally.
+    """
+    if isinstance(obj, BaseModel):
+        return obj.__pydantic_serializer__.to_json(obj)
+    if isinstance(obj, (list, tuple)) and obj and isinstance(obj[0], BaseModel):
+        model_class = type(obj[0])
+        if all(type(item) is model_class for item in obj):
+            return _model_list_adapter(model_class).dump_json(list(obj))
+    return None
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for values nested inside dicts/lists that the encoder can't handle itself."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode='json')
+    return DefaultJSONProvider.default(obj) # Dates, decimals, UUIDs, dataclasses, __html__; raises TypeError otherwise
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """
+    Flask's default json-module provider that also accepts Pydantic models, either at the top level
+    (serialized by Pydantic without an intermediate dict) or nested inside other values.
+    """
+    default = staticmethod(_default)
+
+    @timed_serialization
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        data = dump_models_json(obj)
+        if data is not None:
+            return data.decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Compact JSON as UTF-8 bytes, as used for streamed response bodies."""
+        return self.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+class OrjsonJSONProvider(JSONProvider):
+    """
+    JSON provider backed by orjson. Output is compact UTF-8 with sorted keys (like the default provider,
+    but without escaping non-ASCII characters), or indented in debug mode. Pydantic models are handled
+    as in StdlibJSONProvider.
+    """
+    mimetype = 'application/json'
+    compact: Optional[bool] = None
+
+    def __init__(self, app):
+        if orjson is None:
+            raise RuntimeError("The orjson JSON provider was requested but orjson is not installed")
+        super().__init__(app)
+
+    def _options(self, indent: bool = False) -> int:
+        options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    @timed_serialization
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        data = dump_models_json(obj)
+        if data is not None:
+            return data
+        return orjson.dumps(obj, default=_default, option=self._options(indent))
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
+
+
+def make_json_provider(app, name: str) -> JSONProvider:
+    """
+    Builds the JSON provider selected by `name`: 'orjson', 'stdlib', or 'auto' (orjson when it is installed).
+    Raises ValueError for an unknown name and RuntimeError if 'orjson' is requested but not installed.
+    """
+    name = name.lower()
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"Unsupported JSON provider: {name}")
+    if name == 'orjson' or (name == 'auto' and orjson is not None):
+        return OrjsonJSONProvider(app)
+    return StdlibJSONProvider(app)
@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusyError(RuntimeError):
+    """Raised when more password operations are pending than the hasher accepts; the caller should retry later."""
+
+
+class HasherUnavailableError(RuntimeError):
+    """Raised when the process pool broke (a child died) and failed again on a fresh pool."""
+
+
+def _hash(password: str, method: str) -> str:
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash: str, password: str) -> bool:
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """
+    Runs Werkzeug's password hashing and checking on a small process pool, so CPU-heavy logins and
+    registrations don't hold the GIL of (or compete for CPU with) the worker serving other requests.
+
+    At most `workers` hashes run at once; up to `max_pending` operations may be running or queued, and any
+    beyond that fail fast with HasherBusyError instead of piling up. workers=0 hashes inline in the calling
+    thread (still bounded by max_pending). The pool is started on first use and belongs to one process:
+    a hasher inherited through fork() starts its own pool. A pool broken by a dying child is replaced, and the
+    operation retried once on the new one; HasherUnavailableError is raised if that fails too.
+
+    `method` is a Werkzeug method string including its cost, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'.
+    Hashes created with different parameters still verify; needs_rehash() tells the caller to upgrade them.
+    """
+
+    def __init__(self, method: str = 'scrypt', workers: int = 2, max_pending: int = 32):
+        # Werkzeug fills in default costs ('scrypt' -> 'scrypt:32768:8:1'); normalize once so stored hashes compare equal.
+        self.method = generate_password_hash('', method=method).split('$', 1)[0]
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pending = 0 # Operations running or queued right now
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0 # Refused with HasherBusyError
+        self.pool_restarts = 0 # Pools replaced after a child died (BrokenProcessPool)
+        self.total_seconds = 0.0 # Wall time of completed operations, including time spent queued
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            # 'spawn' children don't inherit the (threaded) worker's state, unlike fork().
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusyError(f"{self.pending} password operations already pending")
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+            executor = self._get_executor() if self.workers > 0 else None
+        started = time.perf_counter()
+        try:
+            if executor is None:
+                return func(*args)
+            try:
+                return executor.submit(func, *args).result()
+            except BrokenProcessPool:
+                executor = self._replace_executor(executor)
+            try:
+                return executor.submit(func, *args).result()
+            except BrokenProcessPool as e:
+                self._replace_executor(executor, start_new=False)
+                raise HasherUnavailableError("The password hashing pool failed twice in a row") from e
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.total_seconds += time.perf_counter() - started
+
+    def _replace_executor(self, broken: ProcessPoolExecutor, start_new: bool = True) -> Optional[ProcessPoolExecutor]:
+        """
+        Discards a broken pool, which would otherwise fail every later call, and returns a fresh one (or None with
+        start_new=False; the next call then starts it). Concurrent callers that saw the same pool break share
+        the replacement.
+        """
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self.pool_restarts += 1
+            executor = self._get_executor() if start_new else None
+        broken.shutdown(wait=False, cancel_futures=True)
+        return executor
+
+    def hash(self, password: str) -> str:
+        """
+        Hashes password with the configured method. Raises HasherBusyError if the queue is full, and
+        HasherUnavailableError if the pool keeps breaking.
+        """
+        return self._run(_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """
+        Checks password against a stored hash of any supported method. Raises HasherBusyError if the queue is
+        full, and HasherUnavailableError if the pool keeps breaking.
+        """
+        return self._run(_verify, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True if password_hash was made with a different method or cost than the configured one."""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "method": self.method,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "pool_restarts": self.pool_restarts,
+                "avg_ms": round(1000 * self.total_seconds / self.completed, 3) if self.completed else None,
+            }
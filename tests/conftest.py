@@ -1,11 +1,77 @@
+import asyncio
 import pytest
 import os
 import tempfile
+from werkzeug.http import HTTP_STATUS_CODES
 from app import app as flask_app # Import the Flask app instance from your app.py
-from app import init_db, get_db # Import db functions
+from app import init_db, get_db, get_db_path # Import db functions
+from src.database.pool import dispose_pool
+from src.database.writer import dispose_writer
+from src.asgi_adapter import WSGIToASGI
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--serving-mode", choices=("wsgi", "asgi"), default="wsgi",
+        help="Send test client requests straight to the WSGI app, or through the ASGI adapter used by asgi.py"
+    )
+
+
+class ASGITestBridge:
+    """
+    A WSGI callable that runs each request through an ASGI application on a fresh event loop, so that
+    Flask's test client exercises the ASGI serving path unchanged.
+    """
+
+    def __init__(self, asgi_app):
+        self.asgi_app = asgi_app
+
+    def __call__(self, environ, start_response):
+        body = environ['wsgi.input'].read(int(environ.get('CONTENT_LENGTH') or 0))
+        headers = [(key[5:].replace('_', '-').lower().encode('latin-1'), value.encode('latin-1'))
+                   for key, value in environ.items() if key.startswith('HTTP_')]
+        for key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            if environ.get(key):
+                headers.append((key.replace('_', '-').lower().encode('latin-1'), environ[key].encode('latin-1')))
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': environ['SERVER_PROTOCOL'].split('/', 1)[-1],
+            'method': environ['REQUEST_METHOD'],
+            'scheme': environ['wsgi.url_scheme'],
+            'path': environ['PATH_INFO'].encode('latin-1').decode('utf-8'),
+            'root_path': environ.get('SCRIPT_NAME', ''),
+            'query_string': environ.get('QUERY_STRING', '').encode('latin-1'),
+            'headers': headers,
+            'server': (environ['SERVER_NAME'], int(environ['SERVER_PORT'])),
+            'client': (environ.get('REMOTE_ADDR', '127.0.0.1'), 0),
+        }
+        messages = asyncio.run(self._run(scope, body))
+        status = messages[0]['status']
+        start_response(f"{status} {HTTP_STATUS_CODES.get(status, 'UNKNOWN')}",
+                       [(name.decode('latin-1'), value.decode('latin-1')) for name, value in messages[0]['headers']])
+        return [b''.join(message.get('body', b'') for message in messages[1:])]
+
+    async def _run(self, scope, body):
+        messages = []
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await asyncio.Event().wait() # The client stays connected
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.asgi_app(scope, receive, send)
+        return messages
 
 @pytest.fixture(scope='session') # Changed to session scope for efficiency
-def app():
+def app(request):
     """
     Creates and configures a new Flask app instance for each test session.
     Uses a temporary database file that is removed after the session.
@@ -25,7 +91,6 @@ def app():
                 raise
 
     db_filename = 'test_kitbox.db' # Temporary database name
-    db_path = os.path.join(instance_path, db_filename)
 
     # Override configurations for testing
     flask_app.config.update({
@@ -47,28 +112,38 @@ def app():
     # For now, we'll rely on current_app.config['DATABASE_FILENAME'] being correctly used by get_db_path
     # and ensure that get_db_path is called within an app context that has this config.
 
+    asgi_app = None
+    if request.config.getoption("--serving-mode") == "asgi":
+        # Route every test client request through the ASGI adapter (and its thread pool).
+        asgi_app = WSGIToASGI(flask_app.wsgi_app, threads=flask_app.config['ASGI_THREADS'])
+        flask_app.wsgi_app = ASGITestBridge(asgi_app)
+
     with flask_app.app_context():
+        db_path = get_db_path() # Where the app actually puts the file (next to app.py, not in instance/)
         # Initialize the database (recreate schema)
-        # init_db expects to find schema.sql relative to app.root_path
-        init_db(reinit=True)
+        # Recreate the database through the schema migrations, as `flask init-db` does
+        init_db()
 
     yield flask_app # Provide the app instance to tests
 
+    if asgi_app is not None:
+        flask_app.wsgi_app = asgi_app.wsgi_app
+        asgi_app.shutdown()
+
     # Teardown: Remove the temporary database file after all tests in the session run
     # This is tricky if other fixtures (like db) hold the connection open.
     # Pytest handles teardown of higher-scoped fixtures after lower-scoped ones.
     # For now, let's assume connections are closed properly.
-    if os.path.exists(db_path):
-         try:
-            # Ensure all connections are closed before removing
-            # This might require explicit closing if 'db' fixture doesn't handle it in all cases
-            # For in-memory, this is not an issue. For file, it can be.
-            # A common pattern is to close g.db in a teardown_appcontext handler.
-            # flask_app.teardown_appcontext(close_db) is already in app.py
-            os.remove(db_path)
-            # print(f"\nCleaned up test database: {db_path}")
-         except OSError as e:
-            print(f"\nError cleaning up test database {db_path}: {e}")
+    # Close the pooled and write-queue connections first, then remove the file with the -wal and -shm side files
+    # that WAL mode creates next to it.
+    dispose_writer(db_path)
+    dispose_pool(db_path)
+    for path in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"\nError cleaning up test database {path}: {e}")
 
 
 @pytest.fixture(scope='function') # Changed to function scope for client isolation
@@ -1,6 +1,7 @@
 import pytest
 import json
 from app import UserInDB # To validate response structure if needed
+from src.data_access.user_queries import user_cache
 
 # Helper function to register a user (used in multiple tests)
 def register_user_util(client, username, password):
@@ -99,6 +100,47 @@ def test_login_user_missing_fields(client):
     assert "error" in data_no_pass
     assert "Username and password required" in data_no_pass["error"]["message"]
 
+def test_authenticated_requests_reuse_cached_user(client):
+    """Test that the JWT user lookup is served from the user cache after the first request."""
+    register_user_util(client, "testuser_api_cached", "password123")
+    token = client.post('/api/auth/login', json={"username": "testuser_api_cached", "password": "password123"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    max_entries, ttl_seconds = user_cache.max_entries, user_cache.ttl_seconds
+    user_cache.configure(16, 60) # Enabled whatever the configuration says
+    try:
+        assert client.get('/api/locations', headers=headers).status_code == 200
+        hits = user_cache.stats()["hits"]
+        assert client.get('/api/locations', headers=headers).status_code == 200
+        assert user_cache.stats()["hits"] == hits + 1
+    finally:
+        user_cache.configure(max_entries, ttl_seconds)
+
+def test_login_upgrades_outdated_password_hash(client, db, monkeypatch):
+    """Test that a hash made with old parameters is replaced on a successful login."""
+    import app as app_module
+    from src.security.passwords import PasswordHasher
+    register_user_util(client, "testuser_api_rehash", "password123")
+
+    monkeypatch.setattr(app_module, "password_hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    response = client.post('/api/auth/login', json={"username": "testuser_api_rehash", "password": "password123"})
+    assert response.status_code == 200
+
+    stored = db.execute("SELECT password_hash FROM users WHERE username = ?", ("testuser_api_rehash",)).fetchone()[0]
+    assert stored.startswith("pbkdf2:sha256:1000$")
+    # The upgraded hash still works.
+    assert client.post('/api/auth/login', json={"username": "testuser_api_rehash", "password": "password123"}).status_code == 200
+
+def test_login_rejected_when_hasher_busy(client, monkeypatch):
+    import app as app_module
+    from src.security.passwords import PasswordHasher
+    register_user_util(client, "testuser_api_busy", "password123")
+
+    monkeypatch.setattr(app_module, "password_hasher", PasswordHasher(method="scrypt", workers=0, max_pending=0))
+    response = client.post('/api/auth/login', json={"username": "testuser_api_busy", "password": "password123"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
 # The session-scoped 'app' fixture means the DB is reset once per session.
 # API tests using client modify this shared DB state.
 # Using unique usernames/data per test is important here.
@@ -14,8 +14,8 @@ def get_auth_token(client, username="test_gear_user", password="password123"):
 
 
 @pytest.fixture(scope="module") # Token can be reused for all tests in this module
-def auth_headers(client):
-    token = get_auth_token(client)
+def auth_headers(app):
+    token = get_auth_token(app.test_client()) # Own client: the shared `client` fixture is function-scoped
     return {"Authorization": f"Bearer {token}"}
 
 # --- Test GET /api/gear ---
@@ -28,6 +28,131 @@ def test_get_all_gear_authenticated(client, auth_headers):
     assert response.status_code == 200
     assert isinstance(response.get_json(), list)
 
+def test_get_all_gear_keyset_pagination(client, auth_headers):
+    for i in range(3):
+        client.post('/api/gear', json={"name": f"Paged Arrow {i}", "weight": 0.1}, headers=auth_headers)
+
+    first = client.get('/api/gear?name=Paged Arrow&limit=2', headers=auth_headers)
+    assert first.status_code == 200
+    first_page = first.get_json()
+    assert [item["name"] for item in first_page["items"]] == ["Paged Arrow 0", "Paged Arrow 1"]
+    assert first_page["next_after"] == first_page["items"][-1]["id"]
+
+    second = client.get(f'/api/gear?name=Paged Arrow&limit=2&after={first_page["next_after"]}', headers=auth_headers)
+    second_page = second.get_json()
+    assert [item["name"] for item in second_page["items"]] == ["Paged Arrow 2"]
+    assert second_page["next_after"] is None
+
+def test_get_all_gear_ndjson_stream(client, auth_headers):
+    client.post('/api/gear', json={"name": "Streamed Lantern", "weight": 1.0}, headers=auth_headers)
+
+    response = client.get('/api/gear?name=Streamed Lantern&format=ndjson', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [item["name"] for item in lines] == ["Streamed Lantern"]
+
+def test_get_all_gear_location_map(client, auth_headers):
+    location = client.post('/api/locations', json={"name": "Mapped Satchel", "type": "Container"}, headers=auth_headers).get_json()
+    for i in range(3):
+        client.post('/api/gear', json={"name": f"Mapped Rope {i}", "weight": 1.0, "location_id": location["id"]}, headers=auth_headers)
+    client.post('/api/gear', json={"name": "Mapped Rope loose", "weight": 1.0}, headers=auth_headers)
+
+    expected_locations = {str(location["id"]): location}
+    page = client.get('/api/gear?name=Mapped Rope&limit=10&locations=map', headers=auth_headers).get_json()
+    assert len(page["items"]) == 4 and page["next_after"] is None
+    assert all("location" not in item for item in page["items"])
+    assert page["locations"] == expected_locations
+
+    streamed = client.get('/api/gear?name=Mapped Rope&locations=map', headers=auth_headers).get_json()
+    assert streamed == {"items": page["items"], "locations": expected_locations}
+
+    searched = client.get('/api/gear?search=mapped rope&locations=map', headers=auth_headers).get_json()
+    assert {item["id"] for item in searched["items"]} == {item["id"] for item in page["items"]}
+    assert searched["locations"] == expected_locations
+
+def test_get_all_gear_location_map_invalid(client, auth_headers):
+    assert client.get('/api/gear?locations=inline', headers=auth_headers).status_code == 400
+    assert client.get('/api/gear?locations=map&format=ndjson', headers=auth_headers).status_code == 400
+
+def test_get_all_gear_sparse_fields(client, auth_headers):
+    client.post('/api/gear', json={"name": "Sparse Tent", "weight": 4.0, "description": "Long " * 100}, headers=auth_headers)
+
+    page = client.get('/api/gear?name=Sparse Tent&limit=5&fields=name,weight', headers=auth_headers).get_json()
+    assert [sorted(item) for item in page["items"]] == [["id", "name", "weight"]]
+    assert client.get('/api/gear?name=Sparse Tent&fields=name, location', headers=auth_headers).get_json() == [
+        {"name": "Sparse Tent", "id": page["items"][0]["id"], "location": None}]
+    lines = client.get('/api/gear?name=Sparse Tent&format=ndjson&fields=weight', headers=auth_headers).get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == [{"weight": 4.0, "id": page["items"][0]["id"]}]
+    searched = client.get('/api/gear?search=sparse tent&fields=name&locations=map', headers=auth_headers).get_json()
+    assert searched["items"] == [{"name": "Sparse Tent", "location_id": None, "id": page["items"][0]["id"]}]
+
+    response = client.get('/api/gear?fields=name,secret', headers=auth_headers)
+    assert response.status_code == 400
+    assert "secret" in response.get_json()["error"]["message"]
+
+def test_sync_returns_only_changes(client, auth_headers):
+    assert client.get('/api/sync').status_code == 401
+    seq = client.get('/api/sync?since=0', headers=auth_headers).get_json()["seq"]
+    # since=0 may be paginated; only the newest seq matters here
+    while True:
+        page = client.get(f'/api/sync?since={seq}', headers=auth_headers).get_json()
+        if not page["has_more"]:
+            seq = page["seq"]
+            break
+        seq = page["seq"]
+
+    created = client.post('/api/gear', json={"name": "Synced Compass", "weight": 0.2}, headers=auth_headers).get_json()
+    doomed = client.post('/api/gear', json={"name": "Synced Crumbs", "weight": 0.1}, headers=auth_headers).get_json()
+    client.delete(f'/api/gear/{doomed["id"]}', headers=auth_headers)
+
+    response = client.get(f'/api/sync?since={seq}', headers=auth_headers)
+    assert response.status_code == 200
+    delta = response.get_json()
+    assert [item["name"] for item in delta["gear"]] == ["Synced Compass"]
+    assert delta["deleted"]["gear"] == [doomed["id"]]
+    assert delta["seq"] > seq
+
+    unchanged = client.get(f'/api/sync?since={delta["seq"]}', headers=auth_headers).get_json()
+    assert unchanged["gear"] == [] and unchanged["seq"] == delta["seq"]
+    assert client.get('/api/sync?since=-1', headers=auth_headers).status_code == 400
+    assert created["id"] not in unchanged["deleted"]["gear"]
+    other_epoch = client.get(f'/api/sync?since={delta["seq"]}&epoch=1{delta["epoch"]}', headers=auth_headers).get_json()
+    assert other_epoch["reset"] and other_epoch["gear"] != []
+
+def test_get_all_gear_invalid_limit(client, auth_headers):
+    response = client.get('/api/gear?limit=abc', headers=auth_headers)
+    assert response.status_code == 400
+    assert "limit" in response.get_json()["error"]["message"]
+
+def test_search_gear_prefix_and_rank(client, auth_headers):
+    client.post('/api/gear', json={"name": "Quillfeather Cloak", "weight": 1.0, "category": "Search Test"}, headers=auth_headers)
+    client.post('/api/gear', json={"name": "Plain Satchel", "weight": 1.0, "description": "Trimmed with quillfeather stitching", "category": "Search Test"}, headers=auth_headers)
+    client.post('/api/gear', json={"name": "Quillfeather Boots", "weight": 1.0, "category": "Other Search Test"}, headers=auth_headers)
+
+    response = client.get('/api/gear?search=quillfea', headers=auth_headers)
+    assert response.status_code == 200
+    names = [item["name"] for item in response.get_json()]
+    assert set(names) == {"Quillfeather Cloak", "Plain Satchel", "Quillfeather Boots"}
+    assert names[-1] == "Plain Satchel" # Description-only match ranks below name matches
+
+    filtered = client.get('/api/gear?search=quill cloa&category=Search Test', headers=auth_headers).get_json()
+    assert [item["name"] for item in filtered] == ["Quillfeather Cloak"]
+
+def test_search_gear_follows_updates(client, auth_headers):
+    item_id = client.post('/api/gear', json={"name": "Zephyrine Lamp", "weight": 1.0}, headers=auth_headers).get_json()["id"]
+    client.patch(f'/api/gear/{item_id}', json={"name": "Xanthic Lamp"}, headers=auth_headers)
+
+    assert client.get('/api/gear?search=zephyrine', headers=auth_headers).get_json() == []
+    assert [item["id"] for item in client.get('/api/gear?search=xanthic', headers=auth_headers).get_json()] == [item_id]
+
+    client.delete(f'/api/gear/{item_id}', headers=auth_headers)
+    assert client.get('/api/gear?search=xanthic', headers=auth_headers).get_json() == []
+
+def test_search_gear_rejects_cursor(client, auth_headers):
+    response = client.get('/api/gear?search=lamp&after=5', headers=auth_headers)
+    assert response.status_code == 400
+
 # --- Test POST /api/gear ---
 def test_post_gear_unauthenticated(client):
     gear_data = {"name": "Test Sword", "weight": 1.0, "description": "A test item"}
@@ -42,6 +167,20 @@ def test_post_gear_authenticated_valid_data(client, auth_headers):
     assert data["name"] == "Shiny Helm"
     assert "id" in data
 
+def test_gear_writes_through_write_queue(client, app, auth_headers, monkeypatch):
+    monkeypatch.setitem(app.config, 'WRITE_QUEUE_ENABLED', True)
+    created = client.post('/api/gear', json={"name": "Queued Helm", "weight": 1.5}, headers=auth_headers)
+    assert created.status_code == 201
+    item_id = created.get_json()["id"]
+    assert client.patch(f'/api/gear/{item_id}', json={"weight": 2.5}, headers=auth_headers).get_json()["weight"] == 2.5
+    bad_location = client.patch(f'/api/gear/{item_id}', json={"location_id": 999999}, headers=auth_headers)
+    assert bad_location.status_code == 400 # The IntegrityError raised on the writer thread reaches the route
+    assert client.delete(f'/api/gear/{item_id}', headers=auth_headers).status_code == 200
+    assert client.get(f'/api/gear/{item_id}', headers=auth_headers).status_code == 404
+
+    stats = client.get('/api/db/writer', headers=auth_headers).get_json()
+    assert stats["writes"] >= 4 and stats["failed_writes"] >= 1
+
 def test_post_gear_authenticated_invalid_data(client, auth_headers):
     gear_data = {"name": "Heavy Rock"} # Missing 'weight'
     response = client.post('/api/gear', json=gear_data, headers=auth_headers)
@@ -113,6 +252,49 @@ def test_patch_gear_authenticated_valid(client, auth_headers):
     assert data["name"] == "ItemToPatch" # Name should be unchanged
     assert data["description"] == "Patched Description Only"
 
+def test_patch_gear_if_match(client, auth_headers):
+    """Test that a PATCH conditional on an outdated version is rejected with 412 instead of overwriting."""
+    item = client.post('/api/gear', json={"name": "ItemToPatchIfMatch", "weight": 1.0}, headers=auth_headers).get_json()
+    assert item["version"] == 1
+
+    first = client.patch(f'/api/gear/{item["id"]}', json={"weight": 2.0}, headers={**auth_headers, "If-Match": '"1"'})
+    assert first.status_code == 200
+    assert first.get_json()["version"] == 2
+
+    stale = client.patch(f'/api/gear/{item["id"]}', json={"weight": 3.0}, headers={**auth_headers, "If-Match": '"1"'})
+    assert stale.status_code == 412
+    assert stale.get_json()["error"]["current_version"] == 2
+    assert client.get(f'/api/gear/{item["id"]}', headers=auth_headers).get_json()["weight"] == 2.0
+
+    invalid = client.patch(f'/api/gear/{item["id"]}', json={"weight": 3.0}, headers={**auth_headers, "If-Match": 'W/"2"'})
+    assert invalid.status_code == 400
+    assert client.delete(f'/api/gear/{item["id"]}', headers={**auth_headers, "If-Match": '"1"'}).status_code == 412
+    assert client.delete(f'/api/gear/{item["id"]}', headers={**auth_headers, "If-Match": '"2"'}).status_code == 200
+
+    # A missing item is a 404, with or without If-Match.
+    for headers in (auth_headers, {**auth_headers, "If-Match": '"1"'}):
+        assert client.put('/api/gear/999999', json={"name": "Ghost", "weight": 1.0}, headers=headers).status_code == 404
+        assert client.patch('/api/gear/999999', json={"weight": 1.0}, headers=headers).status_code == 404
+        assert client.delete('/api/gear/999999', headers=headers).status_code == 404
+
+def test_get_gear_item_etag_is_if_match_version(client, auth_headers):
+    """Test that the ETag of a single item can be sent back in If-Match, and changes with its embedded location."""
+    pocket = client.post('/api/locations', json={"name": "Etag Pocket", "type": "Container"}, headers=auth_headers).get_json()
+    item = client.post('/api/gear', json={"name": "Etag Whistle", "weight": 0.1, "location_id": pocket["id"]}, headers=auth_headers).get_json()
+    loaded = client.get(f'/api/gear/{item["id"]}', headers=auth_headers)
+    assert loaded.headers['ETag'] == '"1.1"'
+    assert client.get(f'/api/gear/{item["id"]}', headers={**auth_headers, "If-None-Match": '"1.1"'}).status_code == 304
+
+    client.patch(f'/api/locations/{pocket["id"]}', json={"name": "Etag Chest Pocket"}, headers=auth_headers)
+    renamed = client.get(f'/api/gear/{item["id"]}', headers={**auth_headers, "If-None-Match": '"1.1"'})
+    assert renamed.status_code == 200
+    assert renamed.headers['ETag'] == '"1.2"'
+
+    updated = client.patch(f'/api/gear/{item["id"]}', json={"weight": 0.2}, headers={**auth_headers, "If-Match": loaded.headers['ETag']})
+    assert updated.status_code == 200
+    stale = client.patch(f'/api/gear/{item["id"]}', json={"weight": 0.3}, headers={**auth_headers, "If-Match": renamed.headers['ETag']})
+    assert stale.status_code == 412
+
 # --- Test DELETE /api/gear/{id} ---
 def test_delete_gear_unauthenticated(client):
     response = client.delete('/api/gear/1')
@@ -132,6 +314,157 @@ def test_delete_gear_authenticated_valid(client, auth_headers):
     get_response = client.get(f'/api/gear/{item_id}', headers=auth_headers)
     assert get_response.status_code == 404
 
+# --- Test PATCH /api/gear/batch ---
+def test_batch_update_unauthenticated(client):
+    response = client.patch('/api/gear/batch', json={"ids": [1], "location_id": None})
+    assert response.status_code == 401
+
+def test_batch_move_to_location(client, auth_headers):
+    backpack_id = client.get('/api/locations?name=Backpack', headers=auth_headers).get_json()[0]["id"]
+    ids = [client.post('/api/gear', json={"name": f"Batch Move {i}", "weight": 1.0}, headers=auth_headers).get_json()["id"] for i in range(3)]
+
+    response = client.patch('/api/gear/batch', json={"ids": ids + [99999], "location_id": backpack_id}, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [item["id"] for item in data["items"]] == ids
+    assert all(item["location"]["name"] == "Backpack" for item in data["items"])
+    assert data["not_found"] == [99999]
+
+def test_batch_move_invalid_location(client, auth_headers):
+    item_id = client.post('/api/gear', json={"name": "Batch Bad Move", "weight": 1.0}, headers=auth_headers).get_json()["id"]
+    response = client.patch('/api/gear/batch', json={"ids": [item_id], "location_id": 99999}, headers=auth_headers)
+    assert response.status_code == 400
+    assert client.get(f'/api/gear/{item_id}', headers=auth_headers).get_json()["location_id"] is None
+
+def test_batch_apply_patches(client, auth_headers):
+    first = client.post('/api/gear', json={"name": "Batch Patch A", "weight": 1.0}, headers=auth_headers).get_json()["id"]
+    second = client.post('/api/gear', json={"name": "Batch Patch B", "weight": 2.0}, headers=auth_headers).get_json()["id"]
+
+    updates = [{"id": first, "weight": 1.5}, {"id": second, "weight": 2.5}, {"id": second, "description": "patched"}]
+    response = client.patch('/api/gear/batch', json={"updates": updates}, headers=auth_headers)
+    assert response.status_code == 200
+    items = {item["id"]: item for item in response.get_json()["items"]}
+    assert items[first]["weight"] == 1.5
+    assert (items[second]["weight"], items[second]["description"]) == (2.5, "patched")
+
+def test_batch_patches_are_all_or_nothing(client, auth_headers):
+    item_id = client.post('/api/gear', json={"name": "Batch Untouched", "weight": 1.0}, headers=auth_headers).get_json()["id"]
+    updates = [{"id": item_id, "weight": 9.0}, {"id": item_id, "weight": -1}]
+    response = client.patch('/api/gear/batch', json={"updates": updates}, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()["error"]["errors"][0]["index"] == 1
+    assert client.get(f'/api/gear/{item_id}', headers=auth_headers).get_json()["weight"] == 1.0
+
+# --- Test POST /api/gear/bulk and GET /api/gear/export ---
+def test_bulk_import_unauthenticated(client):
+    response = client.post('/api/gear/bulk', json=[{"name": "Nope", "weight": 1.0}])
+    assert response.status_code == 401
+
+def test_bulk_import_json_array_reports_row_errors(client, auth_headers):
+    rows = [
+        {"name": "Bulk Torch", "weight": 1.0, "category": "Bulk Test"},
+        {"name": "Bulk Bad Weight", "weight": -5},
+        {"name": "Bulk Lost Item", "weight": 1.0, "location_id": 99999},
+        {"name": "Bulk Oil Flask", "weight": 0.5, "category": "Bulk Test"},
+    ]
+    response = client.post('/api/gear/bulk', json=rows, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["created"] == 2
+    assert data["failed"] == 2
+    assert [err["index"] for err in data["errors"]] == [1, 2]
+    assert data["errors"][0]["errors"][0]["loc"] == ["weight"]
+
+    listed = client.get('/api/gear?category=Bulk Test', headers=auth_headers).get_json()
+    assert sorted(item["name"] for item in listed) == ["Bulk Oil Flask", "Bulk Torch"]
+
+def test_bulk_import_ndjson_and_csv(client, auth_headers):
+    ndjson_body = '{"name": "Bulk NDJSON Rope", "weight": 5, "category": "Bulk Stream"}\n\n{"name": "Bulk NDJSON Hook", "weight": 1, "category": "Bulk Stream"}\n'
+    response = client.post('/api/gear/bulk', data=ndjson_body, content_type='application/x-ndjson', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()["created"] == 2
+
+    csv_body = "name,weight,cost,category\nBulk CSV Chalk,0.1,,Bulk Stream\n"
+    response = client.post('/api/gear/bulk', data=csv_body, content_type='text/csv', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()["created"] == 1
+
+    listed = client.get('/api/gear?category=Bulk Stream', headers=auth_headers).get_json()
+    chalk = next(item for item in listed if item["name"] == "Bulk CSV Chalk")
+    assert chalk["cost"] is None
+
+def test_bulk_import_upsert_updates_existing(client, auth_headers):
+    item_id = client.post('/api/gear', json={"name": "Bulk Upsert Shield", "weight": 6.0}, headers=auth_headers).get_json()["id"]
+    rows = [{"id": item_id, "name": "Bulk Upsert Shield", "weight": 7.5}, {"name": "Bulk Upsert Spear", "weight": 3.0}]
+
+    response = client.post('/api/gear/bulk?mode=upsert', json=rows, headers=auth_headers)
+    data = response.get_json()
+    assert (data["created"], data["updated"]) == (1, 1)
+    assert client.get(f'/api/gear/{item_id}', headers=auth_headers).get_json()["weight"] == 7.5
+
+    # An id given twice is created by its first row and updated by the second.
+    new_id = item_id + 100000
+    repeated = [{"id": new_id, "name": "Bulk Upsert Buckler", "weight": 4.0}, {"id": item_id, "name": "Bulk Upsert Shield", "weight": 8.0},
+                {"id": new_id, "name": "Bulk Upsert Buckler", "weight": 4.5}]
+    data = client.post('/api/gear/bulk?mode=upsert', json=repeated, headers=auth_headers).get_json()
+    assert (data["created"], data["updated"]) == (1, 2)
+    assert client.get(f'/api/gear/{new_id}', headers=auth_headers).get_json()["weight"] == 4.5
+
+def test_bulk_import_unparseable_body(client, auth_headers):
+    response = client.post('/api/gear/bulk', data='{"name": "ok", "weight": 1}\nnot json\n', content_type='application/x-ndjson', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_export_gear_formats(client, auth_headers):
+    client.post('/api/gear', json={"name": "Export Compass", "weight": 0.3}, headers=auth_headers)
+
+    response = client.get('/api/gear/export?format=ndjson', headers=auth_headers)
+    assert response.status_code == 200
+    exported = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    compass = next(item for item in exported if item["name"] == "Export Compass")
+    assert "location" not in compass # Flat rows, ready to be re-imported with mode=upsert
+
+    response = client.get('/api/gear/export?format=csv', headers=auth_headers)
+    assert response.mimetype == 'text/csv'
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "id,name,description,weight,cost,value,legality,category,location_id"
+    assert any(",Export Compass," in line for line in lines[1:])
+
+# --- Test conditional GET (ETag / If-None-Match) ---
+def test_get_gear_etag_not_modified(client, auth_headers):
+    first = client.get('/api/gear?name=Etag', headers=auth_headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert 'no-cache' in first.headers['Cache-Control']
+
+    repeat = client.get('/api/gear?name=Etag', headers={**auth_headers, "If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.get_data() == b""
+    assert repeat.headers['ETag'] == etag
+
+    # Another representation of the same data gets its own tag.
+    other = client.get('/api/gear?name=Etag&format=ndjson', headers={**auth_headers, "If-None-Match": etag})
+    assert other.status_code == 200
+    other.get_data() # Consume the stream so its request context is popped now, in order
+
+def test_get_gear_etag_changes_after_write(client, auth_headers):
+    etag = client.get('/api/gear?name=Etag Rope', headers=auth_headers).headers['ETag']
+    locations_etag = client.get('/api/locations', headers=auth_headers).headers['ETag']
+
+    client.post('/api/gear', json={"name": "Etag Rope", "weight": 1.0}, headers=auth_headers)
+
+    changed = client.get('/api/gear?name=Etag Rope', headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert [item["name"] for item in changed.get_json()] == ["Etag Rope"]
+    assert changed.headers['ETag'] != etag
+    # Gear writes don't invalidate responses that only read locations.
+    unchanged = client.get('/api/locations', headers={**auth_headers, "If-None-Match": locations_etag})
+    assert unchanged.status_code == 304
+
+def test_get_gear_by_id_missing_has_no_etag(client, auth_headers):
+    response = client.get('/api/gear/999999', headers=auth_headers)
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
 # Note: Uses a module-scoped auth_headers fixture. This means one user login for all gear tests.
 # The database state is shared across these tests due to session-scoped app fixture.
 # Tests are written to be mostly independent by creating new items as needed.
@@ -0,0 +1,137 @@
+import pytest
+
+# Helper to get an auth token (same approach as test_api_gear.py).
+def get_auth_token(client, username="test_location_user", password="password123"):
+    client.post('/api/auth/register', json={"username": username, "password": password})
+    response = client.post('/api/auth/login', json={"username": username, "password": password})
+    if response.status_code == 200:
+        return response.get_json().get('access_token')
+    pytest.fail(f"Failed to get auth token for {username}. Status: {response.status_code}, Response: {response.data}")
+
+
+@pytest.fixture(scope="module") # Token can be reused for all tests in this module
+def auth_headers(app):
+    token = get_auth_token(app.test_client())
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_location(client, headers, name, parent_id=None, type_="Container"):
+    response = client.post('/api/locations', json={"name": name, "type": type_, "parent_id": parent_id}, headers=headers)
+    assert response.status_code == 201, response.data
+    return response.get_json()["id"]
+
+
+def create_gear(client, headers, name, location_id, weight, value=None, cost=None):
+    response = client.post('/api/gear', json={
+        "name": name, "weight": weight, "value": value, "cost": cost, "location_id": location_id
+    }, headers=headers)
+    assert response.status_code == 201, response.data
+    return response.get_json()["id"]
+
+
+# --- Test GET /api/locations/{id}/items ---
+def test_items_in_location_location_map(client, auth_headers):
+    pouch = create_location(client, headers=auth_headers, name="Mapped Pouch")
+    gear_ids = [create_gear(client, auth_headers, f"Mapped Coin {i}", pouch, weight=0.01) for i in range(2)]
+
+    embedded = client.get(f'/api/locations/{pouch}/items', headers=auth_headers).get_json()
+    assert [item["location"]["name"] for item in embedded] == ["Mapped Pouch", "Mapped Pouch"]
+
+    response = client.get(f'/api/locations/{pouch}/items?locations=map', headers=auth_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert sorted(item["id"] for item in body["items"]) == sorted(gear_ids)
+    assert all("location" not in item and item["location_id"] == pouch for item in body["items"])
+    assert body["locations"] == {str(pouch): {"id": pouch, "name": "Mapped Pouch", "type": "Container", "parent_id": None, "version": 1}}
+
+
+# --- Test If-Match on location writes ---
+def test_location_writes_if_match(client, auth_headers):
+    satchel = create_location(client, auth_headers, "IfMatch Satchel")
+    renamed = client.patch(f'/api/locations/{satchel}', json={"name": "IfMatch Bag"}, headers={**auth_headers, "If-Match": '"1"'})
+    assert renamed.status_code == 200
+    assert renamed.get_json()["version"] == 2
+
+    stale = client.patch(f'/api/locations/{satchel}', json={"name": "IfMatch Sack"}, headers={**auth_headers, "If-Match": '"1"'})
+    assert stale.status_code == 412
+    assert stale.get_json()["error"]["current_version"] == 2
+    assert client.delete(f'/api/locations/{satchel}', headers={**auth_headers, "If-Match": '"1"'}).status_code == 412
+    assert client.delete(f'/api/locations/{satchel}', headers={**auth_headers, "If-Match": '"2"'}).status_code == 200
+
+    # A missing location is a 404, with or without If-Match.
+    for headers in (auth_headers, {**auth_headers, "If-Match": '"1"'}):
+        assert client.put('/api/locations/999999', json={"name": "IfMatch Ghost"}, headers=headers).status_code == 404
+        assert client.patch('/api/locations/999999', json={"name": "IfMatch Ghost"}, headers=headers).status_code == 404
+        assert client.delete('/api/locations/999999', headers=headers).status_code == 404
+
+
+def test_get_location_etag_is_if_match_version(client, auth_headers):
+    pack = create_location(client, auth_headers, "IfMatch Pack")
+    etag = client.get(f'/api/locations/{pack}', headers=auth_headers).headers['ETag']
+    assert etag == '"1"'
+    assert client.get(f'/api/locations/{pack}', headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+    assert client.patch(f'/api/locations/{pack}', json={"type": "Body Slot"}, headers={**auth_headers, "If-Match": etag}).status_code == 200
+    assert client.patch(f'/api/locations/{pack}', json={"type": "Container"}, headers={**auth_headers, "If-Match": etag}).status_code == 412
+
+# --- Test GET /api/loadout ---
+def test_loadout_unauthenticated(client):
+    assert client.get('/api/loadout').status_code == 401
+
+
+def test_loadout_snapshot_and_etag(client, auth_headers):
+    sack = create_location(client, auth_headers, "Loadout Sack")
+    create_gear(client, auth_headers, "Loadout Flint", sack, weight=0.25)
+
+    response = client.get(f'/api/loadout?root={sack}', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()["containers"][0]["items"][0]["name"] == "Loadout Flint"
+    assert client.get(f'/api/loadout?root={sack}', headers={**auth_headers, "If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    whole = client.get('/api/loadout', headers=auth_headers).get_json()
+    assert any(node["id"] == sack for node in whole["containers"])
+    assert {node["name"] for node in whole["body_slots"]} >= {"Head", "Torso"}
+    assert client.get('/api/loadout?root=999999', headers=auth_headers).status_code == 404
+
+
+# --- Test GET /api/locations/{id}/totals ---
+def test_location_totals_unauthenticated(client):
+    response = client.get('/api/locations/1/totals')
+    assert response.status_code == 401
+
+def test_location_totals_include_nested_containers(client, auth_headers):
+    pack = create_location(client, auth_headers, "Totals Pack")
+    pouch = create_location(client, auth_headers, "Totals Pouch", parent_id=pack)
+    vial_case = create_location(client, auth_headers, "Totals Vial Case", parent_id=pouch)
+    create_location(client, auth_headers, "Totals Empty Sack", parent_id=pack)
+
+    create_gear(client, auth_headers, "Totals Bedroll", pack, weight=5.0, value=2.0, cost=3.0)
+    create_gear(client, auth_headers, "Totals Flint", pouch, weight=0.5, value=1.0)
+    create_gear(client, auth_headers, "Totals Vial", vial_case, weight=0.25, value=10.0, cost=12.0)
+
+    response = client.get(f'/api/locations/{pack}/totals', headers=auth_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["location_id"] == pack
+    assert data["item_count"] == 3
+    assert data["total_weight"] == pytest.approx(5.75)
+    assert data["total_value"] == pytest.approx(13.0)
+    assert data["total_cost"] == pytest.approx(15.0)
+    assert data["direct"]["item_count"] == 1
+
+    children = {child["name"]: child for child in data["children"]}
+    assert children["Totals Pouch"]["item_count"] == 2 # Includes the nested vial case
+    assert children["Totals Pouch"]["total_weight"] == pytest.approx(0.75)
+    assert children["Totals Empty Sack"]["item_count"] == 0
+
+def test_location_totals_not_found(client, auth_headers):
+    response = client.get('/api/locations/99999/totals', headers=auth_headers)
+    assert response.status_code == 404
+
+# --- Test PUT /api/locations/{id} re-parenting ---
+def test_update_location_rejects_cycle(client, auth_headers):
+    outer = create_location(client, auth_headers, "Cycle Outer Chest")
+    inner = create_location(client, auth_headers, "Cycle Inner Box", parent_id=outer)
+
+    response = client.put(f'/api/locations/{outer}', json={"parent_id": inner}, headers=auth_headers)
+    assert response.status_code == 400
+    assert "cycle" in response.get_json()["error"]["message"]
@@ -0,0 +1,109 @@
+import asyncio
+import json
+from src.asgi_adapter import WSGIToASGI, build_environ
+
+def run_asgi(asgi_app, scope, body=b"", disconnect_after_messages=None):
+    """Runs one ASGI request and returns the messages sent back."""
+    messages = []
+
+    async def main():
+        sent_enough = asyncio.Event()
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            if disconnect_after_messages is None:
+                await asyncio.Event().wait()
+            await sent_enough.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+            if disconnect_after_messages is not None and len(messages) >= disconnect_after_messages:
+                sent_enough.set()
+
+        await asyncio.wait_for(asgi_app(scope, receive, send), timeout=10)
+
+    asyncio.run(main())
+    return messages
+
+def http_scope(path, method="GET", headers=(), query_string=b""):
+    return {"type": "http", "method": method, "path": path, "query_string": query_string,
+            "headers": list(headers), "server": ("testserver", 80), "client": ("127.0.0.1", 5000)}
+
+def test_build_environ():
+    scope = http_scope("/api/gear/Rüstung", method="POST", query_string=b"limit=2", headers=[
+        (b"content-type", b"application/json"), (b"content-length", b"999"),
+        (b"accept", b"text/plain"), (b"accept", b"application/json"),
+    ])
+    environ = build_environ(scope, b'{"a": 1}')
+    assert environ["PATH_INFO"].encode("latin-1").decode("utf-8") == "/api/gear/Rüstung"
+    assert environ["QUERY_STRING"] == "limit=2"
+    assert environ["CONTENT_TYPE"] == "application/json"
+    assert environ["CONTENT_LENGTH"] == "8" # Length of the body actually received
+    assert environ["HTTP_ACCEPT"] == "text/plain,application/json"
+    assert environ["wsgi.input"].read() == b'{"a": 1}'
+
+def test_streamed_response_is_sent_in_chunks():
+    closed = []
+
+    class Body:
+        def __iter__(self):
+            yield from (b"one\n", b"", b"two\n")
+        def close(self):
+            closed.append(True)
+
+    def wsgi_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "application/x-ndjson")])
+        return Body()
+
+    messages = run_asgi(WSGIToASGI(wsgi_app, threads=1), http_scope("/"))
+    assert messages[0] == {"type": "http.response.start", "status": 200,
+                           "headers": [(b"content-type", b"application/x-ndjson")]}
+    assert [(m["body"], m["more_body"]) for m in messages[1:]] == [(b"one\n", True), (b"two\n", True), (b"", False)]
+    assert closed == [True] # The request context (and its DB connection) is released
+
+def test_client_disconnect_stops_producer():
+    """Test that an endless stream ends, and is closed, once the client goes away."""
+    closed = []
+
+    def wsgi_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        def generate():
+            try:
+                while True:
+                    yield b"x" * 1024
+            finally:
+                closed.append(True)
+        return generate()
+
+    adapter = WSGIToASGI(wsgi_app, threads=1)
+    messages = run_asgi(adapter, http_scope("/"), disconnect_after_messages=3)
+    assert len(messages) >= 3
+    assert closed == [True]
+    adapter.shutdown()
+
+def test_lifespan():
+    messages = []
+    incoming = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+
+    async def receive():
+        return next(incoming)
+
+    async def send(message):
+        messages.append(message["type"])
+
+    asyncio.run(WSGIToASGI(lambda environ, start_response: [], threads=1)({"type": "lifespan"}, receive, send))
+    assert messages == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+def test_flask_app_served_over_asgi(app):
+    adapter = WSGIToASGI(app, threads=2)
+    body = json.dumps({"username": "testuser_asgi", "password": "password123"}).encode()
+    messages = run_asgi(adapter, http_scope("/api/auth/register", method="POST",
+                                            headers=[(b"content-type", b"application/json")]), body=body)
+    assert messages[0]["status"] == 201
+    assert json.loads(b"".join(m.get("body", b"") for m in messages[1:]))["username"] == "testuser_asgi"
+    adapter.shutdown()
@@ -0,0 +1,21 @@
+from benchmarks.catalog import parse_size
+from benchmarks.macro import ROUTES
+from benchmarks.micro import CASES, uncovered_functions
+from benchmarks.run import run_benchmarks
+
+def test_every_data_access_function_has_a_benchmark():
+    """New query functions must be added to benchmarks/micro.py CASES."""
+    assert uncovered_functions() == set()
+
+def test_benchmarks_run_on_small_catalog(app, tmp_path):
+    """Smoke test: every case and route runs against a tiny generated catalog and reports timings."""
+    results = run_benchmarks([300], iterations=2, max_seconds=1.0, data_dir=str(tmp_path), log=lambda message: None)
+    size_results = results["sizes"]["300"]
+    assert size_results["catalog"]["gear"] == 300
+    assert set(size_results["micro"]) == {case.name for case in CASES}
+    assert set(size_results["macro"]) == {route.name for route in ROUTES}
+    for stats in list(size_results["micro"].values()) + list(size_results["macro"].values()):
+        assert stats["count"] >= 1 and stats["p50_ms"] <= stats["p99_ms"]
+
+def test_parse_size():
+    assert [parse_size(size) for size in ("10k", "100K", "1M", "2500")] == [10000, 100000, 1000000, 2500]
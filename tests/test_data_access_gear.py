@@ -0,0 +1,109 @@
+import json
+import pytest
+from flask import jsonify
+from app import GearCreate, GearUpdate, LocationCreate # Import Pydantic models
+from src.data_access import gear_queries, location_queries, change_tracking, sync_queries # Import query functions
+
+def test_gear_row_to_dict_matches_model_dump(db):
+    """Test that the read fast path serializes byte-for-byte like the validated GearInDB path."""
+    bag = location_queries.create_location(db, LocationCreate(name="dal_fastpath_bag", type="Container"))
+    pouch = location_queries.create_location(db, LocationCreate(name="dal_fastpath_pouch", type="Container", parent_id=bag.id))
+    gear_queries.create_gear(db, GearCreate(name="dal_fastpath full", description="Röhre \"quoted\"", weight=3, cost=1.5,
+                                            value=0, legality="Legal", category="Tools", location_id=pouch.id))
+    gear_queries.create_gear(db, GearCreate(name="dal_fastpath bare", weight=0.1))
+
+    rows = db.execute(gear_queries._GEAR_WITH_LOCATION_SELECT + " ORDER BY g.id").fetchall()
+    assert rows
+    for row in rows:
+        model_dump = gear_queries._make_gear_in_db_from_row(row).model_dump()
+        fast = gear_queries.gear_row_to_dict(row)
+        assert json.dumps(fast) == json.dumps(model_dump) # Same keys, order and value types
+        assert jsonify(fast).get_data() == jsonify(model_dump).get_data()
+
+def test_iter_gear_as_dicts(db):
+    """Test that as_dicts yields the same items as the model path."""
+    for name in ("dal_asdicts one", "dal_asdicts two"):
+        gear_queries.create_gear(db, GearCreate(name=name, weight=1.0))
+    models = [item.model_dump() for item in gear_queries.iter_gear(db, "dal_asdicts")]
+    dicts = list(gear_queries.iter_gear(db, "dal_asdicts", as_dicts=True))
+    assert len(dicts) == 2
+    assert dicts == models
+
+    page, next_after = gear_queries.get_gear_page(db, "dal_asdicts", None, None, 1, as_dicts=True)
+    assert page == models[:1]
+    assert next_after == models[0]["id"]
+
+def test_iter_gear_fields_projection(db):
+    """Test that a sparse fieldset is the full dict narrowed to those keys, and only joins locations when asked to."""
+    location = location_queries.create_location(db, LocationCreate(name="dal_fields belt", type="Container"))
+    gear_queries.create_gear(db, GearCreate(name="dal_fields knife", weight=0.5, description="x" * 500, location_id=location.id))
+    full = list(gear_queries.iter_gear(db, "dal_fields", as_dicts=True))
+
+    for fields in (("name", "weight"), ("location", "name", "weight"), ("location_id",)):
+        narrowed = list(gear_queries.iter_gear(db, "dal_fields", fields=fields))
+        expected_keys = [key for key in full[0] if key in fields or key == "id"]
+        assert narrowed == [{key: item[key] for key in expected_keys} for item in full]
+        assert list(narrowed[0]) == expected_keys
+        assert gear_queries.project_gear_fields(fields).joins_locations == ("location" in fields)
+    with pytest.raises(ValueError):
+        gear_queries.project_gear_fields(("name", "secret"))
+
+def test_writes_bump_table_versions(db):
+    """Test that the schema triggers count every gear write, including bulk ones, and leave locations alone."""
+    before = change_tracking.get_table_versions(db, ["gear", "locations"])
+    item = gear_queries.create_gear(db, GearCreate(name="dal_version lamp", weight=1.0))
+    gear_queries.bulk_write_gear(db, [[(None, GearCreate(name="dal_version oil", weight=0.5)), (item.id, GearCreate(name="dal_version lamp", weight=2.0))]])
+    after = change_tracking.get_table_versions(db, ["gear", "locations"])
+
+    assert after["gear"] == before["gear"] + 3
+    assert after["locations"] == before["locations"]
+    assert after[change_tracking.EPOCH_KEY] == before[change_tracking.EPOCH_KEY]
+    with pytest.raises(ValueError):
+        change_tracking.get_table_versions(db, ["users"])
+
+def test_conditional_writes_check_row_version(db):
+    """Test that writes bump the row version and an expected_version that is out of date raises VersionConflict."""
+    item = gear_queries.create_gear(db, GearCreate(name="dal_ifmatch torch", weight=1.0))
+    assert item.version == 1
+    updated = gear_queries.update_gear(db, item.id, GearUpdate(weight=2.0), expected_version=1)
+    assert (updated.version, updated.weight) == (2, 2.0)
+
+    with pytest.raises(change_tracking.VersionConflict) as conflict:
+        gear_queries.update_gear(db, item.id, GearUpdate(weight=3.0), expected_version=1) # Lost update
+    assert conflict.value.current_version == 2
+    assert gear_queries.get_gear_by_id(db, item.id).weight == 2.0
+    with pytest.raises(change_tracking.VersionConflict):
+        gear_queries.delete_gear(db, item.id, expected_version=1)
+
+    assert gear_queries.update_gear(db, item.id + 1000, GearUpdate(weight=3.0), expected_version=1) is None
+    assert gear_queries.delete_gear(db, item.id, expected_version=2) is True
+
+def test_get_changes_since_reports_changes_and_tombstones(db):
+    """Test that the row_changes log reports each changed row once, with deletes as tombstones, from one seq on."""
+    start = sync_queries.get_changes_since(db, 0, 10**6)["seq"]
+    location = location_queries.create_location(db, LocationCreate(name="dal_sync shelf", type="Container"))
+    kept = gear_queries.create_gear(db, GearCreate(name="dal_sync kept", weight=1.0, location_id=location.id))
+    doomed = gear_queries.create_gear(db, GearCreate(name="dal_sync doomed", weight=1.0))
+    gear_queries.update_gear(db, kept.id, GearUpdate(weight=2.0))
+    gear_queries.delete_gear(db, doomed.id)
+
+    changes = sync_queries.get_changes_since(db, start, 100)
+    assert [(item["id"], item["weight"]) for item in changes["gear"]] == [(kept.id, 2.0)]
+    assert "location" not in changes["gear"][0]
+    assert [item["name"] for item in changes["locations"]] == ["dal_sync shelf"]
+    assert changes["deleted"] == {"gear": [doomed.id], "locations": []}
+    assert not changes["has_more"] and not changes["reset"]
+
+    # Deleting the location clears the item's location_id (ON DELETE SET NULL), which is a change too.
+    location_queries.delete_location(db, location.id)
+    later = sync_queries.get_changes_since(db, changes["seq"], 100)
+    assert [(item["id"], item["location_id"]) for item in later["gear"]] == [(kept.id, None)]
+    assert later["deleted"]["locations"] == [location.id]
+
+    first = sync_queries.get_changes_since(db, start, 1)
+    assert first["has_more"] and first["seq"] > start
+    assert sync_queries.get_changes_since(db, later["seq"] + 1000, 1)["reset"]
+    # A replaced database can have reached the same seq; the epoch tells them apart.
+    assert not sync_queries.get_changes_since(db, later["seq"], 1, later["epoch"])["reset"]
+    replaced = sync_queries.get_changes_since(db, later["seq"], 1, later["epoch"] + "0")
+    assert replaced["reset"] and replaced["has_more"]
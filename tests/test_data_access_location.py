@@ -0,0 +1,137 @@
+import pytest
+from app import GearCreate, LocationCreate, LocationUpdate # Import Pydantic models
+from src.data_access import gear_queries, location_queries # Import query functions
+from src.data_access.change_tracking import VersionConflict
+from src.data_access.read_cache import read_cache
+
+def make_location(db, name, parent_id=None):
+    return location_queries.create_location(db, LocationCreate(name=name, type="Container", parent_id=parent_id))
+
+@pytest.fixture
+def traced_without_cache(db):
+    """The SQL db runs, with the read cache disabled (it used to be what took the write lock)."""
+    max_entries, ttl_seconds = read_cache.max_entries, read_cache.ttl_seconds
+    read_cache.configure(0, ttl_seconds)
+    statements = []
+    db.set_trace_callback(statements.append)
+    yield statements
+    db.set_trace_callback(None)
+    read_cache.configure(max_entries, ttl_seconds)
+
+def closure_rows(db, location_id):
+    """Returns {ancestor_id: depth} for every ancestor of location_id (including itself)."""
+    rows = db.execute("SELECT ancestor_id, depth FROM location_closure WHERE descendant_id = ?", (location_id,)).fetchall()
+    return {row["ancestor_id"]: row["depth"] for row in rows}
+
+def test_create_location_records_ancestors(db):
+    """Test that a nested location gets closure rows for all of its ancestors."""
+    pack = make_location(db, "dal_closure_pack")
+    pouch = make_location(db, "dal_closure_pouch", parent_id=pack.id)
+    vial = make_location(db, "dal_closure_vial", parent_id=pouch.id)
+
+    assert closure_rows(db, vial.id) == {vial.id: 0, pouch.id: 1, pack.id: 2}
+    assert location_queries.is_descendant(db, vial.id, pack.id)
+    assert not location_queries.is_descendant(db, pack.id, vial.id)
+
+def test_get_location_subtree(db):
+    """Test that a subtree read returns the location and everything below it, shallowest first."""
+    pack = make_location(db, "dal_subtree_pack")
+    pouch = make_location(db, "dal_subtree_pouch", parent_id=pack.id)
+    vial = make_location(db, "dal_subtree_vial", parent_id=pouch.id)
+
+    subtree = location_queries.get_location_subtree(db, pack.id)
+    assert [loc.id for loc in subtree] == [pack.id, pouch.id, vial.id]
+    assert location_queries.get_location_subtree(db, 99999) is None
+
+def test_update_location_reparents_subtree(db):
+    """Test that moving a location moves its whole subtree in the closure table."""
+    pack = make_location(db, "dal_move_pack")
+    chest = make_location(db, "dal_move_chest")
+    pouch = make_location(db, "dal_move_pouch", parent_id=pack.id)
+    vial = make_location(db, "dal_move_vial", parent_id=pouch.id)
+
+    location_queries.update_location(db, pouch.id, LocationUpdate(parent_id=chest.id))
+
+    assert closure_rows(db, vial.id) == {vial.id: 0, pouch.id: 1, chest.id: 2}
+    assert not location_queries.is_descendant(db, vial.id, pack.id)
+
+    location_queries.update_location(db, pouch.id, LocationUpdate(parent_id=None))
+    assert closure_rows(db, vial.id) == {vial.id: 0, pouch.id: 1}
+
+def test_update_location_rejects_cycle(db):
+    """Test that a location cannot be moved under one of its own descendants."""
+    pack = make_location(db, "dal_cycle_pack")
+    pouch = make_location(db, "dal_cycle_pouch", parent_id=pack.id)
+    vial = make_location(db, "dal_cycle_vial", parent_id=pouch.id)
+
+    with pytest.raises(ValueError):
+        location_queries.update_location(db, pack.id, LocationUpdate(parent_id=vial.id))
+    assert location_queries.get_location_by_id(db, pack.id).parent_id is None
+    assert not db.in_transaction # The rejected move released the write lock
+
+def test_update_location_checks_cycle_under_write_lock(db, traced_without_cache):
+    """Test that a concurrent move can't slip in between the cycle check and the re-parenting UPDATE."""
+    shelf = make_location(db, "dal_cycle_lock_shelf")
+    box = make_location(db, "dal_cycle_lock_box")
+    traced_without_cache.clear()
+    location_queries.update_location(db, box.id, LocationUpdate(parent_id=shelf.id))
+    assert traced_without_cache[0] == "BEGIN IMMEDIATE"
+    assert closure_rows(db, box.id) == {box.id: 0, shelf.id: 1}
+
+def test_delete_location_promotes_children(db):
+    """Test that deleting a location turns its children into top-level locations."""
+    pack = make_location(db, "dal_delete_pack")
+    pouch = make_location(db, "dal_delete_pouch", parent_id=pack.id)
+    vial = make_location(db, "dal_delete_vial", parent_id=pouch.id)
+
+    assert location_queries.delete_location(db, pack.id)
+
+    assert location_queries.get_location_by_id(db, pouch.id).parent_id is None
+    assert closure_rows(db, vial.id) == {vial.id: 0, pouch.id: 1}
+    assert closure_rows(db, pack.id) == {}
+
+def test_conditional_delete_checks_version_under_write_lock(db, traced_without_cache):
+    """Test that another process can't change the location between delete_location's If-Match check and the delete."""
+    crate = make_location(db, "dal_lock_crate")
+    traced_without_cache.clear()
+    with pytest.raises(VersionConflict):
+        location_queries.delete_location(db, crate.id, expected_version=crate.version + 1)
+    assert traced_without_cache[0] == "BEGIN IMMEDIATE" and traced_without_cache[1].startswith("SELECT version FROM locations")
+    assert not db.in_transaction # The failed check released the lock
+    assert location_queries.delete_location(db, crate.id, expected_version=crate.version)
+
+def test_rebuild_location_closure_matches_incremental(db):
+    """Test that a full rebuild produces the same closure rows as incremental maintenance."""
+    pack = make_location(db, "dal_rebuild_pack")
+    pouch = make_location(db, "dal_rebuild_pouch", parent_id=pack.id)
+    make_location(db, "dal_rebuild_vial", parent_id=pouch.id)
+
+    query = "SELECT ancestor_id, descendant_id, depth FROM location_closure ORDER BY ancestor_id, descendant_id"
+    before = [tuple(row) for row in db.execute(query).fetchall()]
+    location_queries.rebuild_location_closure(db)
+    after = [tuple(row) for row in db.execute(query).fetchall()]
+    assert before == after
+
+# Note: Like the user DAL tests, these share the session-scoped database, so location names are unique per test.
+
+def test_get_loadout_nests_items_and_totals(db):
+    slot = location_queries.create_location(db, LocationCreate(name="loadout_back", type="Body Slot"))
+    pack = make_location(db, "loadout_pack", slot.id)
+    pouch = make_location(db, "loadout_pouch", pack.id)
+    gear_queries.create_gear(db, GearCreate(name="loadout cloak", weight=2.0, value=5.0, location_id=slot.id))
+    gear_queries.create_gear(db, GearCreate(name="loadout coin", weight=0.5, cost=1.0, location_id=pouch.id))
+
+    loadout = location_queries.get_loadout(db, slot.id)
+    assert loadout["containers"] == []
+    [back] = loadout["body_slots"]
+    assert [item["name"] for item in back["items"]] == ["loadout cloak"]
+    assert back["totals"] == {"item_count": 2, "total_weight": 2.5, "total_cost": 1.0, "total_value": 5.0}
+    [pack_node] = back["children"]
+    [pouch_node] = pack_node["children"]
+    assert pack_node["items"] == [] and pack_node["totals"]["item_count"] == 1
+    assert pouch_node["items"] == [{"id": pouch_node["items"][0]["id"], "name": "loadout coin", "weight": 0.5, "value": None}]
+
+    everything = location_queries.get_loadout(db)
+    assert back in everything["body_slots"]
+    assert everything["version"] == loadout["version"]
+    assert location_queries.get_loadout(db, 10**9) is None
@@ -0,0 +1,128 @@
+import sqlite3
+import pytest
+from app import GearCreate, GearUpdate, LocationCreate, LocationUpdate, get_db_path # Import Pydantic models
+from src.data_access import gear_queries, location_queries # Import query functions
+from src import instrumentation
+from src.data_access.read_cache import ReadCache, MISSING, read_cache
+
+@pytest.fixture
+def cache(db):
+    """The data-access layer's cache, enabled and empty whatever the configuration says."""
+    max_entries, ttl_seconds = read_cache.max_entries, read_cache.ttl_seconds
+    read_cache.configure(128, 60)
+    yield read_cache
+    read_cache.configure(max_entries, ttl_seconds)
+
+def make_gear(db, name, location_id=None):
+    return gear_queries.create_gear(db, GearCreate(name=name, weight=1.0, location_id=location_id))
+
+def test_lookup_is_cached_until_written(db, cache):
+    """Test that repeated lookups are hits and a write drops only the entries it affects."""
+    lamp = make_gear(db, "cache_lamp")
+    rope = make_gear(db, "cache_rope")
+    hits = cache.hits
+    assert gear_queries.get_gear_by_id(db, lamp.id) is gear_queries.get_gear_by_id(db, lamp.id)
+    assert cache.hits == hits + 1 # create_gear() reads the item back from its INSERT ... RETURNING, uncached
+    cached_rope = gear_queries.get_gear_by_id(db, rope.id)
+
+    gear_queries.update_gear(db, lamp.id, GearUpdate(weight=3.0))
+
+    assert gear_queries.get_gear_by_id(db, lamp.id).weight == 3.0
+    assert gear_queries.get_gear_by_id(db, rope.id) is cached_rope # Unrelated item is still cached
+
+def test_location_write_invalidates_embedding_gear(db, cache):
+    """Test that gear entries embedding a location are dropped when the location changes or goes away."""
+    sack = location_queries.create_location(db, LocationCreate(name="cache_sack", type="Container"))
+    flint = make_gear(db, "cache_flint", location_id=sack.id)
+    assert gear_queries.get_gear_by_id(db, flint.id).location.name == "cache_sack"
+
+    location_queries.update_location(db, sack.id, LocationUpdate(name="cache_bag"))
+    assert gear_queries.get_gear_by_id(db, flint.id).location.name == "cache_bag"
+
+    location_queries.delete_location(db, sack.id)
+    assert gear_queries.get_gear_by_id(db, flint.id).location is None
+
+def test_list_results_follow_writes(db, cache):
+    assert gear_queries.get_all_gear(db, "cache_list", None) == []
+    make_gear(db, "cache_list quiver")
+    assert [item.name for item in gear_queries.get_all_gear(db, "cache_list", None)] == ["cache_list quiver"]
+
+def test_other_process_write_invalidates(app, db, cache):
+    """Test that a write through a different connection (another worker, or a manual edit) is picked up."""
+    item = make_gear(db, "cache_remote")
+    gear_queries.get_gear_by_id(db, item.id)
+
+    other = sqlite3.connect(get_db_path())
+    try:
+        other.execute("UPDATE gear SET weight = 9.0 WHERE id = ?", (item.id,))
+        other.commit()
+    finally:
+        other.close()
+
+    assert gear_queries.get_gear_by_id(db, item.id).weight == 9.0
+
+def test_other_worker_write_between_syncs_drops_table(db, cache):
+    """Test that a local write doesn't adopt counters that also include another worker's commit."""
+    first = make_gear(db, "cache_worker_a")
+    second = make_gear(db, "cache_worker_b")
+    gear_queries.get_gear_by_id(db, second.id)
+
+    # Another worker (its own connection) writes, then this worker writes before syncing again.
+    other = sqlite3.connect(get_db_path())
+    try:
+        other.execute("UPDATE gear SET weight = 7.0 WHERE id = ?", (second.id,))
+        other.commit()
+    finally:
+        other.close()
+    gear_queries.update_gear(db, first.id, GearUpdate(weight=2.0)) # One statement: note_row_write()
+    assert gear_queries.get_gear_by_id(db, second.id).weight == 7.0
+
+    # Likewise for a write of several statements (begin_write() / note_write()).
+    gear_queries.get_gear_by_id(db, first.id)
+    other = sqlite3.connect(get_db_path())
+    try:
+        other.execute("UPDATE gear SET weight = 8.0 WHERE id = ?", (first.id,))
+        other.commit()
+    finally:
+        other.close()
+    gear_queries.move_gear(db, [second.id], None)
+    assert gear_queries.get_gear_by_id(db, first.id).weight == 8.0
+
+def test_single_row_writes_are_one_statement(db, cache):
+    """Test that create, update and delete run one SQL statement each, cache bookkeeping included."""
+    def count_statements(write):
+        stats = instrumentation.start_request()
+        try:
+            result = write()
+        finally:
+            instrumentation.finish_request(stats)
+        assert stats.sql_statements == 1
+        return result
+
+    lamp = count_statements(lambda: make_gear(db, "cache_single lamp"))
+    count_statements(lambda: gear_queries.update_gear(db, lamp.id, GearUpdate(weight=2.0), expected_version=1))
+    assert count_statements(lambda: gear_queries.delete_gear(db, lamp.id, expected_version=2))
+    sack = count_statements(lambda: location_queries.create_location(db, LocationCreate(name="cache_single sack", type="Container")))
+    count_statements(lambda: location_queries.update_location(db, sack.id, LocationUpdate(name="cache_single bag")))
+    assert location_queries.is_descendant(db, sack.id, sack.id) # Closure row added by the schema trigger
+
+def test_lru_eviction_ttl_and_generation(db):
+    """Test the cache mechanics on a private instance."""
+    small = ReadCache(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        _, generation = small.lookup(db, key)
+        small.store(key, key.upper(), ["gear"], generation)
+    assert small.lookup(db, "a")[0] is MISSING # Least recently used entry was evicted
+    assert small.lookup(db, "c")[0] == "C"
+    assert small.stats()["evictions"] == 1
+
+    _, generation = small.lookup(db, "d")
+    small.invalidate([("gear", 1)]) # Any invalidation in between...
+    small.store("d", "D", ["gear"], generation)
+    assert small.lookup(db, "d")[0] is MISSING # ...means the value may be stale, so it isn't stored
+
+    expiring = ReadCache(max_entries=2, ttl_seconds=0)
+    _, generation = expiring.lookup(db, "x")
+    expiring.store("x", "X", ["gear"], generation)
+    assert expiring.lookup(db, "x")[0] is MISSING
+    assert expiring.stats()["expirations"] == 1
@@ -2,7 +2,7 @@ import pytest
 import sqlite3
 from app import UserCreate, UserInDB # Import Pydantic models
 from src.data_access import user_queries # Import user query functions
-from werkzeug.security import check_password_hash
+from werkzeug.security import check_password_hash, generate_password_hash
 
 def test_create_user_success(db):
     """Test successful user creation."""
@@ -61,6 +61,31 @@ def test_get_user_by_id_non_existent(db):
     fetched_user = user_queries.get_user_by_id(db, 99999) # Assuming 99999 is not a valid ID
     assert fetched_user is None
 
+def test_update_password_hash(db):
+    """Test replacing a stored hash (used to upgrade hashes on login)."""
+    created_user = user_queries.create_user(db, UserCreate(username="test_rehash_dal", password="password123"))
+    new_hash = generate_password_hash("password123", method="pbkdf2:sha256:1000")
+
+    assert user_queries.update_password_hash(db, created_user.id, new_hash)
+    assert user_queries.get_user_row_by_username(db, "test_rehash_dal")["password_hash"] == new_hash
+    assert not user_queries.update_password_hash(db, 99999, new_hash)
+
+def test_user_cache_ttl_and_eviction():
+    """Test the per-worker user cache used by the JWT user lookup."""
+    cache = user_queries.UserCache(max_entries=2, ttl_seconds=60)
+    users = [UserInDB(id=i, username=f"cached_user_{i}") for i in range(3)]
+    for user in users:
+        cache.put(user)
+    assert cache.get(0) is None # Evicted as the least recently used entry
+    assert cache.get(2) is users[2]
+    cache.invalidate(2)
+    assert cache.get(2) is None
+    assert cache.stats()["evictions"] == 1
+
+    expired = user_queries.UserCache(max_entries=2, ttl_seconds=0)
+    expired.put(users[0])
+    assert expired.get(0) is None
+
 # Note: The conftest.py app fixture is session-scoped and reinitializes the DB once per session.
 # These DAL tests, if they modify data (like create_user), will have those modifications
 # visible to subsequent tests within the same session.
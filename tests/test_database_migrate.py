@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+from src.database import migrate
+
+LATEST = migrate.list_migrations()[-1].version
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "migrate_test.db"))
+    yield conn
+    conn.close()
+
+def write_scripts(directory, scripts):
+    directory.mkdir()
+    for filename, sql in scripts.items():
+        (directory / filename).write_text(sql)
+    return str(directory)
+
+def test_migrate_upgrades_pre_migration_database(conn):
+    """Test that a database from before migrations existed gets the full schema and keeps its rows."""
+    conn.executescript("""
+        CREATE TABLE locations (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, type TEXT NOT NULL, parent_id INTEGER);
+        CREATE TABLE gear (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, description TEXT, weight REAL NOT NULL DEFAULT 0.0,
+                           cost REAL, value REAL, legality TEXT, category TEXT, location_id INTEGER);
+        INSERT INTO locations (name, type) VALUES ('Old Backpack', 'Container');
+        INSERT INTO gear (name, weight, location_id) VALUES ('Old Rope', 1.5, 1);
+    """)
+
+    assert migrate.migrate(conn) == (0, LATEST)
+    assert conn.execute("SELECT name, weight, version FROM gear").fetchall() == [("Old Rope", 1.5, 1)]
+    assert conn.execute("SELECT COUNT(*) FROM row_changes").fetchone()[0] == 2
+    assert migrate.migrate(conn) == (LATEST, LATEST) # Nothing left to apply
+
+def test_failed_migration_leaves_previous_version(conn, tmp_path):
+    migrations = migrate.list_migrations(write_scripts(tmp_path / "migrations", {
+        "0002_add_notes.sql": "ALTER TABLE gear ADD COLUMN notes TEXT;",
+        "0003_broken.sql": "ALTER TABLE gear ADD COLUMN weight_kg REAL;\nALTER TABLE no_such_table ADD COLUMN x TEXT;",
+    }))
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate.migrate(conn, migrations)
+    assert migrate.get_schema_version(conn) == 2
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(gear)")}
+    assert "notes" in columns and "weight_kg" not in columns # The broken script was rolled back as a whole
+
+def test_migration_numbering_and_newer_databases_are_rejected(conn, tmp_path):
+    with pytest.raises(ValueError):
+        migrate.list_migrations(write_scripts(tmp_path / "gap", {"0003_skips_two.sql": "SELECT 1;"}))
+    conn.execute(f"PRAGMA user_version = {LATEST + 1}")
+    with pytest.raises(RuntimeError):
+        migrate.migrate(conn)
+
+def test_migrate_command(app):
+    result = app.test_cli_runner().invoke(args=["migrate"])
+    assert result.exit_code == 0, result.output
+    assert f"already at schema version {LATEST}" in result.output
@@ -0,0 +1,54 @@
+import pytest
+from src.database.pool import ConnectionPool
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool_test.db"), max_size=1, cache_size_kib=2048, mmap_size=1048576)
+    yield pool
+    pool.close_all()
+
+def test_pool_reuses_connections(pool):
+    """Test that a released connection is handed out again and counted as a hit."""
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+
+    assert second is first
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["misses"] == 1
+
+def test_pool_applies_pragmas(pool):
+    """Test that pooled connections are configured once with the tuned PRAGMAs."""
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1 # NORMAL
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2048
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    pool.release(conn)
+
+def test_pool_is_bounded(pool):
+    """Test that connections beyond max_size are closed on release rather than kept."""
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+
+    stats = pool.stats()
+    assert stats["idle"] == 1
+    assert stats["discards"] == 1
+    assert stats["checked_out"] == 0
+
+def test_pool_rolls_back_open_transaction(pool):
+    """Test that uncommitted work from a previous request doesn't leak into the next one."""
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.release(conn)
+
+def test_pool_rejects_unknown_journal_mode(tmp_path):
+    with pytest.raises(ValueError):
+        ConnectionPool(str(tmp_path / "bad.db"), journal_mode="sideways")
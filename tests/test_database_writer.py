@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+
+import pytest
+from src.database.pool import ConnectionPool
+from src.database.writer import WriteQueue
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "writer_test.db"), max_size=1)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE things (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.commit()
+    pool.release(conn)
+    yield pool
+    pool.close_all()
+
+@pytest.fixture
+def writer(pool):
+    writer = WriteQueue(pool.connect, max_batch=16)
+    yield writer
+    writer.close()
+
+def insert_thing(db, name):
+    """A write function in the data-access style: it commits itself and reads its row back."""
+    cursor = db.execute("INSERT INTO things (name) VALUES (?)", (name,))
+    db.commit()
+    return db.execute("SELECT id, name FROM things WHERE id = ?", (cursor.lastrowid,)).fetchone()["name"]
+
+def committed_names(pool):
+    conn = pool.acquire()
+    try:
+        return sorted(row["name"] for row in conn.execute("SELECT name FROM things"))
+    finally:
+        pool.release(conn)
+
+def test_writer_groups_queued_writes_into_one_commit(pool, writer):
+    """Test that writes queued while a batch is running are committed together, each caller getting its result."""
+    running = threading.Event()
+    release = threading.Event()
+
+    def blocking_write(db):
+        running.set()
+        release.wait(5)
+        return insert_thing(db, "first")
+
+    results = {}
+    first = threading.Thread(target=lambda: results.setdefault("first", writer.submit(blocking_write)))
+    first.start()
+    assert running.wait(5)
+    threads = [threading.Thread(target=lambda i=i: results.setdefault(i, writer.submit(insert_thing, f"thing {i}")))
+               for i in range(10)]
+    for thread in threads:
+        thread.start()
+    while writer.stats()["queued"] < 10: # Wait until every write is queued behind the running batch
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [first] + threads:
+        thread.join(5)
+
+    assert results == {"first": "first", **{i: f"thing {i}" for i in range(10)}}
+    assert len(committed_names(pool)) == 11
+    stats = writer.stats()
+    assert stats["batches"] == 2
+    assert stats["largest_batch"] == 10
+    assert stats["writes"] == 11
+
+def test_writer_rolls_back_only_the_failing_write(pool, writer):
+    """Test that a write that raises is undone and reported to its caller alone, while its batch still commits."""
+    writer.submit(insert_thing, "taken")
+
+    def insert_then_fail(db):
+        db.execute("INSERT INTO things (name) VALUES ('half done')")
+        return insert_thing(db, "taken") # Violates the UNIQUE constraint
+
+    with pytest.raises(sqlite3.IntegrityError):
+        writer.submit(insert_then_fail)
+    assert writer.submit(insert_thing, "after") == "after"
+    assert committed_names(pool) == ["after", "taken"]
+    assert writer.stats()["failed_writes"] == 1
+
+def test_writer_rejects_writes_after_close(writer):
+    writer.submit(insert_thing, "before close")
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(insert_thing, "too late")
+
+def test_writer_survives_its_thread_failing(pool):
+    """Test that a writer thread that can't connect fails its writes instead of hanging them, and is restarted."""
+    attempts = []
+
+    def flaky_connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return pool.connect()
+
+    writer = WriteQueue(flaky_connect, timeout=5)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            writer.submit(insert_thing, "lost")
+        assert writer.submit(insert_thing, "retried") == "retried"
+        assert committed_names(pool) == ["retried"]
+        assert writer.stats()["thread_failures"] == 1
+    finally:
+        writer.close()
+
+def test_writer_drops_writes_that_wait_too_long(pool):
+    writer = WriteQueue(pool.connect, timeout=0.1)
+    running = threading.Event()
+    release = threading.Event()
+
+    def blocking_write(db):
+        running.set()
+        release.wait(5)
+
+    first = threading.Thread(target=writer.submit, args=(blocking_write,))
+    first.start()
+    assert running.wait(5)
+    try:
+        with pytest.raises(TimeoutError):
+            writer.submit(insert_thing, "too slow")
+    finally:
+        release.set()
+        first.join(5)
+    assert writer.submit(insert_thing, "on time") == "on time"
+    assert committed_names(pool) == ["on time"] # The write that timed out was never run
+    assert writer.stats()["timeouts"] == 1
+    writer.close()
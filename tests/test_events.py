@@ -0,0 +1,211 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+from app import authenticate_event_stream, get_change_feed, get_db_path
+from src import events
+from tests.test_api_gear import get_auth_token
+
+
+@pytest.fixture(scope="module")
+def token(app):
+    return get_auth_token(app.test_client(), username="test_events_user")
+
+
+@pytest.fixture
+def short_streams(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTS_WSGI_STREAMS', True)
+    monkeypatch.setitem(app.config, 'EVENTS_POLL_INTERVAL', 0.01)
+    monkeypatch.setitem(app.config, 'EVENTS_KEEPALIVE_SECONDS', 0.05)
+    monkeypatch.setitem(app.config, 'EVENTS_STREAM_MAX_SECONDS', 0.3)
+    events._feeds.clear() # Feeds keep the poll interval they were created with
+    yield app.config
+    events._feeds.clear()
+
+
+def parse_events(body: str):
+    """(event type, id, data) for every event in an SSE body, skipping comments and the retry field."""
+    parsed = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            parsed.append((fields["event"], int(fields["id"]), json.loads(fields["data"])))
+    return parsed
+
+
+def current_seq(app):
+    with app.app_context():
+        conn = sqlite3.connect(get_db_path())
+        try:
+            return events.latest_seq(conn)
+        finally:
+            conn.close()
+
+
+def test_change_feed_fans_out_new_changes(app):
+    with app.app_context():
+        db_path = get_db_path()
+    feed = events.ChangeFeed(db_path, poll_interval=0.01)
+    received = [threading.Event(), threading.Event()]
+    subscribers = [events.Subscriber(flag.set) for flag in received]
+    start = current_seq(app)
+    tokens = [feed.subscribe(subscriber, start) for subscriber in subscribers]
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO gear (name, weight) VALUES ('Feed Lantern', 1.0)")
+    conn.commit()
+    gear_id = conn.execute("SELECT id FROM gear WHERE name = 'Feed Lantern'").fetchone()[0]
+    conn.close()
+
+    for flag, subscriber in zip(received, subscribers):
+        assert flag.wait(5)
+        assert parse_events(subscriber.take().decode()) == [("change", start + 1, {"table": "gear", "id": gear_id, "deleted": False})]
+    for token_id in tokens:
+        feed.unsubscribe(token_id)
+    deadline = time.monotonic() + 5
+    while feed.stats()['running'] and time.monotonic() < deadline: # The thread stops without subscribers
+        time.sleep(0.01)
+    assert feed.stats()['subscribers'] == 0 and not feed.stats()['running']
+
+
+def test_change_feed_delivers_to_subscribers_added_during_a_read(app, monkeypatch):
+    """A stream that subscribes while the feed is reading changes gets them too, as its replay may have missed them."""
+    with app.app_context():
+        db_path = get_db_path()
+    feed = events.ChangeFeed(db_path, poll_interval=0.01)
+    start = current_seq(app)
+    early = events.Subscriber(lambda: None)
+    late_received = threading.Event()
+    late = events.Subscriber(late_received.set)
+    read_changes = events.read_changes
+
+    def read_changes_then_subscribe(conn, after_seq, limit):
+        changes = read_changes(conn, after_seq, limit)
+        if changes and not late_received.is_set():
+            tokens.append(feed.subscribe(late, start))
+        return changes
+
+    monkeypatch.setattr(events, "read_changes", read_changes_then_subscribe)
+    tokens = [feed.subscribe(early, start)]
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO gear (name, weight) VALUES ('Feed Late Lamp', 1.0)")
+    conn.commit()
+    conn.close()
+
+    assert late_received.wait(5)
+    assert [event[1] for event in parse_events(late.take().decode())] == [start + 1]
+    for token_id in tokens:
+        feed.unsubscribe(token_id)
+
+
+def events_client(app, token):
+    """A test client holding the cookie POST /api/events/session sets, as a browser would before opening the stream."""
+    client = app.test_client()
+    response = client.post('/api/events/session', headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 204
+    return client
+
+
+def test_events_requires_token(app, token):
+    client = app.test_client()
+    assert client.get('/api/events').status_code == 401
+    assert client.get(f'/api/events?jwt={token}').status_code == 401 # Tokens in URLs end up in access logs
+    assert client.post('/api/events/session').status_code == 401
+
+    cookie_header = client.post('/api/events/session', headers={"Authorization": f"Bearer {token}"}).headers['Set-Cookie']
+    assert f"kitbox_events={token}" in cookie_header
+    assert "Path=/api/events" in cookie_header and "HttpOnly" in cookie_header and "SameSite=Strict" in cookie_header
+
+
+def test_events_not_streamed_by_wsgi_app_by_default(app, token):
+    """Test that the WSGI route answers 204 (EventSource stops reconnecting) rather than holding a worker."""
+    response = events_client(app, token).get('/api/events')
+    assert response.status_code == 204
+    assert response.get_data() == b""
+
+
+def test_events_replays_after_last_event_id(client, app, token, short_streams):
+    seq = current_seq(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    created = client.post('/api/gear', json={"name": "Evented Rope", "weight": 2.0}, headers=headers).get_json()
+    doomed = client.post('/api/gear', json={"name": "Evented Crumbs", "weight": 0.1}, headers=headers).get_json()
+    client.delete(f'/api/gear/{doomed["id"]}', headers=headers)
+
+    response = events_client(app, token).get('/api/events', headers={"Last-Event-ID": str(seq)})
+    assert response.status_code == 200
+    assert response.mimetype == events.EVENT_STREAM_MIMETYPE
+    body = response.get_data(as_text=True)
+    assert body.startswith("retry: ")
+    assert [(kind, data) for kind, _, data in parse_events(body)] == [
+        ("change", {"table": "gear", "id": created["id"], "deleted": False}),
+        ("change", {"table": "gear", "id": doomed["id"], "deleted": True}), # Replays only the latest change per row
+    ]
+
+
+def test_events_resync_when_too_much_was_missed(client, app, token, short_streams, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTS_REPLAY_LIMIT', 1)
+    seq = current_seq(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    for name in ("Resync Cup", "Resync Plate"):
+        client.post('/api/gear', json={"name": name, "weight": 0.5}, headers=headers)
+
+    body = client.get('/api/events', headers={**headers, "Last-Event-ID": str(seq)}).get_data(as_text=True)
+    assert parse_events(body) == [("resync", current_seq(app), {})]
+
+
+def run_endpoint(endpoint, token, write=None):
+    """Opens an event stream on the ASGI endpoint with the session cookie, calls write() once it has started, and returns the body."""
+    messages = []
+
+    async def main():
+        started = asyncio.Event()
+
+        async def receive():
+            await asyncio.Event().wait() # The client never disconnects; the stream ends on its own
+
+        async def send(message):
+            messages.append(message)
+            started.set()
+
+        stream = asyncio.ensure_future(endpoint({"type": "http", "method": "GET", "path": "/api/events",
+                                                 "query_string": b"",
+                                                 "headers": [(b"cookie", f"kitbox_events={token}".encode())]},
+                                                receive, send))
+        await started.wait()
+        if write is not None:
+            await asyncio.get_running_loop().run_in_executor(None, write)
+        await asyncio.wait_for(stream, timeout=10)
+
+    asyncio.run(main())
+    return messages
+
+
+def test_event_stream_endpoint_pushes_live_changes(app, token, short_streams):
+    with app.app_context():
+        db_path = get_db_path()
+
+    def open_db():
+        return sqlite3.connect(db_path, check_same_thread=False)
+
+    def feed_for():
+        with app.app_context():
+            return get_change_feed()
+
+    endpoint = events.EventStreamEndpoint(authenticate_event_stream, open_db, feed_for, app.config)
+    assert run_endpoint(endpoint, "invalid")[0]["status"] == 401
+
+    def write():
+        conn = open_db()
+        conn.execute("INSERT INTO locations (name, type) VALUES ('Evented Satchel', 'Container')")
+        conn.commit()
+        conn.close()
+
+    messages = run_endpoint(endpoint, token, write)
+    assert messages[0]["status"] == 200
+    assert messages[-1]["more_body"] is False
+    body = b"".join(message.get("body", b"") for message in messages[1:]).decode()
+    changes = parse_events(body)
+    assert [(kind, data["table"], data["deleted"]) for kind, _, data in changes] == [("change", "locations", False)]
@@ -0,0 +1,93 @@
+import logging
+import re
+import sqlite3
+import pytest
+from src import instrumentation
+from src.instrumentation import InstrumentedConnection, JSONLogFormatter, RouteMetrics
+
+from .test_api_gear import get_auth_token
+
+@pytest.fixture(scope="module")
+def auth_headers(app):
+    token = get_auth_token(app.test_client(), username="test_instrumentation_user")
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def metrics_enabled(app):
+    app.config["METRICS_ENABLED"] = True
+    instrumentation.route_metrics.clear()
+    yield instrumentation.route_metrics
+    app.config["METRICS_ENABLED"] = False
+
+def server_timing(response):
+    """Parses the Server-Timing header into {name: (duration_ms, description)}."""
+    return {
+        name: (float(duration), description)
+        for name, duration, description in re.findall(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response.headers["Server-Timing"])
+    }
+
+def test_connection_records_into_current_request():
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(5)])
+    assert instrumentation.current_stats() is None # Outside a request nothing is recorded
+
+    stats = instrumentation.start_request()
+    try:
+        assert conn.execute("SELECT x FROM t").fetchall() == [(i,) for i in range(5)]
+        assert list(conn.execute("SELECT x FROM t WHERE x < 2")) == [(0,), (1,)]
+        conn.commit()
+    finally:
+        instrumentation.finish_request(stats)
+    assert (stats.sql_statements, stats.rows) == (2, 7)
+    assert stats.sql_seconds > 0
+    assert instrumentation.current_stats() is None
+
+def test_server_timing_header(client, auth_headers):
+    client.post('/api/gear', json={"name": "Timed Lantern", "weight": 1.0}, headers=auth_headers)
+    response = client.get('/api/gear?name=Timed Lantern&limit=10', headers=auth_headers)
+    assert response.status_code == 200
+    timing = server_timing(response)
+    assert set(timing) == {"db", "model", "json", "total"}
+    statements, rows = map(int, re.match(r"(\d+) statements, (\d+) rows", timing["db"][1]).groups())
+    assert statements >= 1 and rows >= 1
+    assert timing["total"][0] >= timing["db"][0]
+
+def test_request_log_fields(client, auth_headers, caplog):
+    """Test that the log record of a streamed response includes the rows fetched while streaming."""
+    client.post('/api/gear', json={"name": "Logged Lantern", "weight": 1.0}, headers=auth_headers)
+    with caplog.at_level(logging.INFO, logger="kitbox.requests"):
+        response = client.get('/api/gear?name=Logged Lantern&format=ndjson', headers=auth_headers)
+        response.get_data()
+    records = [record for record in caplog.records if record.name == "kitbox.requests"]
+    assert records, "no request log record"
+    record = records[-1]
+    assert (record.method, record.route, record.status) == ("GET", "/api/gear", 200)
+    assert record.sql_statements >= 1 and record.rows >= 1
+    assert '"route": "/api/gear"' in JSONLogFormatter().format(record)
+
+def test_metrics_endpoint(client, auth_headers, metrics_enabled):
+    client.get('/api/locations', headers=auth_headers)
+    client.get('/api/locations', headers=auth_headers)
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'kitbox_requests_total{method="GET",route="/api/locations",status="200"} 2' in body
+    assert 'kitbox_request_duration_seconds_count{method="GET",route="/api/locations"} 2' in body
+    assert 'kitbox_request_sql_statements_bucket{method="GET",route="/api/locations",le="+Inf"} 2' in body
+
+def test_metrics_disabled_by_default(client):
+    assert client.get('/api/metrics').status_code == 404
+
+def test_histogram_buckets_are_cumulative():
+    metrics = RouteMetrics()
+    for duration in (0.0005, 0.003, 20.0):
+        stats = instrumentation.RequestStats()
+        stats.started -= duration
+        metrics.observe("GET", "/x", 200, stats)
+    body = metrics.render()
+    assert 'kitbox_request_duration_seconds_bucket{method="GET",route="/x",le="0.001"} 1' in body
+    assert 'kitbox_request_duration_seconds_bucket{method="GET",route="/x",le="0.005"} 2' in body
+    assert 'kitbox_request_duration_seconds_bucket{method="GET",route="/x",le="10.0"} 2' in body
+    assert 'kitbox_request_duration_seconds_bucket{method="GET",route="/x",le="+Inf"} 3' in body
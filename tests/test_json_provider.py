@@ -0,0 +1,52 @@
+import json
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from app import GearInDB, LocationInDB # Import Pydantic models
+from src.json_provider import OrjsonJSONProvider, StdlibJSONProvider, make_json_provider, orjson
+
+def sample_gear():
+    location = LocationInDB(id=1, name="Rucksack", type="Container", parent_id=None)
+    return [
+        GearInDB(id=1, name="Seil", description="Hanf, 15 m", weight=2.5, location_id=1, location=location),
+        GearInDB(id=2, name="Flint", weight=0.1),
+    ]
+
+PROVIDERS = [StdlibJSONProvider]
+if orjson is not None:
+    PROVIDERS.append(OrjsonJSONProvider)
+
+@pytest.mark.parametrize("provider_class", PROVIDERS)
+def test_provider_serializes_models_without_model_dump(app, provider_class):
+    """Test that models and lists of models encode to the same JSON as their model_dump()."""
+    provider = provider_class(app)
+    gear = sample_gear()
+    assert json.loads(provider.dumps(gear[0])) == gear[0].model_dump()
+    assert json.loads(provider.dumps(gear)) == [item.model_dump() for item in gear]
+    # Models nested inside other values fall back to the default hook.
+    assert json.loads(provider.dumps({"items": gear, "next_after": None})) == {
+        "items": [item.model_dump() for item in gear], "next_after": None
+    }
+    assert json.loads(provider.dumps_bytes([])) == []
+
+@pytest.mark.parametrize("provider_class", PROVIDERS)
+def test_provider_response(app, provider_class):
+    provider = provider_class(app)
+    with app.app_context():
+        response = provider.response({"name": "Grappling Hook", "weight": 4.0})
+    assert response.mimetype == "application/json"
+    assert response.get_data().endswith(b"\n")
+    assert provider.loads(response.get_data()) == {"name": "Grappling Hook", "weight": 4.0}
+
+def test_stdlib_provider_matches_flask_default(app):
+    """Test that the fallback encodes plain data byte-for-byte like Flask's default provider."""
+    data = {"b": [1, 2.5, None], "a": "Lanze ä"}
+    with app.app_context():
+        expected = DefaultJSONProvider(app).response(data).get_data()
+        assert StdlibJSONProvider(app).response(data).get_data() == expected
+
+def test_make_json_provider(app):
+    assert isinstance(make_json_provider(app, "stdlib"), StdlibJSONProvider)
+    expected = OrjsonJSONProvider if orjson is not None else StdlibJSONProvider
+    assert isinstance(make_json_provider(app, "auto"), expected)
+    with pytest.raises(ValueError):
+        make_json_provider(app, "simplejson")
@@ -0,0 +1,140 @@
+import inspect
+import re
+import pytest
+from app import GearCreate, GearUpdate, LocationCreate, LocationUpdate, UserCreate # Import Pydantic models
+from src.data_access import gear_queries, location_queries, user_queries, change_tracking, sync_queries
+from src.data_access.read_cache import read_cache
+
+# Runs every data-access function against the test database, captures the SQL it executes with a trace
+# callback, and checks EXPLAIN QUERY PLAN for each statement. A plan step that scans a whole table
+# ("SCAN <table>" without an index) fails the test unless that case explicitly allows it.
+
+DATA_ACCESS_MODULES = (gear_queries, location_queries, user_queries, change_tracking, sync_queries)
+
+# Public functions that never touch the database.
+NOT_QUERIES = {"gear_queries.build_search_query", "gear_queries.gear_row_to_dict", "gear_queries.gear_row_to_flat_dict",
+               "gear_queries.project_gear_fields"}
+
+_DML_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$") # Index scans ("USING ... INDEX"), virtual tables and constant rows don't match
+
+
+def capture_statements(db, func):
+    """Runs func() and returns the distinct DML statements it executed, with parameters expanded."""
+    statements = []
+    def trace(sql):
+        if sql.lstrip().upper().startswith(_DML_PREFIXES) and sql not in statements:
+            statements.append(sql)
+    db.set_trace_callback(trace)
+    try:
+        result = func()
+        if inspect.isgenerator(result):
+            list(result)
+    finally:
+        db.set_trace_callback(None)
+    return statements
+
+
+def full_table_scans(db, statements):
+    """Returns (statement, plan detail) for every full table scan in the statements' query plans."""
+    scans = []
+    for sql in statements:
+        for row in db.execute("EXPLAIN QUERY PLAN " + sql).fetchall():
+            match = _FULL_SCAN.match(row["detail"])
+            if match:
+                scans.append((match.group(1), " ".join(sql.split()), row["detail"]))
+    return scans
+
+
+@pytest.fixture
+def no_read_cache():
+    """Disables the read cache so every case runs its real queries (the cache's own SQL is still traced)."""
+    max_entries, ttl_seconds = read_cache.max_entries, read_cache.ttl_seconds
+    read_cache.configure(0, ttl_seconds)
+    yield
+    read_cache.configure(max_entries, ttl_seconds)
+
+
+@pytest.fixture
+def plan_data(db):
+    """A small nested location tree with some gear, created fresh for each case."""
+    suffix = str(db.execute("SELECT COUNT(*) FROM locations").fetchone()[0])
+    pack = location_queries.create_location(db, LocationCreate(name=f"plan_pack_{suffix}", type="Container"))
+    pouch = location_queries.create_location(db, LocationCreate(name=f"plan_pouch_{suffix}", type="Container", parent_id=pack.id))
+    spare = location_queries.create_location(db, LocationCreate(name=f"plan_spare_{suffix}", type="Generic"))
+    gear = [
+        gear_queries.create_gear(db, GearCreate(name=f"plan gear {i} {suffix}", weight=1.0, category="Plan", location_id=pouch.id))
+        for i in range(3)
+    ]
+    user = user_queries.create_user(db, UserCreate(username=f"plan_user_{suffix}", password="password123"))
+    return {"pack": pack.id, "pouch": pouch.id, "spare": spare.id, "gear": [item.id for item in gear], "user": user}
+
+
+# (qualified function name, call(db, data), aliases/tables allowed to be scanned in full)
+PLAN_CASES = [
+    ("gear_queries.create_gear", lambda db, d: gear_queries.create_gear(db, GearCreate(name="plan new", weight=1.0, location_id=d["pouch"])), set()),
+    ("gear_queries.get_gear_by_id", lambda db, d: gear_queries.get_gear_by_id(db, d["gear"][0]), set()),
+    ("gear_queries.get_gear_by_ids", lambda db, d: gear_queries.get_gear_by_ids(db, d["gear"]), set()),
+    ("gear_queries.iter_gear", lambda db, d: gear_queries.iter_gear(db, None, "Plan", after_id=d["gear"][0], limit=10), set()),
+    ("gear_queries.get_gear_page", lambda db, d: gear_queries.get_gear_page(db, None, "Plan", None, 2), set()),
+    ("gear_queries.get_all_gear", lambda db, d: gear_queries.get_all_gear(db, None, None), {"g"}), # Unfiltered listing reads every row
+    ("gear_queries.search_gear", lambda db, d: gear_queries.search_gear(db, "plan", None, "Plan"), set()),
+    ("gear_queries.update_gear", lambda db, d: gear_queries.update_gear(db, d["gear"][0], GearUpdate(weight=2.0)), set()),
+    ("gear_queries.update_gear_batch", lambda db, d: gear_queries.update_gear_batch(db, [(i, GearUpdate(weight=3.0)) for i in d["gear"]]), set()),
+    ("gear_queries.move_gear", lambda db, d: gear_queries.move_gear(db, d["gear"], d["spare"]), set()),
+    ("gear_queries.bulk_write_gear", lambda db, d: gear_queries.bulk_write_gear(db, [[(None, GearCreate(name="plan bulk", weight=1.0)), (d["gear"][1], GearCreate(name="plan upsert", weight=1.0))]]), set()),
+    ("gear_queries.delete_gear", lambda db, d: gear_queries.delete_gear(db, d["gear"][2]), set()),
+    ("gear_queries.rebuild_search_index", lambda db, d: gear_queries.rebuild_search_index(db), set()),
+    ("location_queries.create_location", lambda db, d: location_queries.create_location(db, LocationCreate(name=f"plan_new_{d['pack']}", type="Container", parent_id=d["pouch"])), set()),
+    ("location_queries.get_location_by_id", lambda db, d: location_queries.get_location_by_id(db, d["pack"]), set()),
+    ("location_queries.get_location_ids", lambda db, d: location_queries.get_location_ids(db), set()), # Covering index scan
+    ("location_queries.get_all_locations", lambda db, d: location_queries.get_all_locations(db, None, "Container"), set()),
+    ("location_queries.is_descendant", lambda db, d: location_queries.is_descendant(db, d["pouch"], d["pack"]), set()),
+    ("location_queries.get_location_subtree", lambda db, d: location_queries.get_location_subtree(db, d["pack"]), set()),
+    ("location_queries.get_location_totals", lambda db, d: location_queries.get_location_totals(db, d["pack"]), set()),
+    ("location_queries.get_locations_by_ids", lambda db, d: location_queries.get_locations_by_ids(db, [d["pack"], d["pouch"]]), set()),
+    ("location_queries.get_items_in_location", lambda db, d: location_queries.get_items_in_location(db, d["pouch"]), set()),
+    ("location_queries.get_loadout", lambda db, d: location_queries.get_loadout(db, d["pack"]), set()),
+    ("location_queries.update_location", lambda db, d: location_queries.update_location(db, d["pouch"], LocationUpdate(parent_id=d["spare"])), set()),
+    ("location_queries.delete_location", lambda db, d: location_queries.delete_location(db, d["pack"]), set()),
+    ("location_queries.rebuild_location_closure", lambda db, d: location_queries.rebuild_location_closure(db), {"locations", "paths", "p"}), # Full rebuild by design
+    ("sync_queries.get_changes_since", lambda db, d: sync_queries.get_changes_since(db, 0, 50), set()),
+    ("change_tracking.check_row_version", lambda db, d: change_tracking.check_row_version(db, "gear", 0, 1), set()),
+    ("change_tracking.get_table_versions", lambda db, d: change_tracking.get_table_versions(db, change_tracking.TRACKED_TABLES), set()),
+    ("user_queries.create_user", lambda db, d: user_queries.create_user(db, UserCreate(username=f"plan_new_user_{d['pack']}", password="password123")), set()),
+    ("user_queries.get_user_row_by_username", lambda db, d: user_queries.get_user_row_by_username(db, d["user"].username), set()),
+    ("user_queries.update_password_hash", lambda db, d: user_queries.update_password_hash(db, d["user"].id, "pbkdf2:sha256:1$salt$hash"), set()),
+    ("user_queries.get_user_by_id", lambda db, d: user_queries.get_user_by_id(db, d["user"].id), set()),
+]
+
+
+@pytest.mark.parametrize("name, call, allowed_scans", PLAN_CASES, ids=[case[0] for case in PLAN_CASES])
+def test_query_plan_has_no_full_table_scan(db, no_read_cache, plan_data, name, call, allowed_scans):
+    statements = capture_statements(db, lambda: call(db, plan_data))
+    assert statements, f"{name} executed no SQL; is the case still exercising it?"
+    scans = [scan for scan in full_table_scans(db, statements) if scan[0] not in allowed_scans]
+    assert not scans, f"{name} regressed to a full table scan: {scans}"
+
+
+def test_every_data_access_function_has_a_plan_case():
+    """New query functions must be added to PLAN_CASES (or NOT_QUERIES)."""
+    covered = {case[0] for case in PLAN_CASES} | NOT_QUERIES
+    public_functions = {
+        f"{module.__name__.rsplit('.', 1)[-1]}.{name}"
+        for module in DATA_ACCESS_MODULES
+        for name, func in inspect.getmembers(module, inspect.isfunction)
+        if not name.startswith("_") and func.__module__ == module.__name__
+    }
+    assert public_functions - covered == set()
+
+
+def test_read_cache_queries_use_indexes(db, plan_data):
+    """The cache's sync query runs before every cached read, so it must stay a primary key lookup."""
+    max_entries, ttl_seconds = read_cache.max_entries, read_cache.ttl_seconds
+    read_cache.configure(128, ttl_seconds)
+    try:
+        statements = capture_statements(db, lambda: location_queries.get_location_by_id(db, plan_data["pack"]))
+    finally:
+        read_cache.configure(max_entries, ttl_seconds)
+    assert any("table_versions" in sql for sql in statements)
+    assert full_table_scans(db, statements) == []
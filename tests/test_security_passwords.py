@@ -0,0 +1,54 @@
+import os
+
+import pytest
+from werkzeug.security import generate_password_hash
+from src.security.passwords import PasswordHasher, HasherBusyError, HasherUnavailableError
+
+def _die(*args):
+    os._exit(1) # Like a pool child killed by the OOM killer
+
+
+@pytest.fixture(scope="module")
+def pooled_hasher():
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=1, max_pending=4)
+    yield hasher
+    hasher.shutdown()
+
+def test_hash_and_verify_in_process_pool(pooled_hasher):
+    password_hash = pooled_hasher.hash("correct horse")
+    assert password_hash.startswith("pbkdf2:sha256:1000$")
+    assert pooled_hasher.verify(password_hash, "correct horse")
+    assert not pooled_hasher.verify(password_hash, "wrong horse")
+
+    stats = pooled_hasher.stats()
+    assert stats["completed"] == 3
+    assert stats["pending"] == 0
+    assert stats["peak_pending"] >= 1
+
+def test_needs_rehash_compares_normalized_method():
+    hasher = PasswordHasher(method="scrypt", workers=0) # Werkzeug's default cost is filled in
+    assert not hasher.needs_rehash(hasher.hash("password123"))
+    assert hasher.needs_rehash(generate_password_hash("password123", method="pbkdf2:sha256:1000"))
+    assert hasher.verify(generate_password_hash("password123", method="pbkdf2:sha256:1000"), "password123")
+
+def test_full_queue_rejects():
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0, max_pending=0)
+    with pytest.raises(HasherBusyError):
+        hasher.hash("password123")
+    assert hasher.stats()["rejected"] == 1
+
+def test_broken_pool_is_replaced():
+    """Test that a pool broken by a dying child fails one call at most, instead of every call after it."""
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=1, max_pending=4)
+    try:
+        hasher._get_executor().submit(_die).exception() # Breaks the pool between two calls
+        password_hash = hasher.hash("password123") # Retried on a fresh pool
+        assert hasher.verify(password_hash, "password123")
+        assert hasher.stats()["pool_restarts"] == 1
+
+        with pytest.raises(HasherUnavailableError): # The fresh pool breaks too
+            hasher._run(_die)
+        assert hasher.verify(password_hash, "password123")
+        assert hasher.stats()["pool_restarts"] == 3
+    finally:
+        hasher.shutdown()